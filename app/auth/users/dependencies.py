@@ -0,0 +1,42 @@
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+import jwt
+
+from app.auth.users.schemas import TokenUser
+from app.auth.utils.token import ACCESS_TOKEN_TYPE, decode_token
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+) -> TokenUser:
+    """Resolve the caller from the access token alone, without a database lookup"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    try:
+        payload = decode_token(credentials.credentials, ACCESS_TOKEN_TYPE)
+        return TokenUser(id=int(payload["sub"]), role=payload["role"])
+    except (jwt.InvalidTokenError, KeyError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def require_roles(*roles: str):
+    """Dependency factory that only admits users with one of the given roles"""
+    def checker(current_user: TokenUser = Depends(get_current_user)) -> TokenUser:
+        if current_user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return current_user
+    return checker
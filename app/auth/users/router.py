@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import jwt
 
 from app.database import get_db
-from app.auth.users.schemas import UserCreate, UserResponse, UserLogin, UserUpdate
-from app.auth.users.services import UserService
+from app.core.config import settings
+from app.auth.users.schemas import (
+    UserCreate, UserResponse, UserLogin, UserUpdate,
+    TokenResponse, RefreshTokenRequest, TokenUser, UserImportReport
+)
+from app.auth.users.models import User
+from app.auth.users.services import UserService, iter_csv_records, iter_ndjson_records
+from app.auth.users.dependencies import get_current_user
+from app.auth.utils.token import (
+    REFRESH_TOKEN_TYPE, create_access_token, create_refresh_token, decode_token
+)
 
 router = APIRouter(tags=["users"])
 
@@ -20,6 +30,42 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
             detail=f"Error creating user: {str(e)}"
         )
 
+@router.post("/import", response_model=UserImportReport)
+def import_users(
+    file: UploadFile = File(..., description="CSV (with header) or NDJSON file of students and instructors"),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk-create students and instructors from a CSV or NDJSON upload
+
+    Both formats handle errors the same way:
+    - a file that is not valid UTF-8 is rejected whole, with the first bad row
+      reported and no users created; so is a CSV file whose quoting is broken
+    - a row that fails validation, or an NDJSON line that is not a JSON object,
+      is reported in errors with its row number, and the other rows are imported
+    """
+    filename = (file.filename or "").lower()
+    content_type = file.content_type or ""
+    if filename.endswith(".csv") or content_type == "text/csv":
+        records = iter_csv_records(file.file)
+    elif filename.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        records = iter_ndjson_records(file.file)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only CSV and NDJSON files are supported"
+        )
+
+    try:
+        return UserService.import_users(db, records)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing users: {str(e)}"
+        )
+
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
     skip: int = 0, 
@@ -62,6 +108,11 @@ def get_user_by_phone(phone_number: str, db: Session = Depends(get_db)):
             detail=f"Error fetching user by phone: {str(e)}"
         )
 
+@router.get("/me", response_model=TokenUser)
+def get_me(current_user: TokenUser = Depends(get_current_user)):
+    # resolved from the access token, no database lookup
+    return current_user
+
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
     try:
@@ -133,7 +184,8 @@ def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
                 "email": user.email,
                 "phone_number": user.phone_number,
                 "role": user.role
-            }
+            },
+            **_issue_tokens(user.id, user.role).model_dump()
         }
     except HTTPException as he:
         raise he
@@ -141,4 +193,32 @@ def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Login failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/refresh", response_model=TokenResponse)
+def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    try:
+        payload = decode_token(token_data.refresh_token, REFRESH_TOKEN_TYPE)
+        user_id = int(payload["sub"])
+    except (jwt.InvalidTokenError, KeyError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+
+    # Refresh tokens live for days: re-check the user, and take the role from the
+    # database so deleted users are locked out and role changes take effect
+    user = db.get(User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    return _issue_tokens(user.id, user.role)
+
+def _issue_tokens(user_id: int, role: str) -> TokenResponse:
+    return TokenResponse(
+        access_token=create_access_token(user_id, role),
+        refresh_token=create_refresh_token(user_id, role),
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    )
@@ -49,4 +49,28 @@ class UserUpdate(BaseModel):
             valid_roles = ["student", "instructor", "admin"]
             if v not in valid_roles:
                 raise ValueError(f'Roles must be one of {", ".join(valid_roles)}')
-        return v
\ No newline at end of file
+        return v
+
+class TokenResponse(BaseModel):
+    access_token: str = Field(..., description="Short-lived access token")
+    refresh_token: str = Field(..., description="Refresh token used to obtain a new access token")
+    token_type: str = Field("bearer", description="Token type for the Authorization header")
+    expires_in: int = Field(..., description="Access token lifetime in seconds")
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str = Field(..., description="Refresh token issued at login")
+
+class TokenUser(BaseModel):
+    id: int = Field(..., description="User id from the token subject")
+    role: str = Field(..., description="User role from the token")
+
+class UserImportRowError(BaseModel):
+    row: int = Field(..., description="1-based record number in the uploaded file")
+    email: Optional[str] = Field(None, description="Email of the rejected row, if present")
+    errors: List[str] = Field(..., description="Reasons the row was rejected")
+
+class UserImportReport(BaseModel):
+    total_rows: int = Field(..., description="Number of records read from the file")
+    created: int = Field(..., description="Number of users created")
+    failed: int = Field(..., description="Number of rejected records")
+    errors: List[UserImportRowError] = Field(default_factory=list, description="Per-row error report")
@@ -1,11 +1,18 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from typing import List, Optional
-from sqlalchemy import or_
+from pydantic import ValidationError
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import or_, insert, exists
+import csv
+import io
+import json
 
 from app.auth.users.models import User
-from app.auth.users.schemas import UserCreate, UserUpdate
-from app.auth.utils.password import hash_password, verify_password
+from app.auth.users.schemas import UserCreate, UserUpdate, UserImportReport, UserImportRowError
+from app.auth.utils.password import hash_password, hash_passwords, verify_password
+from app.core.config import settings
+from app.core.db_utils import commit_keep_loaded, insert_returning, raise_for_integrity_error
 
 class UserService:
     @staticmethod
@@ -51,34 +58,34 @@ class UserService:
     
     @staticmethod
     def create_user(db: Session, user_data: UserCreate) -> User:
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User already exists with this email"
-            )
+        hashed_password = hash_password(user_data.password)
         
+        # Email uniqueness is enforced by the unique constraint; phone numbers have
+        # no constraint, so the insert is guarded by NOT EXISTS in the same statement
+        phone_taken = None
         if user_data.phone_number:
-            existing_phone_user = db.query(User).filter(User.phone_number == user_data.phone_number).first()
-            if existing_phone_user:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="User already exists with this phone number"
-                )
+            phone_taken = exists().where(User.phone_number == user_data.phone_number)
         
-        hashed_password = hash_password(user_data.password)
+        try:
+            db_user = insert_returning(db, User, {
+                "full_name": user_data.full_name,
+                "email": user_data.email,
+                "phone_number": user_data.phone_number,
+                "password": hashed_password,
+                "role": user_data.role
+            }, unless_exists=phone_taken)
+        except IntegrityError as e:
+            db.rollback()
+            raise_for_integrity_error(e, {"email": "User already exists with this email"})
         
-        db_user = User(
-            full_name=user_data.full_name,
-            email=user_data.email,
-            phone_number=user_data.phone_number,
-            password=hashed_password,
-            role=user_data.role
-        )
-
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        if db_user is None:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User already exists with this phone number"
+            )
+        
+        commit_keep_loaded(db)
         return db_user
     
     @staticmethod
@@ -129,4 +136,230 @@ class UserService:
                 detail="Invalid credentials"
             )
         
-        return user
\ No newline at end of file
+        return user
+    
+    @staticmethod
+    def import_users(db: Session, records: Iterable[Tuple[int, Any]]) -> UserImportReport:
+        """
+        Bulk-create students and instructors from parsed file records.
+        Records are (row_number, dict) pairs, or (row_number, error_message) for unparseable rows.
+
+        The whole file is read and validated before anything is written; if the
+        file itself cannot be parsed (ImportFileError), no users are created.
+        """
+        total_rows = 0
+        created = 0
+        errors: List[UserImportRowError] = []
+        seen_emails: set = set()
+        seen_phones: set = set()
+        valid: List[Tuple[int, UserCreate]] = []
+
+        try:
+            for row_number, record in records:
+                total_rows += 1
+                UserService._validate_record(row_number, record, valid, errors, seen_emails, seen_phones)
+        except ImportFileError as e:
+            errors.append(UserImportRowError(row=e.row, errors=[str(e)]))
+            return UserImportReport(
+                total_rows=total_rows,
+                created=0,
+                failed=len(errors),
+                errors=sorted(errors, key=lambda err: err.row)
+            )
+
+        for start in range(0, len(valid), settings.USER_IMPORT_BATCH_SIZE):
+            created += UserService._import_batch(db, valid[start:start + settings.USER_IMPORT_BATCH_SIZE], errors)
+
+        errors.sort(key=lambda err: err.row)
+        return UserImportReport(
+            total_rows=total_rows,
+            created=created,
+            failed=len(errors),
+            errors=errors
+        )
+
+    @staticmethod
+    def _validate_record(
+        row_number: int,
+        record: Any,
+        valid: List[Tuple[int, UserCreate]],
+        errors: List[UserImportRowError],
+        seen_emails: set,
+        seen_phones: set
+    ) -> None:
+        """Validate one record, appending it to valid or its problems to errors"""
+        if isinstance(record, str):
+            errors.append(UserImportRowError(row=row_number, errors=[record]))
+            return
+
+        try:
+            user_data = UserCreate(**record)
+        except ValidationError as e:
+            errors.append(UserImportRowError(
+                row=row_number,
+                email=record.get("email"),
+                errors=[f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()]
+            ))
+            return
+
+        if user_data.role not in IMPORTABLE_ROLES:
+            errors.append(UserImportRowError(
+                row=row_number,
+                email=user_data.email,
+                errors=["Only student and instructor accounts can be imported"]
+            ))
+            return
+
+        # Duplicates within the file itself
+        row_errors = []
+        if user_data.email in seen_emails:
+            row_errors.append("Duplicate email in file")
+        if user_data.phone_number and user_data.phone_number in seen_phones:
+            row_errors.append("Duplicate phone number in file")
+        if row_errors:
+            errors.append(UserImportRowError(row=row_number, email=user_data.email, errors=row_errors))
+            return
+
+        seen_emails.add(user_data.email)
+        if user_data.phone_number:
+            seen_phones.add(user_data.phone_number)
+        valid.append((row_number, user_data))
+
+    @staticmethod
+    def _import_batch(
+        db: Session,
+        batch: List[Tuple[int, UserCreate]],
+        errors: List[UserImportRowError]
+    ) -> int:
+        """Check one batch against existing users, hash its passwords and insert it"""
+        emails = [user_data.email for _, user_data in batch]
+        phones = [user_data.phone_number for _, user_data in batch if user_data.phone_number]
+
+        # One set-based query for every email/phone in the batch
+        conditions = [User.email.in_(emails)]
+        if phones:
+            conditions.append(User.phone_number.in_(phones))
+        existing = db.query(User.email, User.phone_number).filter(or_(*conditions)).all()
+        existing_emails = {row.email for row in existing}
+        existing_phones = {row.phone_number for row in existing if row.phone_number}
+
+        accepted: List[Tuple[int, UserCreate]] = []
+        for row_number, user_data in batch:
+            row_errors = []
+            if user_data.email in existing_emails:
+                row_errors.append("User already exists with this email")
+            if user_data.phone_number and user_data.phone_number in existing_phones:
+                row_errors.append("User already exists with this phone number")
+            if row_errors:
+                errors.append(UserImportRowError(row=row_number, email=user_data.email, errors=row_errors))
+            else:
+                accepted.append((row_number, user_data))
+
+        if not accepted:
+            return 0
+
+        hashed = hash_passwords([user_data.password for _, user_data in accepted])
+        rows = [
+            {
+                "full_name": user_data.full_name,
+                "email": user_data.email,
+                "phone_number": user_data.phone_number,
+                "password": hashed_password,
+                "role": user_data.role
+            }
+            for (_, user_data), hashed_password in zip(accepted, hashed)
+        ]
+
+        try:
+            db.execute(insert(User), rows)
+            db.commit()
+            return len(rows)
+        except IntegrityError:
+            # A concurrent writer took one of the emails; fall back to per-row inserts
+            db.rollback()
+
+        created = 0
+        for (row_number, user_data), row in zip(accepted, rows):
+            try:
+                db.execute(insert(User), [row])
+                db.commit()
+                created += 1
+            except IntegrityError:
+                db.rollback()
+                errors.append(UserImportRowError(
+                    row=row_number,
+                    email=user_data.email,
+                    errors=["User already exists with this email"]
+                ))
+        return created
+
+
+IMPORTABLE_ROLES = ("student", "instructor")
+IMPORT_FIELDS = ("full_name", "email", "phone_number", "role", "password")
+
+
+class ImportFileError(ValueError):
+    """The upload cannot be parsed past this row, so none of it is imported"""
+
+    def __init__(self, row: int, message: str):
+        super().__init__(message)
+        self.row = row
+
+
+def iter_csv_records(raw_file: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """
+    Lazily parse a CSV upload with a header row into (row_number, dict) pairs
+
+    Raises:
+        ImportFileError: The file is not valid UTF-8 or not valid CSV
+    """
+    text = io.TextIOWrapper(raw_file, encoding="utf-8-sig", newline="")
+    row_number = 0
+    try:
+        reader = csv.DictReader(text)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except UnicodeDecodeError:
+                raise ImportFileError(row_number + 1, "File is not valid UTF-8")
+            except csv.Error as e:
+                raise ImportFileError(row_number + 1, f"Invalid CSV: {str(e)}")
+            row_number += 1
+            record = {field: (row.get(field) or "").strip() for field in IMPORT_FIELDS}
+            if not record["phone_number"]:
+                record["phone_number"] = None
+            yield row_number, record
+    finally:
+        text.detach()
+
+
+def iter_ndjson_records(raw_file: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """
+    Lazily parse a newline-delimited JSON upload into (row_number, dict) pairs
+    Lines that are not JSON objects are reported per row, like invalid CSV fields
+
+    Raises:
+        ImportFileError: The file is not valid UTF-8, as for CSV uploads
+    """
+    row_number = 0
+    for raw_line in raw_file:
+        try:
+            line = raw_line.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            raise ImportFileError(row_number + 1, "File is not valid UTF-8")
+        if row_number == 0:
+            line = line.lstrip("\ufeff")
+        if not line:
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, "Each line must be a JSON object"
+            continue
+        yield row_number, record
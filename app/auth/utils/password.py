@@ -15,6 +15,16 @@
 #     )
 
 import bcrypt
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from app.core.config import settings
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_workers = 0
+_hash_pool_lock = threading.Lock()
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
@@ -25,3 +35,24 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hased_password:str) -> bool:
     """verify plain password with hashed password"""
     return bcrypt.checkpw(plain_password.encode('utf-8'), hased_password.encode('utf-8'))
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash many passwords in parallel on a shared process pool"""
+    global _hash_pool, _hash_pool_workers
+    if not passwords:
+        return []
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool_workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+            _hash_pool = ProcessPoolExecutor(max_workers=_hash_pool_workers)
+        pool, workers = _hash_pool, _hash_pool_workers
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(hash_password, passwords, chunksize=chunksize))
+
+def shutdown_hash_pool() -> None:
+    """Stop the password hashing workers, called at application shutdown"""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=True)
+            _hash_pool = None
@@ -0,0 +1,82 @@
+import jwt
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict
+
+from app.core.config import settings
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+UPLOAD_TICKET_TYPE = "upload_ticket"
+UPLOAD_RECEIPT_TYPE = "upload_receipt"
+
+
+@lru_cache(maxsize=1)
+def _get_signing_key() -> str:
+    """Load the signing key once per process"""
+    if not settings.JWT_SECRET_KEY:
+        raise ValueError("JWT_SECRET_KEY must be set in environment variables")
+    return settings.JWT_SECRET_KEY
+
+
+def check_signing_key() -> None:
+    """Fail at startup, rather than on the first login, when JWT_SECRET_KEY is missing"""
+    _get_signing_key()
+
+
+def _create_token(user_id: int, role: str, token_type: str, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": str(user_id),
+        "role": role,
+        "type": token_type,
+        "iat": now,
+        "exp": now + expires_delta,
+        "jti": uuid.uuid4().hex
+    }
+    return jwt.encode(payload, _get_signing_key(), algorithm=settings.JWT_ALGORITHM)
+
+
+def create_access_token(user_id: int, role: str) -> str:
+    """Create a short-lived access token carrying the user id and role"""
+    return _create_token(
+        user_id, role, ACCESS_TOKEN_TYPE,
+        timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
+def create_refresh_token(user_id: int, role: str) -> str:
+    """Create a long-lived refresh token used to obtain new access tokens"""
+    return _create_token(
+        user_id, role, REFRESH_TOKEN_TYPE,
+        timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+
+def create_signed_token(subject: str, token_type: str, expires_at: datetime, **claims: Any) -> str:
+    """Create a token for something other than a user session, e.g. an upload ticket"""
+    payload = {
+        **claims,
+        "sub": subject,
+        "type": token_type,
+        "iat": datetime.now(timezone.utc),
+        "exp": expires_at
+    }
+    return jwt.encode(payload, _get_signing_key(), algorithm=settings.JWT_ALGORITHM)
+
+
+def decode_token(token: str, expected_type: str) -> Dict[str, Any]:
+    """
+    Verify signature, expiry and token type.
+    Raises jwt.InvalidTokenError if the token is not acceptable.
+    """
+    payload = jwt.decode(
+        token,
+        _get_signing_key(),
+        algorithms=[settings.JWT_ALGORITHM],
+        options={"require": ["sub", "exp", "type"]}
+    )
+    if payload.get("type") != expected_type:
+        raise jwt.InvalidTokenError(f"Expected {expected_type} token")
+    return payload
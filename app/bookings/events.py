@@ -0,0 +1,39 @@
+"""
+Booking events - live feed of booking changes for the instructor dashboard
+Published by the booking write paths after commit and streamed over SSE
+"""
+from typing import Any, Dict, Iterable
+
+from app.core.broadcaster import EventBroadcaster
+from app.core.config import settings
+from app.bookings.models import Booking
+from app.bookings.schemas import Booking as BookingSchema
+
+BOOKING_CREATED = "booking_created"
+BOOKING_UPDATED = "booking_updated"
+BOOKING_STATUS_CHANGED = "booking_status_changed"
+BOOKING_DELETED = "booking_deleted"
+BOOKINGS_DELETED = "bookings_deleted"  # Bulk delete by student or class
+
+booking_events = EventBroadcaster(
+    replay_size=settings.BOOKING_STREAM_REPLAY_SIZE,
+    queue_size=settings.BOOKING_STREAM_QUEUE_SIZE
+)
+
+
+def publish_booking(event: str, booking: Booking) -> None:
+    """Publish a created or changed booking with its full representation"""
+    booking_events.publish(event, BookingSchema.model_validate(booking).model_dump(mode="json"))
+
+
+def publish_bookings(event: str, bookings: Iterable[Booking]) -> None:
+    for booking in bookings:
+        publish_booking(event, booking)
+
+
+def publish_deleted(booking_id: int) -> None:
+    booking_events.publish(BOOKING_DELETED, {"id": booking_id})
+
+
+def publish_bulk_deleted(filters: Dict[str, Any]) -> None:
+    booking_events.publish(BOOKINGS_DELETED, filters)
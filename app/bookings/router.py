@@ -1,37 +1,21 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import httpx
+import json
 
+from app.core.config import settings
 from app.database import get_db
 from app.bookings.models import Booking
-from app.bookings.schemas import Booking, BookingCreate, BookingUpdate
+from app.bookings.schemas import Booking, BookingCreate, BookingUpdate, BookingBatchCreate, BookingBatchResponse
 from app.bookings.services import BookingService
-from app.notifications.schemas import BookingNotificationData
+from app.bookings.events import booking_events, BOOKING_CREATED
 
 router = APIRouter(
     prefix="/bookings",
     tags=["bookings"]
 )
 
-# Background task function for booking notifications
-async def send_booking_notification(booking_data: BookingNotificationData):
-    """
-    Send notification to instructors about new booking
-    This runs in the background
-    """
-    try:
-        # Call our own notification endpoint
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"http://localhost:8000/api/v1/notifications/new-booking",
-                json=booking_data.dict()
-            )
-            if response.status_code != 200:
-                print(f"Failed to send booking notification: {response.text}")
-    except Exception as e:
-        print(f"Error sending booking notification: {str(e)}")
-
 # GET endpoints
 @router.get("/", response_model=List[Booking])
 def get_all_bookings(
@@ -58,6 +42,43 @@ def get_all_bookings(
             detail=f"Error fetching bookings: {str(e)}"
         )
 
+@router.get("/stream")
+async def stream_bookings(
+    request: Request,
+    status: Optional[str] = Query(None, description="Only announce new bookings with this status"),
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Live feed of booking changes as Server-Sent Events.
+    Events: booking_created, booking_updated, booking_status_changed,
+    booking_deleted, bookings_deleted and reset. Browsers resume automatically
+    with the Last-Event-ID header; a reset event means the missed events are no
+    longer buffered and the client should refetch GET /bookings once.
+    """
+    # Ids look like "<epoch>-<seq>"; one from another process or restart gets a reset
+    resume_from = last_event_id_header or last_event_id
+
+    async def event_stream():
+        with booking_events.subscribe(resume_from) as subscription:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.next_event(timeout=settings.BOOKING_STREAM_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+
+                seq, name, data = event
+                if status is not None and name == BOOKING_CREATED and data.get("status") != status:
+                    continue
+                yield f"id: {booking_events.format_id(seq)}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/phone/{phone_no}", response_model=List[Booking])
 def get_all_bookings_from_phone_no(phone_no: str, db: Session = Depends(get_db)):
     """Get all bookings for a specific phone number"""
@@ -114,31 +135,14 @@ def get_booking_by_id(booking_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=Booking, status_code=status.HTTP_201_CREATED)
 def create_booking(
     booking_data: BookingCreate, 
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
     Create a new booking and notify instructors.
+    The notification is written to the outbox in the same transaction.
     """
     try:
-        # Create the booking first
-        new_booking = BookingService.create_booking(db, booking_data)
-        
-        # TODO: Replace this with actual student name lookup from your user model
-        # You'll need to implement this based on your user structure
-        student_name = "Student"  # Placeholder - implement student name lookup
-        
-        # Prepare notification data
-        notification_data = BookingNotificationData(
-            booking_id=str(new_booking.id),
-            student_name=student_name,
-            booking_time=new_booking.created_at.strftime("%H:%M") if new_booking.created_at else None
-        )
-        
-        # Add background task to send notification
-        background_tasks.add_task(send_booking_notification, notification_data)
-        
-        return new_booking
+        return BookingService.create_booking(db, booking_data)
         
     except HTTPException as he:
         raise he
@@ -148,6 +152,32 @@ def create_booking(
             detail=f"Error creating booking: {str(e)}"
         )
 
+@router.post("/batch", response_model=BookingBatchResponse)
+def create_bookings_batch(
+    batch_data: BookingBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Create many bookings in one transaction and notify instructors once.
+    """
+    try:
+        results = BookingService.create_bookings_batch(db, batch_data.items)
+        created = [result["booking"] for result in results if result["success"]]
+
+        return {
+            "created": len(created),
+            "failed": len(results) - len(created),
+            "results": results
+        }
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating bookings: {str(e)}"
+        )
+
 # UPDATE endpoints
 @router.put("/{booking_id}", response_model=Booking)
 def update_booking(
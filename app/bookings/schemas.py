@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 # Base schema - common fields
 class BookingBase(BaseModel):
@@ -35,4 +35,19 @@ class Booking(BookingInDBBase):
     pass
 
 class BookingInDB(BookingInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+# Batch schemas - for creating many bookings in one request
+class BookingBatchCreate(BaseModel):
+    items: List[BookingCreate] = Field(..., min_length=1, max_length=500, description="Bookings to create")
+
+class BookingBatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    success: bool
+    booking: Optional[Booking] = None
+    error: Optional[str] = None
+
+class BookingBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BookingBatchItemResult]
@@ -1,12 +1,24 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, exists, insert, literal_column, select, tuple_
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from app.bookings.models import Booking
 from app.bookings.schemas import BookingCreate, BookingUpdate
-from app.class_sessions.models import ClassSession 
-from app.auth.users.models import User 
+from app.class_sessions.models import ClassSession
+from app.auth.users.models import User
+from app.core.db_utils import commit_keep_loaded, insert_returning, raise_for_integrity_error
+from app.notifications.outbox import enqueue_event, NEW_BOOKING_EVENT, USER_TYPE_BROADCAST_EVENT
+from app.bookings.events import (
+    publish_booking,
+    publish_bookings,
+    publish_deleted,
+    publish_bulk_deleted,
+    BOOKING_CREATED,
+    BOOKING_UPDATED,
+    BOOKING_STATUS_CHANGED
+)
 
 class BookingService:
     
@@ -64,52 +76,125 @@ class BookingService:
     @staticmethod
     def create_booking(db: Session, booking_data: BookingCreate) -> Booking:
         """Create a new booking with validation"""
-        # Validate student exists
-        student = db.query(User).filter(User.id == booking_data.student_id).first()
-        if not student:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Student not found"
-            )
-        
-        # Validate class exists
-        class_session = db.query(ClassSession).filter(ClassSession.id == booking_data.class_id).first()
-        if not class_session:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Class session not found"
-            )
-        
-        # Check if student already booked this class
-        existing_booking = db.query(Booking).filter(
+        # Student and class existence are enforced by the foreign keys; the
+        # duplicate (student, class) check runs inside the INSERT itself
+        already_booked = exists().where(
             and_(
                 Booking.student_id == booking_data.student_id,
                 Booking.class_id == booking_data.class_id
             )
-        ).first()
+        )
+        
+        # The student's name comes back with the new row, for the notification
+        student_name = (
+            select(User.full_name)
+            .where(User.id == literal_column(f"{Booking.__tablename__}.student_id"))
+            .scalar_subquery()
+        )
+        try:
+            created = insert_returning(db, Booking, {
+                "student_id": booking_data.student_id,
+                "class_id": booking_data.class_id,
+                "phone_no": booking_data.phone_no,
+                "suburb": booking_data.suburb,
+                "additional_message": booking_data.additional_message,
+                "status": booking_data.status,
+                "remarks": booking_data.remarks
+            }, unless_exists=already_booked, also=[student_name])
+        except IntegrityError as e:
+            db.rollback()
+            raise_for_integrity_error(e, {
+                "student_id": "Student not found",
+                "class_id": "Class session not found"
+            })
         
-        if existing_booking:
+        if created is None:
+            db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Student already booked this class"
             )
         
-        # Create booking
-        db_booking = Booking(
-            student_id=booking_data.student_id,
-            class_id=booking_data.class_id,
-            phone_no=booking_data.phone_no,
-            suburb=booking_data.suburb,
-            additional_message=booking_data.additional_message,
-            status=booking_data.status,
-            remarks=booking_data.remarks
-        )
+        db_booking, name = created
         
-        db.add(db_booking)
-        db.commit()
-        db.refresh(db_booking)
+        # Notify instructors via the outbox, committed atomically with the booking
+        enqueue_event(db, NEW_BOOKING_EVENT, {
+            "booking_id": str(db_booking.id),
+            "student_name": name or "Student",
+            "booking_time": db_booking.created_at.strftime("%H:%M") if db_booking.created_at else None
+        })
+        
+        commit_keep_loaded(db)
+        publish_booking(BOOKING_CREATED, db_booking)
         return db_booking
 
+    @staticmethod
+    def create_bookings_batch(db: Session, items: List[BookingCreate]) -> List[Dict[str, Any]]:
+        """
+        Create many bookings in one transaction.
+        Validation uses set-based queries; returns one result dict per item, in request order.
+        """
+        student_ids = {item.student_id for item in items}
+        class_ids = {item.class_id for item in items}
+        pairs = {(item.student_id, item.class_id) for item in items}
+
+        existing_students = set(db.scalars(select(User.id).where(User.id.in_(student_ids))))
+        existing_classes = set(db.scalars(select(ClassSession.id).where(ClassSession.id.in_(class_ids))))
+        booked_pairs = set(
+            db.execute(
+                select(Booking.student_id, Booking.class_id).where(
+                    tuple_(Booking.student_id, Booking.class_id).in_(pairs)
+                )
+            ).tuples()
+        )
+
+        results: List[Dict[str, Any]] = []
+        to_insert: List[Dict[str, Any]] = []
+        for index, item in enumerate(items):
+            pair = (item.student_id, item.class_id)
+            error = None
+            if item.student_id not in existing_students:
+                error = "Student not found"
+            elif item.class_id not in existing_classes:
+                error = "Class session not found"
+            elif pair in booked_pairs:
+                error = "Student already booked this class"
+
+            if error:
+                results.append({"index": index, "success": False, "booking": None, "error": error})
+                continue
+
+            # Later duplicates of the same pair within this batch are rejected too
+            booked_pairs.add(pair)
+            results.append({"index": index, "success": True, "booking": None, "error": None})
+            to_insert.append(item.model_dump())
+
+        if to_insert:
+            created = db.scalars(
+                insert(Booking).returning(Booking, sort_by_parameter_order=True),
+                to_insert
+            ).all()
+            
+            # One aggregated instructor notification for the whole batch
+            enqueue_event(db, USER_TYPE_BROADCAST_EVENT, {
+                "user_type": "instructor",
+                "title": "New Bookings Received",
+                "body": f"{len(created)} new bookings received",
+                "data": {
+                    "type": "new_booking_batch",
+                    "booking_ids": ",".join(str(booking.id) for booking in created)
+                }
+            })
+            commit_keep_loaded(db)
+            publish_bookings(BOOKING_CREATED, created)
+
+            created_iter = iter(created)
+            for result in results:
+                if result["success"]:
+                    result["booking"] = next(created_iter)
+
+        return results
+
     # UPDATE operations
     @staticmethod
     def update_booking(db: Session, booking_id: int, booking_data: BookingUpdate) -> Booking:
@@ -123,6 +208,7 @@ class BookingService:
             
         db.commit()
         db.refresh(booking)
+        publish_booking(BOOKING_UPDATED, booking)
         return booking
 
     @staticmethod
@@ -132,6 +218,7 @@ class BookingService:
         booking.status = status
         db.commit()
         db.refresh(booking)
+        publish_booking(BOOKING_STATUS_CHANGED, booking)
         return booking
 
     # DELETE operations
@@ -141,18 +228,21 @@ class BookingService:
         booking = BookingService.get_booking_by_id(db, booking_id)
         db.delete(booking)
         db.commit()
+        publish_deleted(booking_id)
 
     @staticmethod
     def delete_student_bookings(db: Session, student_id: int) -> None:
         """Delete all bookings for a student"""
         db.query(Booking).filter(Booking.student_id == student_id).delete()
         db.commit()
+        publish_bulk_deleted({"student_id": student_id})
 
     @staticmethod
     def delete_class_bookings(db: Session, class_id: int) -> None:
         """Delete all bookings for a class"""
         db.query(Booking).filter(Booking.class_id == class_id).delete()
         db.commit()
+        publish_bulk_deleted({"class_id": class_id})
 
 # Utility function  
 def get_booking_service():
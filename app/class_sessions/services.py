@@ -8,6 +8,7 @@ from app.class_sessions.models import ClassSession
 from app.class_sessions.schemas import ClassSessionCreate, ClassSessionUpdate
 from app.auth.users.models import User
 from app.courses.models import Course
+from app.core.cache import entity_cache
 
 class ClassSessionService:
     
@@ -69,8 +70,7 @@ class ClassSessionService:
         #     )
         
         # Validate course exists
-        course = db.query(Course).filter(Course.id == session_data.course_id).first()
-        if not course:
+        if not entity_cache.exists(db, Course, session_data.course_id):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Course not found"
@@ -0,0 +1,149 @@
+"""
+In-process event broadcaster with a replay buffer
+Write paths publish events; streaming endpoints subscribe and can resume from
+the last event id they saw. publish() is thread-safe so sync services running
+in the threadpool can call it.
+
+Event ids sent to clients are "<epoch>-<seq>": the epoch is random per process,
+so an id from before a restart (or from another worker) is never mistaken for
+one of this process's events.
+"""
+import asyncio
+import itertools
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+# (sequence number, event name, data); format_id turns the sequence number into the client-facing id
+Event = Tuple[int, str, Dict[str, Any]]
+
+# Sent when a subscriber cannot be resumed from its last event id (or fell too far
+# behind); clients should refetch their state and continue from this event's id
+RESET_EVENT = "reset"
+
+
+class Subscription:
+    """
+    One subscriber's bounded queue, read from the event loop it was created on
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        queue_size: int,
+        backlog: List[Event],
+        format_id: Callable[[int], str]
+    ):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._backlog = deque(backlog)
+        self._format_id = format_id
+
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        Next replayed or published event, or None if nothing arrives within timeout
+        """
+        if self._backlog:
+            return self._backlog.popleft()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def offer(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop what is queued and tell the consumer to reset
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((event[0], RESET_EVENT, {"last_event_id": self._format_id(event[0])}))
+
+
+class EventBroadcaster:
+    """
+    Fans events out to every subscriber's bounded queue and keeps the last
+    replay_size events so reconnecting clients can catch up.
+    """
+
+    def __init__(self, replay_size: int = 1000, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._buffer: Deque[Event] = deque(maxlen=replay_size)
+        self.epoch = uuid.uuid4().hex[:12]
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event: str, data: Dict[str, Any]) -> int:
+        """
+        Publish an event to all subscribers
+
+        Returns:
+            The event's sequence number
+        """
+        with self._lock:
+            event_id = next(self._ids)
+            self._last_id = event_id
+            entry = (event_id, event, data)
+            self._buffer.append(entry)
+
+            # Handed over under the lock so every subscriber sees events in id order
+            closed = []
+            for subscription in self._subscribers:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.offer, entry)
+                except RuntimeError:
+                    # Subscriber's loop is closed
+                    closed.append(subscription)
+            self._subscribers.difference_update(closed)
+        return event_id
+
+    def format_id(self, seq: int) -> str:
+        """Client-facing id of an event"""
+        return f"{self.epoch}-{seq}"
+
+    def _parse_id(self, event_id: str) -> Optional[int]:
+        """Sequence number of one of this process's event ids, or None for any other id"""
+        epoch, _, seq = event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _replay(self, last_event_id: Optional[str]) -> List[Event]:
+        """Events after last_event_id, or a reset event when they cannot be replayed"""
+        if last_event_id is None:
+            return []
+        seq = self._parse_id(last_event_id)
+        oldest_id = self._buffer[0][0] if self._buffer else self._last_id + 1
+        # Ids from another process or epoch, unparsable ids and ids older than the buffer cannot be resumed
+        if seq is None or seq > self._last_id or seq < oldest_id - 1:
+            return [(self._last_id, RESET_EVENT, {"last_event_id": self.format_id(self._last_id)})]
+        return [entry for entry in self._buffer if entry[0] > seq]
+
+    @contextmanager
+    def subscribe(self, last_event_id: Optional[str] = None) -> Iterator[Subscription]:
+        """
+        Subscribe from the running event loop, starting with any events missed since last_event_id
+        """
+        loop = asyncio.get_running_loop()
+        # Replay and registration happen under one lock so no event falls in between
+        with self._lock:
+            subscription = Subscription(loop, self.queue_size, self._replay(last_event_id), self.format_id)
+            self._subscribers.add(subscription)
+
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscription)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "buffered": len(self._buffer),
+                "last_event_id": self.format_id(self._last_id)
+            }
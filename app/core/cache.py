@@ -0,0 +1,80 @@
+"""
+Process-wide cache of entity existence checks
+Keyed by (model, id) with LRU eviction and a TTL
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+class EntityCache:
+    """
+    Bounded LRU + TTL cache that remembers which rows exist.
+    Only positive results are cached, so newly created rows are seen immediately;
+    hard deletes of checked models (courses, FAQ categories) call invalidate() so
+    removed rows are not reported. Updates and soft deletes keep the row, so they
+    leave the cache alone.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Any], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model, entity_id: Any) -> Tuple[str, Any]:
+        return (model.__tablename__, entity_id)
+
+    def exists(self, db: Session, model, entity_id: Any) -> bool:
+        """Return True if a row with this id exists, querying only on a cache miss"""
+        key = self._key(model, entity_id)
+        now = time.monotonic()
+
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+
+        found = db.query(model.id).filter(model.id == entity_id).first() is not None
+        if found:
+            with self._lock:
+                self._entries[key] = now + self.ttl_seconds
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return found
+
+    def invalidate(self, model, entity_id: Any) -> None:
+        with self._lock:
+            self._entries.pop(self._key(model, entity_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# Create global instance
+entity_cache = EntityCache(
+    maxsize=settings.ENTITY_CACHE_MAXSIZE,
+    ttl_seconds=settings.ENTITY_CACHE_TTL_SECONDS
+)
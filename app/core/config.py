@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+import tempfile
 
 load_dotenv()
 
@@ -15,4 +16,125 @@ class Settings:
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
 
-settings = Settings()
\ No newline at end of file
+    # JWT settings
+    JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "")
+    JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+    # Entity existence cache settings
+    ENTITY_CACHE_MAXSIZE: int = int(os.getenv("ENTITY_CACHE_MAXSIZE", "10000"))
+    ENTITY_CACHE_TTL_SECONDS: int = int(os.getenv("ENTITY_CACHE_TTL_SECONDS", "300"))
+
+    # Bulk user import settings
+    USER_IMPORT_BATCH_SIZE: int = int(os.getenv("USER_IMPORT_BATCH_SIZE", "500"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))  # 0 = one per CPU
+
+    # Notification outbox settings
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_POLL_INTERVAL_SECONDS: float = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1.0"))
+    OUTBOX_LEASE_SECONDS: int = int(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+
+    # Push fan-out settings
+    FANOUT_CONCURRENCY: int = int(os.getenv("FANOUT_CONCURRENCY", "100"))
+    FANOUT_CALL_TIMEOUT_SECONDS: float = float(os.getenv("FANOUT_CALL_TIMEOUT_SECONDS", "10"))
+    FANOUT_MAX_TRACKED_JOBS: int = int(os.getenv("FANOUT_MAX_TRACKED_JOBS", "1000"))
+    FANOUT_JOB_RETENTION_HOURS: int = int(os.getenv("FANOUT_JOB_RETENTION_HOURS", "24"))  # Finished job rows kept this long
+
+    # Web push HTTP client settings
+    FCM_BASE_URL: str = os.getenv("FCM_BASE_URL", "https://fcm.googleapis.com")
+    PUSH_HTTP2: bool = os.getenv("PUSH_HTTP2", "true").lower() == "true"
+    PUSH_MAX_CONNECTIONS: int = int(os.getenv("PUSH_MAX_CONNECTIONS", "100"))
+    PUSH_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("PUSH_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    PUSH_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("PUSH_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    PUSH_TIMEOUT_SECONDS: float = float(os.getenv("PUSH_TIMEOUT_SECONDS", "30"))
+    PUSH_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("PUSH_CONNECT_TIMEOUT_SECONDS", "5"))
+
+    # VAPID header cache settings
+    VAPID_TOKEN_TTL_SECONDS: int = int(os.getenv("VAPID_TOKEN_TTL_SECONDS", str(12 * 60 * 60)))
+    VAPID_REFRESH_MARGIN_SECONDS: int = int(os.getenv("VAPID_REFRESH_MARGIN_SECONDS", "300"))
+
+    # Notification log writer settings
+    NOTIFICATION_LOG_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_LOG_BATCH_SIZE", "500"))
+    NOTIFICATION_LOG_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("NOTIFICATION_LOG_FLUSH_INTERVAL_SECONDS", "1.0"))
+    NOTIFICATION_LOG_MAX_BUFFER: int = int(os.getenv("NOTIFICATION_LOG_MAX_BUFFER", "10000"))
+
+    # Dead push token pruning settings
+    TOKEN_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("TOKEN_SWEEP_INTERVAL_SECONDS", "3600"))
+    TOKEN_FAILURE_GRACE_HOURS: int = int(os.getenv("TOKEN_FAILURE_GRACE_HOURS", "72"))
+    TOKEN_FAILURE_THRESHOLD: int = int(os.getenv("TOKEN_FAILURE_THRESHOLD", "5"))
+
+    # Token registry settings
+    TOKEN_REGISTRY_REFRESH_SECONDS: int = int(os.getenv("TOKEN_REGISTRY_REFRESH_SECONDS", "300"))
+    TOKEN_REGISTRY_VERSION_CHECK_MS: int = int(os.getenv("TOKEN_REGISTRY_VERSION_CHECK_MS", "1000"))
+
+    # Push delivery retry queue settings
+    PUSH_MAX_ATTEMPTS: int = int(os.getenv("PUSH_MAX_ATTEMPTS", "8"))
+    PUSH_RETRY_BASE_SECONDS: float = float(os.getenv("PUSH_RETRY_BASE_SECONDS", "5"))
+    PUSH_RETRY_MAX_SECONDS: float = float(os.getenv("PUSH_RETRY_MAX_SECONDS", "3600"))
+    PUSH_DELIVERY_BATCH_SIZE: int = int(os.getenv("PUSH_DELIVERY_BATCH_SIZE", "200"))
+    PUSH_DELIVERY_POLL_INTERVAL_SECONDS: float = float(os.getenv("PUSH_DELIVERY_POLL_INTERVAL_SECONDS", "1.0"))
+    PUSH_DELIVERY_LEASE_SECONDS: int = int(os.getenv("PUSH_DELIVERY_LEASE_SECONDS", "120"))
+
+    # Notification log partitioning settings
+    NOTIFICATION_LOG_RETENTION_MONTHS: int = int(os.getenv("NOTIFICATION_LOG_RETENTION_MONTHS", "6"))
+    NOTIFICATION_LOG_PARTITIONS_AHEAD: int = int(os.getenv("NOTIFICATION_LOG_PARTITIONS_AHEAD", "2"))
+    NOTIFICATION_LOG_MAINTENANCE_INTERVAL_SECONDS: int = int(os.getenv("NOTIFICATION_LOG_MAINTENANCE_INTERVAL_SECONDS", "86400"))
+
+    # Notification coalescing settings
+    NOTIFICATION_QUIET_WINDOW_SECONDS: float = float(os.getenv("NOTIFICATION_QUIET_WINDOW_SECONDS", "30"))
+    NOTIFICATION_COALESCE_MAX_WAIT_SECONDS: float = float(os.getenv("NOTIFICATION_COALESCE_MAX_WAIT_SECONDS", "300"))
+    NOTIFICATION_DIGEST_TYPES: str = os.getenv("NOTIFICATION_DIGEST_TYPES", "")  # Comma separated, e.g. "new_booking"
+    NOTIFICATION_DIGEST_WINDOW_SECONDS: float = float(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "900"))
+    NOTIFICATION_WHEEL_TICK_SECONDS: float = float(os.getenv("NOTIFICATION_WHEEL_TICK_SECONDS", "1.0"))
+    NOTIFICATION_WHEEL_SLOTS: int = int(os.getenv("NOTIFICATION_WHEEL_SLOTS", "3600"))
+
+    # Live booking stream settings
+    BOOKING_STREAM_REPLAY_SIZE: int = int(os.getenv("BOOKING_STREAM_REPLAY_SIZE", "1000"))
+    BOOKING_STREAM_QUEUE_SIZE: int = int(os.getenv("BOOKING_STREAM_QUEUE_SIZE", "256"))
+    BOOKING_STREAM_KEEPALIVE_SECONDS: float = float(os.getenv("BOOKING_STREAM_KEEPALIVE_SECONDS", "15"))
+
+    # Course image upload settings
+    IMAGE_UPLOAD_MAX_BYTES: int = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", str(5 * 1024 * 1024)))
+    UPLOAD_FORM_OVERHEAD_BYTES: int = int(os.getenv("UPLOAD_FORM_OVERHEAD_BYTES", str(64 * 1024)))  # Form fields and multipart framing
+    IMAGE_UPLOAD_WORKERS: int = int(os.getenv("IMAGE_UPLOAD_WORKERS", "4"))
+
+    # Course image variant settings
+    IMAGE_VARIANT_WIDTHS: str = os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,960,1200")
+    IMAGE_VARIANT_FORMATS: str = os.getenv("IMAGE_VARIANT_FORMATS", "avif,webp")
+    IMAGE_WEBP_QUALITY: int = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    IMAGE_AVIF_QUALITY: int = int(os.getenv("IMAGE_AVIF_QUALITY", "55"))
+    IMAGE_PIPELINE_WORKERS: int = int(os.getenv("IMAGE_PIPELINE_WORKERS", "0"))  # 0 = one per CPU
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))  # Larger images are rejected before decoding
+
+    # Course image job queue settings
+    IMAGE_JOB_MAX_ATTEMPTS: int = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", "5"))
+    IMAGE_JOB_RETRY_BASE_SECONDS: float = float(os.getenv("IMAGE_JOB_RETRY_BASE_SECONDS", "10"))
+    IMAGE_JOB_RETRY_MAX_SECONDS: float = float(os.getenv("IMAGE_JOB_RETRY_MAX_SECONDS", "900"))
+    IMAGE_JOB_BATCH_SIZE: int = int(os.getenv("IMAGE_JOB_BATCH_SIZE", "4"))
+    IMAGE_JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("IMAGE_JOB_POLL_INTERVAL_SECONDS", "5"))
+    IMAGE_JOB_LEASE_SECONDS: int = int(os.getenv("IMAGE_JOB_LEASE_SECONDS", "600"))
+    # Uploads wait here for the image worker; must be shared with standalone workers
+    IMAGE_STAGING_DIR: str = os.getenv("IMAGE_STAGING_DIR", os.path.join(tempfile.gettempdir(), "course-image-uploads"))
+
+    # Remote image deletion settings
+    IMAGE_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("IMAGE_SWEEP_INTERVAL_SECONDS", "30"))
+    IMAGE_SWEEP_BATCH_SIZE: int = int(os.getenv("IMAGE_SWEEP_BATCH_SIZE", "100"))  # Cloudinary deletes at most 100 per call
+    IMAGE_SWEEP_LEASE_SECONDS: int = int(os.getenv("IMAGE_SWEEP_LEASE_SECONDS", "300"))
+    IMAGE_SWEEP_MAX_ATTEMPTS: int = int(os.getenv("IMAGE_SWEEP_MAX_ATTEMPTS", "8"))
+    IMAGE_SWEEP_RETRY_BASE_SECONDS: float = float(os.getenv("IMAGE_SWEEP_RETRY_BASE_SECONDS", "30"))
+    IMAGE_SWEEP_RETRY_MAX_SECONDS: float = float(os.getenv("IMAGE_SWEEP_RETRY_MAX_SECONDS", "3600"))
+    IMAGE_ORPHAN_SCAN_INTERVAL_SECONDS: int = int(os.getenv("IMAGE_ORPHAN_SCAN_INTERVAL_SECONDS", "86400"))
+    IMAGE_ORPHAN_GRACE_HOURS: int = int(os.getenv("IMAGE_ORPHAN_GRACE_HOURS", "24"))
+
+    # Image storage settings
+    IMAGE_STORAGE_BACKEND: str = os.getenv("IMAGE_STORAGE_BACKEND", "cloudinary")  # cloudinary or local
+    LOCAL_MEDIA_ROOT: str = os.getenv("LOCAL_MEDIA_ROOT", "media")
+    LOCAL_MEDIA_URL: str = os.getenv("LOCAL_MEDIA_URL", f"{API_V1_PREFIX}/media")  # Public URL the media router is served at
+
+    # Direct upload settings
+    IMAGE_UPLOAD_TICKET_TTL_SECONDS: int = int(os.getenv("IMAGE_UPLOAD_TICKET_TTL_SECONDS", "600"))
+    IMAGE_UPLOAD_FORMATS: str = os.getenv("IMAGE_UPLOAD_FORMATS", "jpg,png,webp")
+
+settings = Settings()
@@ -0,0 +1,80 @@
+"""
+Helpers for single-round-trip writes
+Inserts return the new row directly and constraint violations are mapped to HTTP errors
+"""
+from typing import Any, Dict, NoReturn, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+def insert_returning(
+    db: Session,
+    model,
+    values: Dict[str, Any],
+    unless_exists=None,
+    also: Sequence[Any] = ()
+):
+    """
+    Insert one row and return the ORM object in the same statement.
+
+    If unless_exists is an EXISTS clause, the row is inserted via
+    INSERT ... SELECT ... WHERE NOT EXISTS and None is returned when it matched,
+    which lets duplicate checks without a backing constraint share the round trip.
+    Expressions in also (e.g. a scalar subquery on the new row) are returned with
+    it, as an (object, *also) row.
+    """
+    stmt = insert(model)
+    if unless_exists is None:
+        stmt = stmt.values(**values)
+    else:
+        columns = list(values)
+        row = select(*[
+            literal(values[column], type_=model.__table__.c[column].type)
+            for column in columns
+        ]).where(~unless_exists)
+        stmt = stmt.from_select(columns, row)
+
+    if also:
+        return db.execute(stmt.returning(model, *also)).first()
+    return db.scalars(stmt.returning(model)).first()
+
+
+def commit_keep_loaded(db: Session) -> None:
+    """
+    Commit without expiring the session's objects, so rows that came back from
+    INSERT ... RETURNING are used as loaded instead of being reloaded on next access
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def get_constraint_name(exc: IntegrityError) -> Optional[str]:
+    """Name of the violated constraint when the driver reports it (psycopg2 does)"""
+    diag = getattr(exc.orig, "diag", None)
+    return getattr(diag, "constraint_name", None)
+
+
+def raise_for_integrity_error(exc: IntegrityError, details: Dict[str, str]) -> NoReturn:
+    """
+    Translate a constraint violation into a 400 response.
+
+    details maps a column name (e.g. "student_id") to the error message used
+    when the violated constraint or driver message mentions that column.
+    Unknown violations are re-raised unchanged.
+    """
+    constraint_name = get_constraint_name(exc) or ""
+    message = str(exc.orig)
+    for column, detail in details.items():
+        if column in constraint_name or column in message:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=detail
+            ) from exc
+    raise exc
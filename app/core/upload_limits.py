@@ -0,0 +1,79 @@
+"""
+Request body size limit enforced while the body is being received
+Oversized uploads are rejected from the Content-Length header, or as soon as
+the streamed body crosses the limit, before the multipart parser spools it
+"""
+from typing import Iterable
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestTooLarge(HTTPException):
+    def __init__(self, max_body_bytes: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request body must be less than {max_body_bytes // (1024 * 1024)}MB"
+        )
+
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware limiting POST/PUT/PATCH bodies under the given path prefixes
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int, path_prefixes: Iterable[str]):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("POST", "PUT", "PATCH")
+            or not scope["path"].startswith(self.path_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        too_large = RequestTooLarge(self.max_body_bytes)
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_bytes:
+                await self._reject(too_large, scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Raised inside body parsing; FastAPI re-raises HTTPExceptions as-is
+                    raise too_large
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestTooLarge as e:
+            if response_started:
+                raise
+            await self._reject(e, scope, receive, send)
+
+    @staticmethod
+    async def _reject(error: RequestTooLarge, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=error.status_code,
+            content={"detail": error.detail},
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,55 @@
+"""
+Direct Uploads - clients upload course images straight to storage
+The API only hands out a short-lived signed ticket and later verifies the
+finished upload, so image bytes never pass through the API workers
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+import jwt
+
+from app.auth.utils.token import UPLOAD_TICKET_TYPE, create_signed_token, decode_token
+from app.core.config import settings
+from app.services.storage import COURSE_IMAGE_FOLDER, image_storage
+
+
+def create_upload_ticket(course_id: int) -> Dict[str, Any]:
+    """
+    Sign a ticket for one image upload to a course
+
+    Returns:
+        Dictionary with ticket, upload_url, method, fields and expires_at
+    """
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.IMAGE_UPLOAD_TICKET_TTL_SECONDS)
+    folder = f"{COURSE_IMAGE_FOLDER}/{course_id}"
+    # A fresh name per ticket, so a pending tombstone never matches a new upload
+    name = f"course_{course_id}_{uuid.uuid4().hex[:8]}_direct"
+
+    ticket = create_signed_token(
+        f"{folder}/{name}",
+        UPLOAD_TICKET_TYPE,
+        expires_at,
+        course_id=course_id,
+        folder=folder,
+        name=name,
+        backend=image_storage.name
+    )
+    return {
+        "ticket": ticket,
+        "expires_at": expires_at,
+        **image_storage.create_upload(folder, name, ticket)
+    }
+
+
+def decode_upload_ticket(ticket: str) -> Dict[str, Any]:
+    """
+    Verify a ticket's signature and expiry
+
+    Raises:
+        jwt.InvalidTokenError: The ticket is not acceptable, or was issued for another storage backend
+    """
+    claims = decode_token(ticket, UPLOAD_TICKET_TYPE)
+    if claims.get("backend") != image_storage.name:
+        raise jwt.InvalidTokenError("Ticket was issued for another storage backend")
+    return claims
@@ -0,0 +1,246 @@
+"""
+Image Cleanup - deferred deletion of stored course images
+Write paths record images they stop referencing as tombstones in the same
+transaction; ImageSweeper deletes them in batches through the storage bulk delete
+with retries, and periodically tombstones stored images no course references
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import cast, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.courses.models import Course, ImageTombstone
+from app.services.cloudinary_service import CloudinaryService
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHUNK_SIZE = 1000
+REFERENCE_CHUNK_SIZE = 100
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(settings.IMAGE_SWEEP_RETRY_MAX_SECONDS, settings.IMAGE_SWEEP_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    return random.uniform(0, ceiling)
+
+
+def tombstone_images(db: Session, public_ids: Iterable[str]) -> None:
+    """
+    Queue remote images for deletion; the caller commits
+
+    Already queued images are skipped.
+    """
+    public_ids = list(dict.fromkeys(public_ids))
+    for start in range(0, len(public_ids), INSERT_CHUNK_SIZE):
+        chunk = public_ids[start:start + INSERT_CHUNK_SIZE]
+        db.execute(
+            pg_insert(ImageTombstone)
+            .values([{"public_id": public_id, "status": "pending", "attempts": 0} for public_id in chunk])
+            .on_conflict_do_nothing(index_elements=[ImageTombstone.public_id])
+        )
+
+
+def referenced_image_ids(db: Session, public_ids: Iterable[str]) -> Set[str]:
+    """
+    The given public IDs that a course still references as its image or a variant
+
+    Only courses matching the IDs are read, one query per REFERENCE_CHUNK_SIZE IDs.
+    """
+    public_ids = list(dict.fromkeys(public_ids))
+    variants = cast(Course.image_variants, JSONB)
+    referenced = set()
+    for start in range(0, len(public_ids), REFERENCE_CHUNK_SIZE):
+        chunk = public_ids[start:start + REFERENCE_CHUNK_SIZE]
+        matches = db.execute(
+            select(Course.image_public_id, Course.image_variants)
+            .where(or_(
+                Course.image_public_id.in_(chunk),
+                *[variants.contains([{"public_id": public_id}]) for public_id in chunk]
+            ))
+        )
+        for image_public_id, image_variants in matches:
+            referenced.add(image_public_id)
+            referenced.update(variant["public_id"] for variant in image_variants or [])
+    return referenced.intersection(public_ids)
+
+
+def tombstone_orphans(db: Session) -> int:
+    """
+    Tombstone remote course images that no course references
+
+    Images younger than IMAGE_ORPHAN_GRACE_HOURS are left alone, since an image
+    job may have uploaded them and not yet attached them to its course.
+
+    Returns:
+        Number of orphans found
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.IMAGE_ORPHAN_GRACE_HOURS)
+    candidates = [
+        resource["public_id"]
+        for resource in CloudinaryService.list_images()
+        if datetime.fromisoformat(resource["created_at"].replace("Z", "+00:00")) < cutoff
+    ]
+    referenced = referenced_image_ids(db, candidates)
+    orphans = [public_id for public_id in candidates if public_id not in referenced]
+    tombstone_images(db, orphans)
+    db.commit()
+    return len(orphans)
+
+
+class ImageSweeper:
+    """
+    Claims due tombstones with FOR UPDATE SKIP LOCKED and deletes each batch with
+    one bulk API call. Claimed rows are leased by pushing next_attempt_at forward,
+    so a crashed sweeper's rows become due again after the lease.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.IMAGE_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = settings.IMAGE_SWEEP_BATCH_SIZE,
+        lease_seconds: int = settings.IMAGE_SWEEP_LEASE_SECONDS,
+        max_attempts: int = settings.IMAGE_SWEEP_MAX_ATTEMPTS,
+        orphan_scan_interval: int = settings.IMAGE_ORPHAN_SCAN_INTERVAL_SECONDS
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.orphan_scan_interval = orphan_scan_interval
+        self._next_orphan_scan = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def _claim_batch(self, db: Session) -> List[int]:
+        due = (
+            select(ImageTombstone.id)
+            .where(
+                ImageTombstone.status == "pending",
+                ImageTombstone.next_attempt_at <= func.now()
+            )
+            .order_by(ImageTombstone.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = db.scalars(
+            update(ImageTombstone)
+            .where(ImageTombstone.id.in_(due.scalar_subquery()))
+            .values(next_attempt_at=func.now() + timedelta(seconds=self.lease_seconds))
+            .returning(ImageTombstone.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return claimed
+
+    def sweep_once(self) -> int:
+        """
+        Delete one batch of due tombstones
+
+        Returns:
+            Number of tombstones claimed
+        """
+        db = SessionLocal()
+        try:
+            claimed = self._claim_batch(db)
+            if not claimed:
+                return 0
+
+            # The reference check, the remote delete and the tombstone delete share one
+            # transaction holding the tombstone rows, so the check sees every course
+            # write committed before the rows were locked
+            tombstones = db.scalars(
+                select(ImageTombstone)
+                .where(ImageTombstone.id.in_(claimed), ImageTombstone.status == "pending")
+                .with_for_update()
+            ).all()
+
+            # With content-addressed storage a new upload can get the public ID of a
+            # tombstoned image; anything referenced again is kept and its tombstone dropped
+            referenced = referenced_image_ids(db, [tombstone.public_id for tombstone in tombstones])
+            outcome = {tombstone.public_id: True for tombstone in tombstones if tombstone.public_id in referenced}
+            to_delete = [tombstone.public_id for tombstone in tombstones if tombstone.public_id not in referenced]
+
+            error = None
+            if to_delete:
+                try:
+                    outcome.update(CloudinaryService.delete_images(to_delete))
+                except Exception as e:
+                    error = str(e)
+
+            done = [tombstone.id for tombstone in tombstones if outcome.get(tombstone.public_id)]
+            if done:
+                db.execute(
+                    delete(ImageTombstone)
+                    .where(ImageTombstone.id.in_(done))
+                    .execution_options(synchronize_session=False)
+                )
+
+            now = datetime.now(timezone.utc)
+            for tombstone in tombstones:
+                if outcome.get(tombstone.public_id):
+                    continue
+                tombstone.attempts += 1
+                tombstone.last_error = error or "not deleted"
+                if tombstone.attempts >= self.max_attempts:
+                    tombstone.status = "failed"
+                    logger.error(f"Giving up deleting image {tombstone.public_id}: {tombstone.last_error}")
+                else:
+                    tombstone.next_attempt_at = now + timedelta(seconds=retry_delay(tombstone.attempts))
+            db.commit()
+            return len(claimed)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _scan_orphans() -> int:
+        db = SessionLocal()
+        try:
+            return tombstone_orphans(db)
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                while await asyncio.to_thread(self.sweep_once) == self.batch_size:
+                    if self._stopping.is_set():
+                        break
+            except Exception as e:
+                logger.error(f"Image sweep error: {str(e)}")
+
+            if time.monotonic() >= self._next_orphan_scan:
+                self._next_orphan_scan = time.monotonic() + self.orphan_scan_interval
+                try:
+                    orphans = await asyncio.to_thread(self._scan_orphans)
+                    if orphans:
+                        logger.info(f"Orphan scan queued {orphans} unreferenced course images for deletion")
+                except Exception as e:
+                    logger.error(f"Orphan image scan error: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+# Create global instance
+image_sweeper = ImageSweeper()
@@ -0,0 +1,354 @@
+"""
+Course Image Jobs - background processing of uploaded course images
+Requests stage the original file in IMAGE_STAGING_DIR, queue it in course_image_jobs
+and return right away with image_status "pending"; CourseImageWorker builds the
+variants, uploads them and updates the course, retrying transient failures with backoff
+
+Run a standalone worker with:
+    python -m app.courses.image_jobs
+"""
+import asyncio
+import logging
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
+
+from sqlalchemy import Row, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.courses.models import Course, CourseImageJob
+from app.courses.image_cleanup import tombstone_images
+from app.services.cloudinary_service import CloudinaryService
+from app.services.image_pipeline import InvalidImageError, shutdown_image_pool
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PENDING = "pending"
+IMAGE_READY = "ready"
+IMAGE_FAILED = "failed"
+
+STAGING_CHUNK_SIZE = 1024 * 1024
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(settings.IMAGE_JOB_RETRY_MAX_SECONDS, settings.IMAGE_JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    return random.uniform(0, ceiling)
+
+
+def stage_upload(source: BinaryIO) -> str:
+    """Copy an upload to the staging directory in chunks and return its path; blocking"""
+    os.makedirs(settings.IMAGE_STAGING_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=settings.IMAGE_STAGING_DIR, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as staged:
+            source.seek(0)
+            shutil.copyfileobj(source, staged, STAGING_CHUNK_SIZE)
+    except BaseException:
+        discard_staged([path])
+        raise
+    return path
+
+
+def read_staged(path: str) -> bytes:
+    """Read a staged upload; a missing file can't be retried, so it fails the job"""
+    try:
+        with open(path, "rb") as staged:
+            return staged.read()
+    except FileNotFoundError:
+        raise InvalidImageError("Uploaded file is no longer available")
+
+
+def discard_staged(paths: Iterable[str]) -> None:
+    """Remove staged uploads whose jobs are gone; call after the delete is committed"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove staged upload {path}: {str(e)}")
+
+
+def cancel_image_jobs(db: Session, course_id: int) -> List[str]:
+    """
+    Drop queued uploads for a course; a worker already processing one discards its result
+
+    Returns:
+        Staged files of the dropped jobs, for discard_staged once the caller commits
+    """
+    return list(db.scalars(
+        delete(CourseImageJob)
+        .where(CourseImageJob.course_id == course_id)
+        .returning(CourseImageJob.staged_path)
+    ))
+
+
+def enqueue_image(
+    db: Session,
+    course: Course,
+    staged_path: str,
+    filename: str,
+    content_type: Optional[str] = None
+) -> List[str]:
+    """
+    Queue a staged image for a course and mark the course pending; the caller commits
+
+    Any earlier job for the course is dropped, so only the latest upload is applied.
+
+    Returns:
+        Staged files of the replaced jobs, for discard_staged once the caller commits
+    """
+    replaced = cancel_image_jobs(db, course.id)
+    db.add(CourseImageJob(
+        course_id=course.id,
+        filename=filename,
+        content_type=content_type,
+        staged_path=staged_path,
+        attempts=0
+    ))
+    course.image_status = IMAGE_PENDING
+    course.image_error = None
+    return replaced
+
+
+class CourseImageWorker:
+    """
+    Claims due jobs with FOR UPDATE SKIP LOCKED and processes them concurrently.
+    Claimed rows are leased by pushing next_attempt_at forward, so a crashed
+    worker's jobs become due again after the lease.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.IMAGE_JOB_BATCH_SIZE,
+        poll_interval: float = settings.IMAGE_JOB_POLL_INTERVAL_SECONDS,
+        lease_seconds: int = settings.IMAGE_JOB_LEASE_SECONDS,
+        max_attempts: int = settings.IMAGE_JOB_MAX_ATTEMPTS
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        """Process new jobs now instead of at the next poll; call from the event loop"""
+        self._wakeup.set()
+
+    def _claim_batch(self, db: Session) -> List[Row]:
+        """Lease up to batch_size due jobs; only what processing needs is returned"""
+        due = (
+            select(CourseImageJob.id)
+            .where(CourseImageJob.next_attempt_at <= func.now())
+            .order_by(CourseImageJob.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = db.execute(
+            update(CourseImageJob)
+            .where(CourseImageJob.id.in_(due.scalar_subquery()))
+            .values(next_attempt_at=func.now() + timedelta(seconds=self.lease_seconds))
+            .returning(CourseImageJob.id, CourseImageJob.course_id, CourseImageJob.filename, CourseImageJob.staged_path)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return claimed
+
+    def _lock_current(self, db: Session, job_id: int) -> Optional[CourseImageJob]:
+        """Lock the job row; it is gone if a newer upload replaced it or the course was deleted"""
+        return db.scalar(
+            select(CourseImageJob).where(CourseImageJob.id == job_id).with_for_update()
+        )
+
+    def _apply(self, db: Session, claimed: Row, result: Any) -> None:
+        """Record one job's outcome, tombstoning images that are no longer referenced; blocking"""
+        job = self._lock_current(db, claimed.id)
+        if job is None:
+            if isinstance(result, dict):
+                tombstone_images(db, [variant["public_id"] for variant in result["variants"]])
+            db.commit()
+            return
+
+        course = db.get(Course, job.course_id)
+        staged_path = job.staged_path
+        job.attempts += 1
+
+        if isinstance(result, dict):
+            # Identical content keeps its public ID on content-addressed storage
+            new_ids = {variant["public_id"] for variant in result["variants"]}
+            tombstone_images(db, [public_id for public_id in course.stored_image_ids if public_id not in new_ids])
+            course.image_url = result["url"]
+            course.image_public_id = result["public_id"]
+            course.image_variants = result["variants"]
+            course.image_placeholder = result["placeholder"]
+            course.image_status = IMAGE_READY
+            course.image_error = None
+            db.delete(job)
+            db.commit()
+            discard_staged([staged_path])
+            return
+
+        error = str(result) or type(result).__name__
+        if isinstance(result, InvalidImageError) or job.attempts >= self.max_attempts:
+            logger.error(f"Image for course {job.course_id} failed after {job.attempts} attempts: {error}")
+            course.image_status = IMAGE_FAILED
+            course.image_error = error
+            db.delete(job)
+            db.commit()
+            discard_staged([staged_path])
+            return
+
+        logger.warning(f"Image for course {job.course_id} failed (attempt {job.attempts}), retrying: {error}")
+        job.last_error = error
+        job.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=retry_delay(job.attempts))
+        db.commit()
+
+    def _record_error(self, db: Session, job_id: int, course_id: int, result: Any, error: Exception) -> None:
+        """
+        Count an attempt whose outcome could not be recorded, so the job is retried
+        with backoff (or failed) instead of blocking the rest of the batch
+        """
+        message = f"Could not record image result: {str(error) or type(error).__name__}"
+        try:
+            if isinstance(result, dict):
+                # The variants were stored but never attached to the course
+                tombstone_images(db, [variant["public_id"] for variant in result["variants"]])
+            attempts = db.scalar(
+                update(CourseImageJob)
+                .where(CourseImageJob.id == job_id)
+                .values(attempts=CourseImageJob.attempts + 1, last_error=message)
+                .returning(CourseImageJob.attempts)
+            )
+            if attempts is not None and attempts >= self.max_attempts:
+                logger.error(f"Image for course {course_id} failed after {attempts} attempts: {message}")
+                db.execute(
+                    update(Course)
+                    .where(Course.id == course_id)
+                    .values(image_status=IMAGE_FAILED, image_error=message)
+                )
+                staged_path = db.scalar(
+                    delete(CourseImageJob).where(CourseImageJob.id == job_id).returning(CourseImageJob.staged_path)
+                )
+                db.commit()
+                if staged_path is not None:
+                    discard_staged([staged_path])
+                return
+            if attempts is not None:
+                db.execute(
+                    update(CourseImageJob)
+                    .where(CourseImageJob.id == job_id)
+                    .values(next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=retry_delay(attempts)))
+                )
+            db.commit()
+        except Exception as e:
+            # The lease still runs out, so the job is claimed again later
+            db.rollback()
+            logger.error(f"Failed to record image job {job_id} error: {str(e)}")
+
+    async def _process(self, job: Row) -> Dict[str, Any]:
+        # Each file is read only when its job runs
+        content = await asyncio.to_thread(read_staged, job.staged_path)
+        return await CloudinaryService.upload_course_image_content(content, job.filename, job.course_id)
+
+    async def process_once(self) -> int:
+        """
+        Process one batch of due jobs
+
+        Returns:
+            Number of jobs claimed
+        """
+        db = SessionLocal()
+        try:
+            # Blocking database calls run in a thread so the event loop keeps serving
+            jobs = await asyncio.to_thread(self._claim_batch, db)
+            if not jobs:
+                return 0
+
+            results = await asyncio.gather(
+                *[self._process(job) for job in jobs],
+                return_exceptions=True
+            )
+
+            for job, result in zip(jobs, results):
+                try:
+                    await asyncio.to_thread(self._apply, db, job, result)
+                except Exception as e:
+                    await asyncio.to_thread(db.rollback)
+                    logger.error(f"Failed to apply image job {job.id} for course {job.course_id}: {str(e)}")
+                    await asyncio.to_thread(self._record_error, db, job.id, job.course_id, result, e)
+            return len(jobs)
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        """Process the queue until stop() is called"""
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.process_once()
+            except Exception as e:
+                logger.error(f"Course image worker error: {str(e)}")
+                claimed = 0
+
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+
+def get_image_status(db: Session, course: Course) -> Dict[str, Any]:
+    """Image processing state of a course, for status polling"""
+    job = db.execute(
+        select(CourseImageJob.attempts, CourseImageJob.last_error, CourseImageJob.next_attempt_at)
+        .where(CourseImageJob.course_id == course.id)
+    ).first()
+    return {
+        "course_id": course.id,
+        "image_status": course.image_status,
+        "image_error": course.image_error,
+        "image_url": course.image_url,
+        "attempts": job.attempts if job else None,
+        "last_error": job.last_error if job else None,
+        "next_attempt_at": job.next_attempt_at if job else None
+    }
+
+
+# Create global instance
+course_image_worker = CourseImageWorker()
+
+
+async def main() -> None:
+    """Standalone worker process entry point"""
+    try:
+        await course_image_worker.run()
+    finally:
+        shutdown_image_pool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,79 @@
+"""
+One-off migration adding the image processing columns to an existing courses table
+- image_variants: generated variants as JSON
+- image_placeholder: blurred preview data URI
+- image_status / image_error: background processing state
+
+Queued jobs that still hold the upload in course_image_jobs.data are moved to
+files in IMAGE_STAGING_DIR and the column is replaced by staged_path; run it
+where the image workers can read that directory.
+
+Safe to re-run; create_all only adds these for new databases.
+
+    python -m app.courses.migrate_course_images
+"""
+import io
+import logging
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.courses.image_jobs import discard_staged, stage_upload
+from app.database import SessionLocal
+from app.notifications.migrate_native_keys import _column_type
+
+logger = logging.getLogger(__name__)
+
+COURSE_IMAGE_COLUMNS = [
+    ("image_variants", "json"),
+    ("image_placeholder", "text"),
+    ("image_status", "varchar(20)"),
+    ("image_error", "text"),
+]
+
+
+def add_course_image_columns(db: Session) -> None:
+    for column, column_type in COURSE_IMAGE_COLUMNS:
+        db.execute(text(f"ALTER TABLE IF EXISTS courses ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+    logger.info("courses image columns are present")
+
+
+def stage_job_data(db: Session, staged: List[str]) -> None:
+    if _column_type(db, "course_image_jobs", "data") is None:
+        return
+    if _column_type(db, "course_image_jobs", "staged_path") is None:
+        db.execute(text("ALTER TABLE course_image_jobs ADD COLUMN staged_path varchar(500)"))
+
+    job_ids = db.scalars(text("SELECT id FROM course_image_jobs WHERE staged_path IS NULL")).all()
+    for job_id in job_ids:
+        # One row at a time, so the whole queue is never in memory
+        content = db.scalar(text("SELECT data FROM course_image_jobs WHERE id = :id"), {"id": job_id})
+        path = stage_upload(io.BytesIO(content))
+        staged.append(path)
+        db.execute(text("UPDATE course_image_jobs SET staged_path = :path WHERE id = :id"), {"path": path, "id": job_id})
+
+    db.execute(text("ALTER TABLE course_image_jobs ALTER COLUMN staged_path SET NOT NULL"))
+    db.execute(text("ALTER TABLE course_image_jobs DROP COLUMN data"))
+    logger.info(f"course_image_jobs moved to staged files; {len(job_ids)} queued uploads staged")
+
+
+def migrate() -> None:
+    """Run every step in one transaction"""
+    db = SessionLocal()
+    staged: List[str] = []
+    try:
+        add_course_image_columns(db)
+        stage_job_data(db, staged)
+        db.commit()
+    except Exception:
+        db.rollback()
+        discard_staged(staged)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, Double
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, Double, JSON, ForeignKey, Index
+from typing import List
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -20,5 +21,69 @@ class Course(Base):
     is_active = Column(Boolean, default=True)
     image_url = Column(String(500), nullable=True)
     image_public_id = Column(String(100), nullable=True)
+    image_variants = Column(JSON, nullable=True)  # [{format, width, height, url, public_id}]
+    image_placeholder = Column(Text, nullable=True)  # Blurred preview as a data URI
+    image_status = Column(String(20), nullable=True)  # pending, ready, failed; None when no image was uploaded
+    image_error = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+    @property
+    def stored_image_ids(self) -> List[str]:
+        """Public IDs of every stored image: the main image and all of its variants"""
+        public_ids = [variant["public_id"] for variant in self.image_variants or []]
+        if self.image_public_id and self.image_public_id not in public_ids:
+            public_ids.append(self.image_public_id)
+        return public_ids
+
+
+class CourseImageJob(Base):
+    """
+    Queued course image upload
+    Points at the original file in IMAGE_STAGING_DIR until the image worker has
+    processed and uploaded it; the row and file are removed once the course's
+    image_status is final
+    """
+    __tablename__ = "course_image_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(50), nullable=True)
+    staged_path = Column(String(500), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_course_image_jobs_next_attempt_at", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<CourseImageJob(id={self.id}, course_id={self.course_id}, attempts={self.attempts})>"
+
+
+class ImageTombstone(Base):
+    """
+    Remote image waiting to be deleted
+    Written in the same transaction that stops referencing the image and drained
+    in batches by the image sweeper
+    """
+    __tablename__ = "image_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    public_id = Column(String(255), nullable=False, unique=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_image_tombstones_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<ImageTombstone(public_id={self.public_id}, status={self.status}, attempts={self.attempts})>"
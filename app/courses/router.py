@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Query, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import asyncio
 import json
 
 from app.database import get_db
+from app.core.config import settings
 from app.courses.models import Course
-from app.courses.schemas import Course, CourseCreate, CourseUpdate, ImageUploadResponse
+from app.courses.schemas import Course, CourseCreate, CourseUpdate, ImageUploadResponse, CourseImageStatus, UploadTicketResponse, FinalizeImageUpload
 from app.courses.services import CourseService
+from app.courses.image_jobs import get_image_status
+from app.courses.direct_upload import create_upload_ticket
 
 # add router
 router = APIRouter(
@@ -26,24 +30,29 @@ async def create_course(
     total_price: float = Form(...),
     discounted_price: Optional[float] = Form(None),
     is_active: bool = Form(True),
-    image: UploadFile = File(..., description="Course image file (JPEG, PNG, WebP) - REQUIRED"),
+    image: Optional[UploadFile] = File(None, description="Course image file (JPEG, PNG, WebP) - optional"),
     db: Session = Depends(get_db)
 ):
-    """Create a course with mandatory image upload"""
+    """
+    Create a course, optionally with its image; an attached image is processed in the
+    background (image_status = pending). Without one the course is created without an
+    image, and clients upload it directly with /{course_id}/image/upload-ticket and
+    /{course_id}/image/finalize
+    """
     try:
-        # Validate image (now mandatory)
-        allowed_types = ["image/jpeg", "image/png", "image/webp", "image/jpg"]
-        if image.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only JPEG, PNG, and WebP images are allowed"
-            )
-        
-        if image.size > 5 * 1024 * 1024:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Image size must be less than 5MB"
-            )
+        if image is not None:
+            allowed_types = ["image/jpeg", "image/png", "image/webp", "image/jpg"]
+            if image.content_type not in allowed_types:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Only JPEG, PNG, and WebP images are allowed"
+                )
+            
+            if image.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Image size must be less than 5MB"
+                )
         
         # Create course data object
         course_data = CourseCreate(
@@ -59,6 +68,8 @@ async def create_course(
             is_active=is_active
         )
         
+        if image is None:
+            return await asyncio.to_thread(CourseService.create_course, db, course_data)
         return await CourseService.create_course_with_image(db, course_data, image)
         
     except HTTPException as he:
@@ -128,7 +139,7 @@ async def upload_course_image(
     image: UploadFile = File(..., description="Course image file (JPEG, PNG, WebP)"),
     db: Session = Depends(get_db)
 ):
-    """Upload or update course image"""
+    """Upload or update course image; the current image is served until the new one is ready"""
     try:
         # Validate file type
         allowed_types = ["image/jpeg", "image/png", "image/webp", "image/jpg"]
@@ -139,7 +150,7 @@ async def upload_course_image(
             )
         
         # Validate file size (5MB max)
-        if image.size > 5 * 1024 * 1024:
+        if image.size > settings.IMAGE_UPLOAD_MAX_BYTES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Image size must be less than 5MB"
@@ -154,6 +165,47 @@ async def upload_course_image(
             detail=f"Error uploading course image: {str(e)}"
         )
 
+@router.post("/{course_id}/image/upload-ticket", response_model=UploadTicketResponse)
+def get_image_upload_ticket(course_id: int, db: Session = Depends(get_db)):
+    """Get a short-lived signed ticket to upload an image straight to storage, then call finalize"""
+    try:
+        CourseService.get_course_by_id(db, course_id)
+        return create_upload_ticket(course_id)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating upload ticket: {str(e)}"
+        )
+
+@router.post("/{course_id}/image/finalize", response_model=Course)
+def finalize_image_upload(course_id: int, upload: FinalizeImageUpload, db: Session = Depends(get_db)):
+    """Verify a direct upload and attach it as the course image"""
+    try:
+        return CourseService.finalize_image_upload(db, course_id, upload.ticket, upload.receipt)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error finalizing image upload: {str(e)}"
+        )
+
+@router.get("/{course_id}/image/status", response_model=CourseImageStatus)
+def get_course_image_status(course_id: int, db: Session = Depends(get_db)):
+    """Poll background image processing for a course"""
+    try:
+        course = CourseService.get_course_by_id(db, course_id)
+        return get_image_status(db, course)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching course image status: {str(e)}"
+        )
+
 @router.delete("/{course_id}/image", response_model=Course)
 def delete_course_image(course_id: int, db: Session = Depends(get_db)):
     """Delete course image"""
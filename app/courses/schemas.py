@@ -1,6 +1,14 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+
+class ImageVariant(BaseModel):
+    format: str
+    width: int
+    height: int
+    url: str
+    public_id: str
 
 
 class CourseBase(BaseModel):
@@ -16,6 +24,10 @@ class CourseBase(BaseModel):
     is_active: bool = True
     image_url: Optional[str] = None
     image_public_id: Optional[str] = None
+    image_variants: Optional[List[ImageVariant]] = None
+    image_placeholder: Optional[str] = None
+    image_status: Optional[str] = None  # pending, ready, failed
+    image_error: Optional[str] = None
 
 
 class CourseCreate(BaseModel):
@@ -48,6 +60,17 @@ class CourseInDBBase(CourseBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        """srcset per format, e.g. {"webp": "<url> 320w, <url> 640w"}"""
+        if not self.image_variants:
+            return None
+        srcset: Dict[str, List[str]] = {}
+        for variant in sorted(self.image_variants, key=lambda v: v.width):
+            srcset.setdefault(variant.format, []).append(f"{variant.url} {variant.width}w")
+        return {image_format: ", ".join(entries) for image_format, entries in srcset.items()}
+
     class Config:
         from_attributes = True
 
@@ -60,4 +83,24 @@ class CourseInDB(CourseInDBBase):
 # Additional schema for image upload response
 class ImageUploadResponse(BaseModel):
     url: str
-    public_id: str
\ No newline at end of file
+    public_id: str
+
+class CourseImageStatus(BaseModel):
+    course_id: int
+    image_status: Optional[str] = None
+    image_error: Optional[str] = None
+    image_url: Optional[str] = None
+    attempts: Optional[int] = None  # Attempts so far while the job is queued
+    last_error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+
+class UploadTicketResponse(BaseModel):
+    ticket: str
+    upload_url: str
+    method: str  # POST (multipart form with fields and file) or PUT (raw file body)
+    fields: Dict[str, Any] = {}
+    expires_at: datetime
+
+class FinalizeImageUpload(BaseModel):
+    ticket: str
+    receipt: Optional[str] = None  # Returned by the local storage upload endpoint
@@ -2,10 +2,19 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from fastapi import HTTPException, status, UploadFile
 from typing import Optional, List
+import asyncio
+import jwt
 
 from app.courses.models import Course
+from app.courses.image_jobs import (
+    IMAGE_READY, cancel_image_jobs, course_image_worker, discard_staged, enqueue_image, stage_upload
+)
+from app.courses.direct_upload import decode_upload_ticket
+from app.courses.image_cleanup import tombstone_images
 from app.courses.schemas import CourseCreate, CourseUpdate
-from app.services.cloudinary_service import CloudinaryService
+from app.core.cache import entity_cache
+from app.core.config import settings
+from app.services.storage import UploadVerificationError, image_storage
 
 
 class CourseService:
@@ -68,9 +77,9 @@ class CourseService:
         course_data: CourseCreate, 
         image_file: UploadFile
     ) -> Course:
-        """Create a course with mandatory image upload"""
+        """Create a course and queue its image; image_status is pending until processed"""
+        staged_path = await asyncio.to_thread(stage_upload, image_file.file)
         
-        # Create the course first
         db_course = Course(
             course_title=course_data.course_title,
             description=course_data.description,
@@ -83,26 +92,19 @@ class CourseService:
             discounted_price=course_data.discounted_price,
             is_active=course_data.is_active
         )
-        
-        db.add(db_course)
-        db.commit()
-        db.refresh(db_course)
-        
-        # Upload the image (mandatory)
         try:
-            image_result = await CloudinaryService.upload_course_image(image_file, db_course.id)
-            db_course.image_url = image_result["url"]
-            db_course.image_public_id = image_result["public_id"]
-            db.commit()
-            db.refresh(db_course)
-        except Exception as e:
-            # If image upload fails, delete the created course (rollback)
-            db.delete(db_course)
+            db.add(db_course)
+            db.flush()
+            
+            # Course and image job are committed together, so an accepted image is never lost
+            enqueue_image(db, db_course, staged_path, image_file.filename, image_file.content_type)
             db.commit()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Course creation failed - image upload error: {str(e)}"
-            )
+        except Exception:
+            db.rollback()
+            discard_staged([staged_path])
+            raise
+        db.refresh(db_course)
+        course_image_worker.wake()
         
         return db_course
     
@@ -121,20 +123,69 @@ class CourseService:
     
     @staticmethod
     async def update_course_image(db: Session, course_id: int, image_file: UploadFile) -> Course:
+        """Queue a new image; the old one is kept and served until the new one is ready"""
+        course = CourseService.get_course_by_id(db, course_id)
+        staged_path = await asyncio.to_thread(stage_upload, image_file.file)
+        
+        try:
+            replaced = enqueue_image(db, course, staged_path, image_file.filename, image_file.content_type)
+            db.commit()
+        except Exception:
+            db.rollback()
+            discard_staged([staged_path])
+            raise
+        discard_staged(replaced)
+        db.refresh(course)
+        course_image_worker.wake()
+        return course
+    
+    @staticmethod
+    def finalize_image_upload(db: Session, course_id: int, ticket: str, receipt: Optional[str] = None) -> Course:
+        """Verify a direct upload made with an upload ticket and attach it to the course"""
         course = CourseService.get_course_by_id(db, course_id)
         
-        # Delete old image if exists
-        if course.image_public_id:
-            CloudinaryService.delete_image(course.image_public_id)
+        try:
+            claims = decode_upload_ticket(ticket)
+        except jwt.InvalidTokenError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid or expired upload ticket"
+            )
+        if claims.get("course_id") != course_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload ticket was issued for another course"
+            )
+        
+        try:
+            uploaded = image_storage.verify_upload(claims["folder"], claims["name"], receipt)
+        except UploadVerificationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         
-        # Upload new image
-        image_result = await CloudinaryService.upload_course_image(image_file, course_id)
+        if uploaded["format"] not in settings.IMAGE_UPLOAD_FORMATS.split(",") or uploaded["bytes"] > settings.IMAGE_UPLOAD_MAX_BYTES:
+            # The provider accepted it, but we don't; remove it with the other deletions
+            tombstone_images(db, [uploaded["public_id"]])
+            db.commit()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only JPEG, PNG, and WebP images less than 5MB are allowed"
+            )
         
-        # Update course with new image info
-        course.image_url = image_result["url"]
-        course.image_public_id = image_result["public_id"]
+        # Direct uploads replace any queued upload and skip the local variant pipeline
+        cancelled = cancel_image_jobs(db, course_id)
+        tombstone_images(db, [public_id for public_id in course.stored_image_ids if public_id != uploaded["public_id"]])
+        course.image_url = uploaded["url"]
+        course.image_public_id = uploaded["public_id"]
+        course.image_variants = None
+        course.image_placeholder = None
+        course.image_status = IMAGE_READY
+        course.image_error = None
         
         db.commit()
+        discard_staged(cancelled)
         db.refresh(course)
         return course
     
@@ -142,13 +193,19 @@ class CourseService:
     def delete_course_image(db: Session, course_id: int) -> Course:
         course = CourseService.get_course_by_id(db, course_id)
         
-        if course.image_public_id:
-            CloudinaryService.delete_image(course.image_public_id)
-            course.image_url = None
-            course.image_public_id = None
-            
-            db.commit()
-            db.refresh(course)
+        # Drop a queued upload too, so it can't attach an image after the delete
+        cancelled = cancel_image_jobs(db, course_id)
+        tombstone_images(db, course.stored_image_ids)
+        course.image_url = None
+        course.image_public_id = None
+        course.image_variants = None
+        course.image_placeholder = None
+        course.image_status = None
+        course.image_error = None
+        
+        db.commit()
+        discard_staged(cancelled)
+        db.refresh(course)
         
         return course
     
@@ -162,12 +219,14 @@ class CourseService:
     def hard_delete_course(db: Session, course_id: int) -> None:
         course = CourseService.get_course_by_id(db, course_id)
         
-        # Delete associated image from Cloudinary
-        if course.image_public_id:
-            CloudinaryService.delete_image(course.image_public_id)
+        # Associated images are deleted from Cloudinary by the image sweeper
+        tombstone_images(db, course.stored_image_ids)
+        cancelled = cancel_image_jobs(db, course_id)
         
         db.delete(course)
         db.commit()
+        discard_staged(cancelled)
+        entity_cache.invalidate(Course, course_id)
     
     @staticmethod
     def restore_course_by_id(db: Session, course_id: int) -> Course:
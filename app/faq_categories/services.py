@@ -5,6 +5,7 @@ from typing import List, Optional
 
 from app.faq_categories.models import Faq_Category  # Added import
 from app.faq_categories.schemas import Faq_Category_Update  # Added import
+from app.core.cache import entity_cache
 
 class Faq_Category_Service:
 
@@ -82,4 +83,5 @@ class Faq_Category_Service:
         
         db.delete(faqCategory)
         db.commit()
+        entity_cache.invalidate(Faq_Category, faq_id)
         return True
\ No newline at end of file
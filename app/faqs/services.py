@@ -6,6 +6,7 @@ from typing import List, Optional
 from app.faqs.models import FAQ
 from app.faqs.schemas import FAQCreate, FAQUpdate
 from app.faq_categories.models import Faq_Category
+from app.core.cache import entity_cache
 
 class FAQService:
 
@@ -38,8 +39,7 @@ class FAQService:
     def create_faq(db: Session, faq_data: FAQCreate) -> FAQ:
         """Create a new FAQ"""
         # Check if category exists
-        category = db.query(Faq_Category).filter(Faq_Category.id == faq_data.category_id).first()
-        if not category:
+        if not entity_cache.exists(db, Faq_Category, faq_data.category_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Category with ID {faq_data.category_id} not found"
@@ -1,4 +1,5 @@
 #import 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine, Base
@@ -12,15 +13,69 @@ from app.payments.router import router as payment_router
 from app.faq_categories.router import router as faq_category_router
 from app.faqs.router import router as faq_router
 from app.notifications.router import router as notifications_router
+from app.media.router import router as media_router
 from app.core.config import settings
+from app.core.cache import entity_cache
+from app.core.upload_limits import RequestSizeLimitMiddleware
+from app.auth.utils.password import shutdown_hash_pool
+from app.auth.utils.token import check_signing_key
+from app.services.cloudinary_service import shutdown_upload_pool
+from app.services.image_pipeline import shutdown_image_pool
+from app.notifications.outbox_dispatcher import outbox_dispatcher
+from app.notifications.web_push_service import web_push_service
+from app.notifications.log_writer import notification_log_writer
+from app.notifications.token_health import token_sweeper
+from app.notifications.delivery_queue import delivery_worker
+from app.notifications.log_partitions import log_partition_maintainer
+from app.notifications.coalescer import notification_coalescer
+from app.bookings.events import booking_events
+from app.courses.image_jobs import course_image_worker
+from app.courses.image_cleanup import image_sweeper
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    check_signing_key()
+    await log_partition_maintainer.start()
+    await web_push_service.start()
+    notification_log_writer.start()
+    notification_coalescer.start()
+    outbox_dispatcher.start()
+    token_sweeper.start()
+    delivery_worker.start()
+    course_image_worker.start()
+    image_sweeper.start()
+    yield
+    # Shutdown
+    await image_sweeper.stop()
+    await course_image_worker.stop()
+    await delivery_worker.stop()
+    await token_sweeper.stop()
+    await outbox_dispatcher.stop()
+    await notification_coalescer.stop()
+    await notification_log_writer.stop()
+    await web_push_service.close()
+    await log_partition_maintainer.stop()
+    shutdown_hash_pool()
+    shutdown_upload_pool()
+    shutdown_image_pool()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.DESCRIPTION,
-    version=settings.VERSION
+    version=settings.VERSION,
+    lifespan=lifespan
+)
+
+# Reject oversized image uploads while the body is still arriving. Added before
+# CORS so CORS wraps it and the 413 carries the CORS headers browsers need to read it
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_body_bytes=settings.IMAGE_UPLOAD_MAX_BYTES + settings.UPLOAD_FORM_OVERHEAD_BYTES,
+    path_prefixes=[f"{settings.API_V1_PREFIX}/courses"]
 )
 
 # CORS middleware
@@ -43,6 +98,7 @@ app.include_router(payment_router, prefix=settings.API_V1_PREFIX)
 app.include_router(faq_category_router, prefix=settings.API_V1_PREFIX)
 app.include_router(faq_router, prefix=settings.API_V1_PREFIX)
 app.include_router(notifications_router, prefix=settings.API_V1_PREFIX)
+app.include_router(media_router, prefix=settings.API_V1_PREFIX)
 
 @app.get("/")
 def read_root():
@@ -50,7 +106,12 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "entity_cache": entity_cache.stats(),
+        "notification_coalescer": notification_coalescer.stats(),
+        "booking_stream": booking_events.stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
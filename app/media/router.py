@@ -0,0 +1,102 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+
+import jwt
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import FileResponse
+
+from app.auth.utils.token import UPLOAD_RECEIPT_TYPE, create_signed_token
+from app.core.config import settings
+from app.courses.direct_upload import decode_upload_ticket
+from app.services.storage import LocalStorage, image_storage, sniff_image_format
+
+router = APIRouter(
+    prefix="/media",
+    tags=["media"]
+)
+
+MEDIA_TYPES = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+@router.put("/uploads/{ticket}")
+async def upload_media(ticket: str, request: Request):
+    """
+    Direct upload endpoint of the local storage backend, standing in for a storage provider
+    Takes the raw image as the request body and returns a receipt to pass to finalize
+    """
+    if not isinstance(image_storage, LocalStorage):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Direct uploads go to the configured storage provider"
+        )
+    try:
+        claims = decode_upload_ticket(ticket)
+    except jwt.InvalidTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired upload ticket"
+        )
+
+    # Hash and write while receiving, so the size limit applies before the body is complete
+    digest = hashlib.sha256()
+    received = 0
+    head = b""
+    tmp_path = image_storage.temp_path()
+    try:
+        with open(tmp_path, "wb") as tmp_file:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > settings.IMAGE_UPLOAD_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Image size must be less than 5MB"
+                    )
+                if len(head) < 16:
+                    head += chunk[:16]
+                digest.update(chunk)
+                tmp_file.write(chunk)
+
+        image_format = sniff_image_format(head)
+        if image_format is None or image_format not in settings.IMAGE_UPLOAD_FORMATS.split(","):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only JPEG, PNG, and WebP images are allowed"
+            )
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    stored = image_storage.put_file(tmp_path, digest.hexdigest(), image_format)
+    receipt = create_signed_token(
+        claims["sub"],
+        UPLOAD_RECEIPT_TYPE,
+        datetime.fromtimestamp(claims["exp"], timezone.utc),
+        public_id=stored["public_id"]
+    )
+    return {"public_id": stored["public_id"], "url": stored["url"], "bytes": received, "receipt": receipt}
+
+@router.get("/{prefix}/{filename}")
+def get_media(prefix: str, filename: str):
+    """
+    Serve a locally stored image
+    Files are content-addressed and never change, so they are cacheable forever;
+    FileResponse handles Range requests and uses sendfile where the server supports it
+    """
+    path = image_storage.path_for(f"{prefix}/{filename}") if isinstance(image_storage, LocalStorage) else None
+    if path is None or not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES.get(path.suffix.lstrip("."), "application/octet-stream"),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
@@ -0,0 +1,351 @@
+"""
+Push Fan-out Benchmark - measures notification throughput against the local FCM stand-in
+
+Modes:
+    service   drive the fan-out engine and WebPushService directly (no database)
+    endpoint  call POST /notifications/send-to-all-students through the app with
+              synthetic tokens seeded into the token registry (needs DATABASE_URL)
+
+Examples:
+    python -m app.notifications.benchmark --tokens 20000
+    python -m app.notifications.benchmark --tokens 50000 --latency-ms 50 --dead-rate 0.05 --db
+    python -m app.notifications.benchmark --mode endpoint --tokens 10000
+    python -m app.notifications.benchmark --fcm-url http://127.0.0.1:9099 --tokens 20000
+
+Reports messages/sec, per-message latency percentiles, notification log write
+cost and memory. Synthetic users have negative ids, so they never collide with
+real users; rows written for them are deleted afterwards.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import resource
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BENCH_TOKEN_PREFIX = "bench-"
+DEAD_TOKEN_PREFIX = "dead-bench-"
+
+
+def _ensure_benchmark_env() -> None:
+    """
+    WebPushService needs VAPID settings at import time; generate a throwaway
+    key pair when none is configured so the benchmark runs on a bare checkout
+    """
+    os.environ.setdefault("FIREBASE_PROJECT_ID", "benchmark")
+    if os.getenv("VAPID_PRIVATE_KEY") and os.getenv("VAPID_PUBLIC_KEY"):
+        return
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    os.environ["VAPID_PRIVATE_KEY"] = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    os.environ["VAPID_PUBLIC_KEY"] = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    os.environ.setdefault("VAPID_CLAIM_EMAIL", "mailto:benchmark@example.com")
+
+
+class TimingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a transport and records the round-trip time of every request
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+        self.durations: List[float] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        self.durations.append(time.perf_counter() - start)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_targets(count: int, dead_rate: float, user_type: str = "student") -> List[Any]:
+    """
+    Build push targets with unique tokens; a dead_rate share use the stand-in's
+    dead prefix and are always answered as UNREGISTERED
+    """
+    from app.notifications.fanout import PushTarget
+
+    dead_every = int(1 / dead_rate) if dead_rate > 0 else 0
+    targets = []
+    for i in range(count):
+        prefix = DEAD_TOKEN_PREFIX if dead_every and i % dead_every == 0 else BENCH_TOKEN_PREFIX
+        targets.append(PushTarget(-(i + 1), user_type, f"{prefix}{uuid.uuid4().hex}"))
+    return targets
+
+
+async def _start_push_client(args, stub) -> TimingTransport:
+    from app.core.config import settings
+    from app.notifications.fcm_stub import create_app
+    from app.notifications.web_push_service import web_push_service
+
+    if args.fcm_url:
+        web_push_service.fcm_base_url = args.fcm_url.rstrip("/")
+        inner = httpx.AsyncHTTPTransport(
+            http2=settings.PUSH_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.PUSH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PUSH_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.PUSH_KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+    else:
+        web_push_service.fcm_base_url = "http://fcm-stub"
+        inner = httpx.ASGITransport(app=create_app(stub))
+
+    transport = TimingTransport(inner)
+    await web_push_service.close()
+    await web_push_service.start(transport=transport)
+    return transport
+
+
+def measure_log_writes(count: int) -> Dict[str, float]:
+    """
+    Time bulk-inserting count notification log rows the way NotificationLogWriter does
+    """
+    from app.core.config import settings
+    from app.notifications.log_writer import NotificationLogWriter
+    from app.notifications.models import NotificationLog
+
+    rows = [
+        {
+            "user_id": -(i + 1),
+            "user_type": "student",
+            "title": "Benchmark",
+            "body": "Benchmark notification",
+            "data": {"benchmark": "true"},
+            "fcm_token": f"{BENCH_TOKEN_PREFIX}{i}",
+            "success": True,
+            "error_message": None
+        }
+        for i in range(count)
+    ]
+    batch_size = settings.NOTIFICATION_LOG_BATCH_SIZE
+    start = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        NotificationLogWriter._insert_rows(rows[offset:offset + batch_size])
+    elapsed = time.perf_counter() - start
+
+    _cleanup_rows(NotificationLog)
+    return {
+        "rows": count,
+        "batch_size": batch_size,
+        "seconds": elapsed,
+        "rows_per_second": count / elapsed if elapsed else 0.0,
+        "ms_per_1k_rows": elapsed * 1000 / (count / 1000) if count else 0.0
+    }
+
+
+def _cleanup_rows(*models) -> None:
+    """Delete rows written for the synthetic (negative id) users"""
+    from sqlalchemy import delete
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        for model in models:
+            db.execute(delete(model).where(model.user_id < 0))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_service(args, stub) -> Dict[str, Any]:
+    """Fan out through FanoutEngine and WebPushService only"""
+    from app.notifications.fanout import FanoutEngine
+    from app.notifications.log_partitions import maintain_partitions
+    from app.notifications.web_push_service import web_push_service
+
+    if args.db:
+        # The log table needs this month's partition; the app's lifespan is not run here
+        await asyncio.to_thread(maintain_partitions)
+
+    transport = await _start_push_client(args, stub)
+    engine = FanoutEngine(concurrency=args.concurrency)
+    targets = synthetic_targets(args.tokens, args.dead_rate)
+
+    gc.collect()
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    summary = await engine.send(targets, "Benchmark", "Benchmark notification", {"benchmark": "true"})
+    elapsed = time.perf_counter() - start
+    rss_after = _rss_mb()
+    await web_push_service.close()
+
+    report = _report(summary, elapsed, transport.durations, rss_before, rss_after)
+    if args.db:
+        report["log_writes"] = await asyncio.to_thread(measure_log_writes, args.tokens)
+    return report
+
+
+async def run_endpoint(args, stub) -> Dict[str, Any]:
+    """Fan out through the send-to-all-students endpoint, including logging and token health"""
+    from app.database import SessionLocal
+    from app.core.config import settings
+    from app.main import app
+    from app.notifications.fanout import fanout_engine
+    from app.notifications.log_partitions import maintain_partitions
+    from app.notifications.log_writer import notification_log_writer
+    from app.notifications.models import NotificationInbox, NotificationLog, NotificationUnreadCount, PushDelivery
+    from app.notifications.token_registry import token_registry
+    from app.notifications.web_push_service import web_push_service
+
+    # ASGITransport does not run the app's lifespan, so set up what it would
+    await asyncio.to_thread(maintain_partitions)
+    transport = await _start_push_client(args, stub)
+    fanout_engine.concurrency = args.concurrency
+    notification_log_writer.start()
+
+    # Load the real registry once, then keep the synthetic tokens for the whole run
+    db = SessionLocal()
+    try:
+        token_registry.reload(db)
+    finally:
+        db.close()
+    token_registry.refresh_seconds = float("inf")
+    targets = synthetic_targets(args.tokens, args.dead_rate)
+    for target in targets:
+        token_registry.register(target)
+
+    gc.collect()
+    rss_before = _rss_mb()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api", timeout=None) as client:
+            start = time.perf_counter()
+            response = await client.post(
+                f"{settings.API_V1_PREFIX}/notifications/send-to-all-students",
+                json={
+                    "user_type": "student",
+                    "title": "Benchmark",
+                    "body": "Benchmark notification",
+                    "data": {"benchmark": "true"}
+                }
+            )
+            elapsed = time.perf_counter() - start
+        response.raise_for_status()
+
+        # Remaining buffered log rows
+        drain_start = time.perf_counter()
+        await notification_log_writer.stop()
+        log_drain = time.perf_counter() - drain_start
+        rss_after = _rss_mb()
+    finally:
+        token_registry.deactivate(target.fcm_token for target in targets)
+        await web_push_service.close()
+        await asyncio.to_thread(
+            _cleanup_rows, NotificationLog, PushDelivery, NotificationInbox, NotificationUnreadCount
+        )
+
+    summary = {"total": len(targets), "success_count": stub.stats.get("success", 0) if stub else None}
+    report = _report(summary, elapsed, transport.durations, rss_before, rss_after)
+    report["endpoint_response"] = response.json()
+    report["log_drain_seconds"] = log_drain
+    return report
+
+
+def _report(summary: Dict[str, Any], elapsed: float, durations: List[float], rss_before: float, rss_after: float) -> Dict[str, Any]:
+    total = summary["total"]
+    return {
+        "messages": total,
+        "success_count": summary.get("success_count"),
+        "error_types": summary.get("error_types"),
+        "seconds": elapsed,
+        "messages_per_second": total / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": _percentile(durations, 50) * 1000,
+            "p95": _percentile(durations, 95) * 1000,
+            "p99": _percentile(durations, 99) * 1000,
+            "max": max(durations, default=0.0) * 1000
+        },
+        "peak_rss_mb": rss_after,
+        "peak_rss_growth_mb": rss_after - rss_before
+    }
+
+
+def _print_report(report: Dict[str, Any], indent: int = 0) -> None:
+    for key, value in report.items():
+        if isinstance(value, dict):
+            print(f"{' ' * indent}{key}:")
+            _print_report(value, indent + 2)
+        elif isinstance(value, float):
+            print(f"{' ' * indent}{key}: {value:.2f}")
+        else:
+            print(f"{' ' * indent}{key}: {value}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Push fan-out throughput benchmark")
+    parser.add_argument("--mode", choices=["service", "endpoint"], default="service")
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=None, help="Fan-out concurrency (default FANOUT_CONCURRENCY)")
+    parser.add_argument("--fcm-url", default=None, help="Use a running stand-in instead of the in-process one")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--dead-rate", type=float, default=0.0, help="Share of tokens answered as UNREGISTERED")
+    parser.add_argument("--unavailable-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limited-rate", type=float, default=0.0)
+    parser.add_argument("--db", action="store_true", help="Also measure notification log write cost (service mode)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # Per-message send logging would dominate the measurement
+    logging.getLogger("app.notifications").setLevel(logging.CRITICAL)
+    _ensure_benchmark_env()
+
+    from app.core.config import settings
+    from app.notifications.fcm_stub import FCMStub
+
+    if args.concurrency is None:
+        args.concurrency = settings.FANOUT_CONCURRENCY
+
+    stub = None
+    if not args.fcm_url:
+        stub = FCMStub(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            unavailable_rate=args.unavailable_rate,
+            rate_limited_rate=args.rate_limited_rate,
+            dead_token_prefix=DEAD_TOKEN_PREFIX,
+            seed=args.seed
+        )
+
+    runner = run_endpoint if args.mode == "endpoint" else run_service
+    report = asyncio.run(runner(args, stub))
+    if stub is not None:
+        report["stand_in_outcomes"] = stub.stats
+    _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Notification Coalescer - merges bursts of notifications before they are sent
+Notifications are keyed by (recipient, notification type, entity): repeats within
+the quiet window collapse into the latest one. Digest types are grouped per
+(recipient, notification type) over a fixed window and sent as one summary.
+Timers run on a hashed time wheel driven by a single background task.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.notifications.fanout import PushTarget
+from app.notifications.inbox import add_to_inbox, add_to_user_type_inbox
+from app.notifications.models import NotificationOutbox
+from app.notifications.notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+# Recipient kinds
+RECIPIENT_USER = "user"
+RECIPIENT_USER_TYPE = "user_type"
+
+# Most recent entity ids kept in a digest payload
+DIGEST_MAX_ENTITY_IDS = 50
+
+
+class TimeWheel:
+    """
+    Hashed timing wheel: O(1) schedule and cancel for any number of timers.
+    Each slot holds the timers due when the cursor reaches it, with a round
+    count for delays longer than one turn of the wheel. tick() is called
+    every tick_seconds and returns the timers that became due.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 3600):
+        self.tick_seconds = tick_seconds
+        self._slots: List[Dict[int, List[Any]]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[int, int] = {}
+        self._cursor = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def schedule(self, delay: float, payload: Any) -> int:
+        """
+        Schedule payload to become due after delay seconds (rounded up to a tick)
+
+        Returns:
+            Timer id for cancel()
+        """
+        ticks = max(1, math.ceil(delay / self.tick_seconds))
+        with self._lock:
+            timer_id = next(self._ids)
+            slot = (self._cursor + ticks) % len(self._slots)
+            self._slots[slot][timer_id] = [(ticks - 1) // len(self._slots), payload]
+            self._slot_of[timer_id] = slot
+        return timer_id
+
+    def cancel(self, timer_id: int) -> bool:
+        with self._lock:
+            slot = self._slot_of.pop(timer_id, None)
+            if slot is None:
+                return False
+            self._slots[slot].pop(timer_id, None)
+            return True
+
+    def tick(self) -> List[Tuple[int, Any]]:
+        """Advance one tick and return (timer id, payload) for every due timer"""
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            bucket = self._slots[self._cursor]
+            due = []
+            for timer_id, entry in list(bucket.items()):
+                if entry[0] > 0:
+                    entry[0] -= 1
+                    continue
+                del bucket[timer_id]
+                self._slot_of.pop(timer_id, None)
+                due.append((timer_id, entry[1]))
+            return due
+
+    def drain(self) -> List[Tuple[int, Any]]:
+        """Remove and return every scheduled timer"""
+        with self._lock:
+            pending = [(timer_id, entry[1]) for bucket in self._slots for timer_id, entry in bucket.items()]
+            for bucket in self._slots:
+                bucket.clear()
+            self._slot_of.clear()
+            return pending
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+
+def _new_booking_digest(count: int, window_minutes: int, entity_ids: List[str]) -> Tuple[str, str, Dict[str, Any]]:
+    return (
+        "New Bookings Received",
+        f"{count} new bookings in the last {window_minutes} minutes",
+        {
+            "type": "new_booking_digest",
+            "count": str(count),
+            "booking_ids": ",".join(entity_ids)
+        }
+    )
+
+
+# Digest message builders per notification type; other types get a generic summary
+DIGEST_FORMATTERS: Dict[str, Callable[[int, int, List[str]], Tuple[str, str, Dict[str, Any]]]] = {
+    "new_booking": _new_booking_digest,
+}
+
+
+class NotificationCoalescer:
+    """
+    Holds notifications briefly and sends one per key.
+
+    Coalesced types: each submit replaces the pending notification and restarts
+    the quiet window, capped at max_wait after the first submit so a steady
+    stream of edits still goes out.
+    Digest types: the first submit opens a fixed window; everything submitted
+    until it closes is sent as a single digest.
+    submit() is thread-safe, so sync services running in the threadpool can call it.
+
+    Notifications that come from the outbox pass their outbox id; those rows are
+    only marked dispatched once the merged notification has been sent, so a
+    restart while they are held here re-delivers them from the outbox.
+    """
+
+    def __init__(
+        self,
+        quiet_window: float = settings.NOTIFICATION_QUIET_WINDOW_SECONDS,
+        max_wait: float = settings.NOTIFICATION_COALESCE_MAX_WAIT_SECONDS,
+        digest_window: float = settings.NOTIFICATION_DIGEST_WINDOW_SECONDS,
+        digest_types: Optional[Set[str]] = None,
+        tick_seconds: float = settings.NOTIFICATION_WHEEL_TICK_SECONDS,
+        slots: int = settings.NOTIFICATION_WHEEL_SLOTS
+    ):
+        self.quiet_window = quiet_window
+        self.max_wait = max_wait
+        self.digest_window = digest_window
+        self.digest_types = digest_types if digest_types is not None else {
+            name.strip() for name in settings.NOTIFICATION_DIGEST_TYPES.split(",") if name.strip()
+        }
+        self.wheel = TimeWheel(tick_seconds, slots)
+        self._pending: Dict[Tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._stats = {"submitted": 0, "sent": 0}
+
+    def submit(
+        self,
+        recipient_kind: str,
+        recipient_id: Union[int, str],
+        notification_type: str,
+        entity_id: Optional[str],
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None,
+        outbox_id: Optional[int] = None
+    ) -> None:
+        """
+        Queue a notification for a user (RECIPIENT_USER) or every user of a type (RECIPIENT_USER_TYPE)
+
+        Args:
+            recipient_kind: RECIPIENT_USER or RECIPIENT_USER_TYPE
+            recipient_id: User id or user type
+            notification_type: Notification type, e.g. 'progress_report_updated'
+            entity_id: The entity the notification is about (report id, booking id)
+            title: Notification title
+            body: Notification body
+            data: Additional data payload (optional)
+            outbox_id: Outbox row to mark dispatched once this is sent (optional)
+        """
+        digest = notification_type in self.digest_types
+        key = (recipient_kind, recipient_id, notification_type, None if digest else entity_id)
+        now = time.monotonic()
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            pending = self._pending.get(key)
+            if digest and pending is not None and entity_id in pending["entity_ids"]:
+                # Redelivered event for an entity already in this digest
+                if outbox_id is not None:
+                    pending["outbox_ids"].add(outbox_id)
+                return
+
+            if pending is None:
+                pending = {
+                    "recipient_kind": recipient_kind,
+                    "recipient_id": recipient_id,
+                    "notification_type": notification_type,
+                    "digest": digest,
+                    "count": 0,
+                    "entity_ids": [],
+                    "outbox_ids": set(),
+                    "first_at": now,
+                    "timer": None
+                }
+                self._pending[key] = pending
+                delay = self.digest_window if digest else self.quiet_window
+                pending["timer"] = self.wheel.schedule(delay, key)
+            elif not digest:
+                # Restart the quiet window, but never past max_wait from the first submit
+                delay = min(self.quiet_window, pending["first_at"] + self.max_wait - now)
+                self.wheel.cancel(pending["timer"])
+                pending["timer"] = self.wheel.schedule(max(delay, 0), key)
+
+            pending["count"] += 1
+            pending["title"] = title
+            pending["body"] = body
+            pending["data"] = data
+            if outbox_id is not None:
+                pending["outbox_ids"].add(outbox_id)
+            if entity_id is not None:
+                pending["entity_ids"] = (pending["entity_ids"] + [entity_id])[-DIGEST_MAX_ENTITY_IDS:]
+
+    def hold_seconds(self, notification_type: str) -> float:
+        """Longest a submitted notification can be held before it is sent"""
+        held = self.digest_window if notification_type in self.digest_types else self.max_wait
+        return held + self.wheel.tick_seconds
+
+    def _take(self, key: Tuple, timer_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pending = self._pending.get(key)
+            # A rescheduled key's old timer may still fire once; ignore it
+            if pending is None or (timer_id is not None and pending["timer"] != timer_id):
+                return None
+            return self._pending.pop(key)
+
+    def _message(self, pending: Dict[str, Any]) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        if not pending["digest"] or pending["count"] == 1:
+            return pending["title"], pending["body"], pending["data"]
+
+        window_minutes = max(1, round(self.digest_window / 60))
+        formatter = DIGEST_FORMATTERS.get(pending["notification_type"])
+        if formatter is not None:
+            return formatter(pending["count"], window_minutes, pending["entity_ids"])
+        return (
+            pending["title"],
+            f"{pending['count']} updates in the last {window_minutes} minutes",
+            {
+                "type": f"{pending['notification_type']}_digest",
+                "count": str(pending["count"])
+            }
+        )
+
+    @staticmethod
+    def _add_to_inbox(db, pending: Dict[str, Any], title: str, body: str, data: Optional[Dict[str, Any]]) -> None:
+        if pending["recipient_kind"] == RECIPIENT_USER_TYPE:
+            add_to_user_type_inbox(db, pending["recipient_id"], title, body, data)
+        else:
+            add_to_inbox(db, [pending["recipient_id"]], title, body, data)
+
+    @staticmethod
+    def _recipient_tokens(service: NotificationService, pending: Dict[str, Any]) -> List[PushTarget]:
+        if pending["recipient_kind"] == RECIPIENT_USER_TYPE:
+            return service.get_tokens_by_user_type(pending["recipient_id"])
+        return service.get_user_tokens(pending["recipient_id"])
+
+    @staticmethod
+    def _mark_dispatched(db, outbox_ids: Set[int]) -> None:
+        db.execute(
+            update(NotificationOutbox)
+            .where(
+                NotificationOutbox.id.in_(outbox_ids),
+                NotificationOutbox.status == "pending"
+            )
+            .values(status="dispatched", dispatched_at=datetime.now(timezone.utc), last_error=None)
+        )
+        db.commit()
+
+    async def _send(self, pending: Dict[str, Any]) -> None:
+        title, body, data = self._message(pending)
+        db = SessionLocal()
+        try:
+            # Blocking database calls run in a thread; only the push fan-out stays on the loop
+            service = NotificationService(db)
+            # Every recipient gets the inbox entry, with or without a device, before the push arrives
+            await asyncio.to_thread(self._add_to_inbox, db, pending, title, body, data)
+            tokens = await asyncio.to_thread(self._recipient_tokens, service, pending)
+            if tokens:
+                await service.send_to_tokens(tokens, title, body, data)
+            if pending["outbox_ids"]:
+                await asyncio.to_thread(self._mark_dispatched, db, pending["outbox_ids"])
+            with self._lock:
+                self._stats["sent"] += 1
+        except Exception as e:
+            logger.error(f"Failed to send coalesced {pending['notification_type']} notification: {str(e)}")
+        finally:
+            db.close()
+
+    def _dispatch(self, pending: Dict[str, Any]) -> None:
+        task = asyncio.create_task(self._send(pending))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    async def run(self) -> None:
+        """Drive the time wheel until stop() is called"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while not self._stopping.is_set():
+            next_tick += self.wheel.tick_seconds
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=max(0, next_tick - loop.time()))
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            for timer_id, key in self.wheel.tick():
+                pending = self._take(key, timer_id)
+                if pending is not None:
+                    self._dispatch(pending)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Send everything still held, then stop"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+        for _, key in self.wheel.drain():
+            pending = self._take(key)
+            if pending is not None:
+                self._dispatch(pending)
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
+
+
+# Create global instance
+notification_coalescer = NotificationCoalescer()
@@ -0,0 +1,259 @@
+"""
+Push Delivery Queue - persisted retries for failed push sends
+Failed devices are queued with exponential backoff and drained by DeliveryWorker;
+several workers can drain the queue in parallel
+
+Run a standalone worker with:
+    python -m app.notifications.delivery_queue
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.notifications.fanout import PushTarget
+from app.notifications.log_writer import notification_log_writer
+from app.notifications.models import PushDelivery
+from app.notifications.token_health import apply_send_results
+from app.notifications.web_push_service import (
+    web_push_service,
+    ERROR_INTERNAL,
+    ERROR_NETWORK,
+    ERROR_RATE_LIMITED,
+    ERROR_UNAVAILABLE,
+    ERROR_UNKNOWN
+)
+
+logger = logging.getLogger(__name__)
+
+# Failures worth retrying; permanent token errors and bad requests are not. Neither
+# are sends that timed out or lost the connection after the request went out
+# (ERROR_UNCONFIRMED, fan-out deadlines): FCM may have delivered them, and a retry
+# would push the notification twice
+RETRYABLE_ERRORS = {ERROR_RATE_LIMITED, ERROR_UNAVAILABLE, ERROR_NETWORK, ERROR_INTERNAL, ERROR_UNKNOWN}
+
+
+def retry_delay(attempts: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before the next attempt
+    Exponential backoff with full jitter, never earlier than the server's Retry-After
+    """
+    ceiling = min(settings.PUSH_RETRY_MAX_SECONDS, settings.PUSH_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def enqueue_retries(
+    db: Session,
+    results: List[Tuple[Any, Dict[str, Any]]],
+    title: str,
+    body: str,
+    data: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Queue retryable failures from a fan-out in one bulk insert
+
+    Args:
+        db: Database session
+        results: (target, send result) pairs from the fan-out engine
+
+    Returns:
+        Number of deliveries queued
+    """
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "user_id": target.user_id,
+            "user_type": target.user_type,
+            "fcm_token": target.fcm_token,
+            "title": title,
+            "body": body,
+            "data": data,
+            "status": "pending",
+            "attempts": 1,
+            "next_attempt_at": now + timedelta(seconds=retry_delay(1, result.get("retry_after"))),
+            "last_error": result.get("error")
+        }
+        for target, result in results
+        if not result["success"] and result.get("error_type") in RETRYABLE_ERRORS
+    ]
+    if not rows:
+        return 0
+
+    try:
+        db.execute(insert(PushDelivery), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to queue {len(rows)} push retries: {str(e)}")
+        return 0
+    return len(rows)
+
+
+class DeliveryWorker:
+    """
+    Claims due deliveries with FOR UPDATE SKIP LOCKED, sends them concurrently
+    and records the outcome. Claimed rows are leased by pushing next_attempt_at
+    forward, so a crashed worker's rows become due again after the lease.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.PUSH_DELIVERY_BATCH_SIZE,
+        poll_interval: float = settings.PUSH_DELIVERY_POLL_INTERVAL_SECONDS,
+        lease_seconds: int = settings.PUSH_DELIVERY_LEASE_SECONDS,
+        max_attempts: int = settings.PUSH_MAX_ATTEMPTS,
+        concurrency: int = settings.FANOUT_CONCURRENCY
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def _claim_batch(self, db: Session) -> List[PushDelivery]:
+        due = (
+            select(PushDelivery.id)
+            .where(
+                PushDelivery.status == "pending",
+                PushDelivery.next_attempt_at <= func.now()
+            )
+            .order_by(PushDelivery.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = db.scalars(
+            update(PushDelivery)
+            .where(PushDelivery.id.in_(due.scalar_subquery()))
+            .values(next_attempt_at=func.now() + timedelta(seconds=self.lease_seconds))
+            .returning(PushDelivery)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return claimed
+
+    async def drain_once(self) -> int:
+        """
+        Send one batch of due deliveries
+
+        Returns:
+            Number of deliveries claimed
+        """
+        # Claimed rows are used after the claim commits, without reloading them on the loop
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            # Blocking database calls run in a thread so the event loop keeps serving
+            deliveries = await asyncio.to_thread(self._claim_batch, db)
+            if not deliveries:
+                return 0
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def send(delivery: PushDelivery) -> Dict[str, Any]:
+                async with semaphore:
+                    return await web_push_service.send_push_notification(
+                        fcm_token=delivery.fcm_token,
+                        title=delivery.title,
+                        body=delivery.body,
+                        data=delivery.data
+                    )
+
+            results = await asyncio.gather(*[send(delivery) for delivery in deliveries])
+
+            now = datetime.now(timezone.utc)
+            for delivery, result in zip(deliveries, results):
+                delivery.attempts += 1
+                if result["success"]:
+                    delivery.status = "sent"
+                    delivery.sent_at = now
+                    delivery.last_error = None
+                else:
+                    delivery.last_error = result.get("error")
+                    if result.get("error_type") not in RETRYABLE_ERRORS:
+                        delivery.status = "dead"
+                    elif delivery.attempts >= self.max_attempts:
+                        delivery.status = "failed"
+                    else:
+                        delivery.next_attempt_at = now + timedelta(
+                            seconds=retry_delay(delivery.attempts, result.get("retry_after"))
+                        )
+
+                await notification_log_writer.write({
+                    "user_id": delivery.user_id,
+                    "user_type": delivery.user_type,
+                    "title": delivery.title,
+                    "body": delivery.body,
+                    "data": delivery.data,
+                    "fcm_token": delivery.fcm_token,
+                    "success": result["success"],
+                    "error_message": result.get("error")
+                })
+            sent = [
+                (PushTarget(delivery.user_id, delivery.user_type, delivery.fcm_token), result)
+                for delivery, result in zip(deliveries, results)
+            ]
+            await asyncio.to_thread(db.commit)
+
+            await asyncio.to_thread(apply_send_results, db, sent)
+            return len(deliveries)
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        """Drain the queue until stop() is called"""
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Push delivery worker error: {str(e)}")
+                claimed = 0
+
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+# Create global instance
+delivery_worker = DeliveryWorker()
+
+
+async def main() -> None:
+    """Standalone worker process entry point"""
+    await web_push_service.start()
+    notification_log_writer.start()
+    try:
+        await delivery_worker.run()
+    finally:
+        await notification_log_writer.stop()
+        await web_push_service.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
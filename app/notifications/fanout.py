@@ -0,0 +1,205 @@
+"""
+Fan-out Engine - sends one notification to many devices concurrently
+Bounded by a semaphore, with a deadline per send and optional detached jobs.
+Detached job status is written to fanout_jobs, so a poll can land on any worker.
+"""
+import asyncio
+import inspect
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.notifications.web_push_service import ERROR_UNCONFIRMED, web_push_service
+
+logger = logging.getLogger(__name__)
+
+
+class PushTarget(NamedTuple):
+    """Session-independent copy of the token fields needed to send and log"""
+    user_id: int
+    user_type: str
+    fcm_token: str
+
+
+class FanoutEngine:
+    """
+    Shared engine for broadcasting a notification to a list of push targets
+    """
+
+    def __init__(
+        self,
+        concurrency: int = settings.FANOUT_CONCURRENCY,
+        call_timeout: float = settings.FANOUT_CALL_TIMEOUT_SECONDS,
+        max_jobs: int = settings.FANOUT_MAX_TRACKED_JOBS
+    ):
+        self.concurrency = concurrency
+        self.call_timeout = call_timeout
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def _send_one(
+        self,
+        semaphore: asyncio.Semaphore,
+        target: PushTarget,
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    web_push_service.send_push_notification(
+                        fcm_token=target.fcm_token,
+                        title=title,
+                        body=body,
+                        data=data
+                    ),
+                    timeout=self.call_timeout
+                )
+            except asyncio.TimeoutError:
+                # The request may already be with FCM, so this is not retried
+                return {
+                    "success": False,
+                    "error": f"Send timed out after {self.call_timeout}s",
+                    "error_type": ERROR_UNCONFIRMED,
+                    "permanent": False,
+                    "timed_out": True
+                }
+
+    async def send(
+        self,
+        targets: List[PushTarget],
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None,
+        on_result: Optional[Callable[[PushTarget, Dict[str, Any]], Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Send to every target concurrently and aggregate the outcome
+
+        Args:
+            targets: Devices to notify
+            title: Notification title
+            body: Notification body
+            data: Additional data payload (optional)
+            on_result: Called (or awaited) once per target with its send result (e.g. for logging)
+
+        Returns:
+            Dictionary with total, success_count, failure_count, timed_out,
+            error_types (count per error type) and per-target results
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[
+            self._send_one(semaphore, target, title, body, data)
+            for target in targets
+        ])
+
+        success_count = 0
+        timed_out = 0
+        error_types: Dict[str, int] = {}
+        for target, result in zip(targets, results):
+            if result["success"]:
+                success_count += 1
+            else:
+                error_type = result.get("error_type", "unknown")
+                error_types[error_type] = error_types.get(error_type, 0) + 1
+                if result.get("timed_out"):
+                    timed_out += 1
+            if on_result is not None:
+                outcome = on_result(target, result)
+                if inspect.isawaitable(outcome):
+                    await outcome
+
+        return {
+            "total": len(targets),
+            "success_count": success_count,
+            "failure_count": len(targets) - success_count,
+            "timed_out": timed_out,
+            "error_types": error_types,
+            "results": list(zip(targets, results))
+        }
+
+    def submit(self, job: Callable[[], Awaitable[Dict[str, Any]]]) -> str:
+        """
+        Run a fan-out detached from the request
+
+        Returns:
+            Job id that can be polled with get_job()
+        """
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {"job_id": job_id, "status": "running", "result": None, "error": None}
+        while len(self._jobs) > self.max_jobs:
+            oldest = next(iter(self._jobs.values()))
+            if oldest["status"] == "running":
+                break
+            self._jobs.popitem(last=False)
+
+        async def runner():
+            await asyncio.to_thread(_save_job, self._jobs[job_id])
+            try:
+                summary = await job()
+                self._jobs[job_id].update(
+                    status="completed",
+                    result={key: value for key, value in summary.items() if key != "results"}
+                )
+            except Exception as e:
+                logger.error(f"Fan-out job {job_id} failed: {str(e)}")
+                self._jobs[job_id].update(status="failed", error=str(e))
+            finally:
+                self._tasks.pop(job_id, None)
+            await asyncio.to_thread(_save_job, self._jobs[job_id])
+
+        self._tasks[job_id] = asyncio.create_task(runner())
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job started by this worker"""
+        return self._jobs.get(job_id)
+
+
+def _save_job(job: Dict[str, Any]) -> None:
+    """Write a job's status, dropping finished jobs past retention; errors are only logged"""
+    # Imported here so the engine itself runs without a database (benchmark service mode)
+    from app.database import SessionLocal
+    from app.notifications.models import FanoutJob
+
+    db = SessionLocal()
+    try:
+        finished_at = None if job["status"] == "running" else datetime.now(timezone.utc)
+        db.merge(FanoutJob(
+            id=job["job_id"],
+            status=job["status"],
+            result=job["result"],
+            error=job["error"],
+            finished_at=finished_at
+        ))
+        if finished_at is not None:
+            cutoff = finished_at - timedelta(hours=settings.FANOUT_JOB_RETENTION_HOURS)
+            db.execute(delete(FanoutJob).where(FanoutJob.finished_at < cutoff))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to save fan-out job {job['job_id']}: {str(e)}")
+    finally:
+        db.close()
+
+
+def load_job(db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    """Status of a job started by any worker"""
+    from app.notifications.models import FanoutJob
+
+    row = db.get(FanoutJob, job_id)
+    if row is None:
+        return None
+    return {"job_id": row.id, "status": row.status, "result": row.result, "error": row.error}
+
+
+# Create global instance
+fanout_engine = FanoutEngine()
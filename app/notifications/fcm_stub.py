@@ -0,0 +1,152 @@
+"""
+FCM Stand-in - local FCM v1 compatible server for load tests and benchmarks
+Answers messages:send with configurable latency, error rates and dead tokens,
+so push throughput can be measured without calling Google
+
+Run it as a server and point the API at it with FCM_BASE_URL:
+    python -m app.notifications.fcm_stub --port 9099 --latency-ms 30 --unavailable-rate 0.01
+    FCM_BASE_URL=http://127.0.0.1:9099 uvicorn app.main:app
+
+or use it in-process with httpx.ASGITransport(app=create_app(stub))
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FCM_ERROR_TYPE = "type.googleapis.com/google.firebase.fcm.v1.FcmError"
+
+
+def _fcm_error(status_code: int, status: str, message: str, error_code: Optional[str] = None, retry_after: Optional[float] = None) -> JSONResponse:
+    error: Dict[str, Any] = {"code": status_code, "message": message, "status": status}
+    if error_code:
+        error["details"] = [{"@type": FCM_ERROR_TYPE, "errorCode": error_code}]
+    headers = {"Retry-After": str(int(retry_after))} if retry_after is not None else None
+    return JSONResponse(status_code=status_code, content={"error": error}, headers=headers)
+
+
+class FCMStub:
+    """
+    Behaviour of the stand-in server.
+    Rates are independent probabilities per message; tokens starting with
+    dead_token_prefix are always answered as UNREGISTERED.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 20.0,
+        jitter_ms: float = 10.0,
+        unregistered_rate: float = 0.0,
+        invalid_token_rate: float = 0.0,
+        unavailable_rate: float = 0.0,
+        rate_limited_rate: float = 0.0,
+        retry_after_seconds: float = 30.0,
+        dead_token_prefix: str = "dead-",
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.unregistered_rate = unregistered_rate
+        self.invalid_token_rate = invalid_token_rate
+        self.unavailable_rate = unavailable_rate
+        self.rate_limited_rate = rate_limited_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.dead_token_prefix = dead_token_prefix
+        self._random = random.Random(seed)
+        self.stats: Dict[str, int] = {}
+
+    def _count(self, outcome: str) -> None:
+        self.stats[outcome] = self.stats.get(outcome, 0) + 1
+
+    async def handle(self, project_id: str, message: Dict[str, Any]) -> JSONResponse:
+        delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        token = (message.get("message") or {}).get("token")
+        if not token:
+            self._count("invalid_request")
+            return _fcm_error(400, "INVALID_ARGUMENT", "Request contains an invalid argument.")
+
+        if token.startswith(self.dead_token_prefix) or self._random.random() < self.unregistered_rate:
+            self._count("unregistered")
+            return _fcm_error(404, "NOT_FOUND", "Requested entity was not found.", "UNREGISTERED")
+        if self._random.random() < self.invalid_token_rate:
+            self._count("invalid_token")
+            return _fcm_error(
+                400, "INVALID_ARGUMENT",
+                "The registration token is not a valid FCM registration token",
+                "INVALID_ARGUMENT"
+            )
+        if self._random.random() < self.unavailable_rate:
+            self._count("unavailable")
+            return _fcm_error(503, "UNAVAILABLE", "The service is currently unavailable.", "UNAVAILABLE", self.retry_after_seconds)
+        if self._random.random() < self.rate_limited_rate:
+            self._count("rate_limited")
+            return _fcm_error(429, "RESOURCE_EXHAUSTED", "Quota exceeded.", "QUOTA_EXCEEDED", self.retry_after_seconds)
+
+        self._count("success")
+        return JSONResponse(content={"name": f"projects/{project_id}/messages/{uuid.uuid4().hex}"})
+
+
+def create_app(stub: Optional[FCMStub] = None) -> FastAPI:
+    """
+    Build the stand-in ASGI app
+    """
+    stub = stub or FCMStub()
+    app = FastAPI(title="FCM Stand-in", docs_url=None, redoc_url=None)
+    app.state.stub = stub
+
+    @app.post("/v1/projects/{project_id}/messages:send")
+    async def send_message(project_id: str, request: Request):
+        return await stub.handle(project_id, await request.json())
+
+    @app.get("/stats")
+    async def get_stats():
+        return stub.stats
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stub.stats = {}
+        return stub.stats
+
+    return app
+
+
+def main() -> None:
+    """Standalone server entry point"""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local FCM stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9099)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--unregistered-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-token-rate", type=float, default=0.0)
+    parser.add_argument("--unavailable-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limited-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    stub = FCMStub(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        unregistered_rate=args.unregistered_rate,
+        invalid_token_rate=args.invalid_token_rate,
+        unavailable_rate=args.unavailable_rate,
+        rate_limited_rate=args.rate_limited_rate,
+        retry_after_seconds=args.retry_after,
+        seed=args.seed
+    )
+    # Plain HTTP/1.1: without TLS the push client cannot negotiate HTTP/2, so this measures h11 pooling
+    uvicorn.run(create_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
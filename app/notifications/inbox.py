@@ -0,0 +1,206 @@
+"""
+Notification Inbox - per-user notification history with read state
+Every insert and mark-read adjusts notification_unread_counts in the same
+transaction, so the unread badge never needs a COUNT
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import false, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.auth.users.models import User
+from app.notifications.models import NotificationInbox, NotificationUnreadCount
+
+logger = logging.getLogger(__name__)
+
+
+def add_to_inbox(
+    db: Session,
+    user_ids: Iterable[int],
+    title: str,
+    body: str,
+    data: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Add one inbox entry per distinct user and bump their unread counts
+
+    Args:
+        db: Database session
+        user_ids: Recipients; duplicates (several devices per user) are collapsed
+
+    Returns:
+        Number of inbox entries created
+    """
+    # Sorted so concurrent broadcasts lock counter rows in the same order
+    recipients = sorted(set(user_ids))
+    if not recipients:
+        return 0
+
+    notification_type = (data or {}).get("type")
+    try:
+        db.execute(insert(NotificationInbox), [
+            {
+                "user_id": user_id,
+                "notification_type": notification_type,
+                "title": title,
+                "body": body,
+                "data": data,
+                "is_read": False
+            }
+            for user_id in recipients
+        ])
+        counts = pg_insert(NotificationUnreadCount).values([
+            {"user_id": user_id, "unread_count": 1} for user_id in recipients
+        ])
+        db.execute(counts.on_conflict_do_update(
+            index_elements=[NotificationUnreadCount.user_id],
+            set_={
+                "unread_count": NotificationUnreadCount.unread_count + counts.excluded.unread_count,
+                "updated_at": func.now()
+            }
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to add notification to {len(recipients)} inboxes: {str(e)}")
+        return 0
+    return len(recipients)
+
+
+def add_to_user_type_inbox(
+    db: Session,
+    user_type: str,
+    title: str,
+    body: str,
+    data: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Add an inbox entry for every user of a type, whether or not they have a device
+
+    Entries and unread counts are written with INSERT ... SELECT, so recipients are
+    never loaded into the application.
+
+    Returns:
+        Number of inbox entries created
+    """
+    # Ordered so concurrent broadcasts lock counter rows in the same order
+    recipients = select(User.id).where(User.role == user_type).order_by(User.id)
+    notification_type = (data or {}).get("type")
+    try:
+        created = db.execute(
+            insert(NotificationInbox).from_select(
+                ["user_id", "notification_type", "title", "body", "data", "is_read"],
+                recipients.add_columns(
+                    literal(notification_type, NotificationInbox.notification_type.type),
+                    literal(title, NotificationInbox.title.type),
+                    literal(body, NotificationInbox.body.type),
+                    literal(data, NotificationInbox.data.type),
+                    false()
+                )
+            )
+        ).rowcount
+        counts = pg_insert(NotificationUnreadCount).from_select(
+            ["user_id", "unread_count"], recipients.add_columns(literal(1))
+        )
+        db.execute(counts.on_conflict_do_update(
+            index_elements=[NotificationUnreadCount.user_id],
+            set_={
+                "unread_count": NotificationUnreadCount.unread_count + counts.excluded.unread_count,
+                "updated_at": func.now()
+            }
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to add notification to {user_type} inboxes: {str(e)}")
+        return 0
+    return created
+
+
+def get_unread_count(db: Session, user_id: int) -> int:
+    unread_count = db.scalar(
+        select(NotificationUnreadCount.unread_count).where(NotificationUnreadCount.user_id == user_id)
+    )
+    return unread_count or 0
+
+
+def list_inbox(
+    db: Session,
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[int] = None,
+    unread_only: bool = False
+) -> Dict[str, Any]:
+    """
+    Get a user's inbox newest first with keyset pagination
+
+    Args:
+        cursor: next_cursor from the previous page (an inbox id)
+
+    Returns:
+        Dictionary with items and next_cursor
+    """
+    query = select(NotificationInbox).where(NotificationInbox.user_id == user_id)
+    if unread_only:
+        query = query.where(NotificationInbox.is_read == False)
+    if cursor is not None:
+        query = query.where(NotificationInbox.id < cursor)
+
+    rows = db.scalars(query.order_by(NotificationInbox.id.desc()).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def mark_read(
+    db: Session,
+    user_id: int,
+    ids: Optional[List[int]] = None,
+    up_to_id: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Mark inbox entries read in one statement and decrement the unread count
+
+    Args:
+        ids: Specific entries to mark; all unread entries when omitted
+        up_to_id: Only entries with id <= up_to_id (e.g. everything the user has seen)
+
+    Returns:
+        Dictionary with marked and the new unread_count
+    """
+    query = update(NotificationInbox).where(
+        NotificationInbox.user_id == user_id,
+        NotificationInbox.is_read == False
+    )
+    if ids is not None:
+        query = query.where(NotificationInbox.id.in_(ids))
+    if up_to_id is not None:
+        query = query.where(NotificationInbox.id <= up_to_id)
+
+    # Only rows that were still unread match, so concurrent calls cannot double-count
+    marked = db.execute(
+        query.values(is_read=True, read_at=func.now()).execution_options(synchronize_session=False)
+    ).rowcount
+
+    if marked:
+        unread_count = db.scalar(
+            update(NotificationUnreadCount)
+            .where(NotificationUnreadCount.user_id == user_id)
+            .values(
+                unread_count=func.greatest(NotificationUnreadCount.unread_count - marked, 0),
+                updated_at=func.now()
+            )
+            .returning(NotificationUnreadCount.unread_count)
+        )
+        db.commit()
+    else:
+        db.commit()
+        unread_count = get_unread_count(db, user_id)
+
+    return {"marked": marked, "unread_count": unread_count or 0}
@@ -0,0 +1,194 @@
+"""
+Notification Log Partitions - monthly partition management for notification_logs
+Creates upcoming partitions ahead of time and drops partitions past retention
+
+A notification_logs table created before partitioning is left alone (with an
+error logged) until it is converted with:
+    python -m app.notifications.migrate_log_partitions
+"""
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.notifications.models import NotificationLog, PARTITIONED_LOGS
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = NotificationLog.__tablename__
+_PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def _add_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def partition_name(year: int, month: int) -> str:
+    return f"{PARENT_TABLE}_p{year:04d}_{month:02d}"
+
+
+def lock_partitions(db: Session) -> None:
+    """Serialize partition DDL across workers until the transaction ends"""
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": f"{PARENT_TABLE}_partitions"})
+
+
+def is_partitioned(db: Session) -> Optional[bool]:
+    """Whether notification_logs is a partitioned table, or None if it does not exist"""
+    relkind = db.execute(text(
+        "SELECT relkind FROM pg_class "
+        "WHERE relname = :parent AND relnamespace = current_schema()::regnamespace"
+    ), {"parent": PARENT_TABLE}).scalar()
+    if relkind is None:
+        return None
+    return relkind == "p"
+
+
+def create_partition(db: Session, year: int, month: int) -> str:
+    next_year, next_month = _add_months(year, month, 1)
+    name = partition_name(year, month)
+    db.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{PARENT_TABLE}" '
+        f"FOR VALUES FROM ('{year:04d}-{month:02d}-01 00:00:00+00') "
+        f"TO ('{next_year:04d}-{next_month:02d}-01 00:00:00+00')"
+    ))
+    return name
+
+
+def list_partitions(db: Session) -> List[Tuple[int, int, str]]:
+    """
+    Existing monthly partitions as (year, month, table name)
+    """
+    rows = db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+    """), {"parent": PARENT_TABLE}).scalars().all()
+
+    partitions = []
+    for name in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((int(match.group(1)), int(match.group(2)), name))
+    return sorted(partitions)
+
+
+def ensure_partitions(db: Session, today: Optional[date] = None, ahead: int = settings.NOTIFICATION_LOG_PARTITIONS_AHEAD) -> List[str]:
+    """
+    Create the partition for the current month and the next `ahead` months;
+    the caller commits
+
+    Returns:
+        Names of partitions created
+    """
+    today = today or datetime.now(timezone.utc).date()
+    lock_partitions(db)
+    created = []
+    for offset in range(ahead + 1):
+        year, month = _add_months(today.year, today.month, offset)
+        created.append(create_partition(db, year, month))
+    return created
+
+
+def retention_cutoff(today: date, retention_months: int = settings.NOTIFICATION_LOG_RETENTION_MONTHS) -> Tuple[int, int]:
+    """(year, month) of the oldest month still kept"""
+    return _add_months(today.year, today.month, -retention_months)
+
+
+def purge_expired_partitions(
+    db: Session,
+    today: Optional[date] = None,
+    retention_months: int = settings.NOTIFICATION_LOG_RETENTION_MONTHS
+) -> List[str]:
+    """
+    Drop whole partitions whose month ended before the retention window;
+    the caller commits
+
+    Returns:
+        Names of partitions dropped
+    """
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = retention_cutoff(today, retention_months)
+    lock_partitions(db)
+    dropped = []
+    for year, month, name in list_partitions(db):
+        if (year, month) < cutoff:
+            db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            dropped.append(name)
+    return dropped
+
+
+def maintain_partitions() -> None:
+    """Create upcoming partitions and purge expired ones"""
+    if not PARTITIONED_LOGS:
+        return
+    db = SessionLocal()
+    try:
+        partitioned = is_partitioned(db)
+        if partitioned is False:
+            logger.error(
+                f"{PARENT_TABLE} is not partitioned, so partition maintenance is skipped; "
+                "convert it with: python -m app.notifications.migrate_log_partitions"
+            )
+            return
+        if partitioned is None:
+            return
+        ensure_partitions(db)
+        dropped = purge_expired_partitions(db)
+        db.commit()
+        if dropped:
+            logger.info(f"Dropped expired notification log partitions: {', '.join(dropped)}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class LogPartitionMaintainer:
+    """
+    Runs maintain_partitions periodically in the background
+    """
+
+    def __init__(self, interval: int = settings.NOTIFICATION_LOG_MAINTENANCE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await asyncio.to_thread(maintain_partitions)
+            except Exception as e:
+                logger.error(f"Notification log partition maintenance error: {str(e)}")
+
+    async def start(self) -> None:
+        """Make sure the current partition exists before serving, then keep maintaining"""
+        if self._task is None:
+            await asyncio.to_thread(maintain_partitions)
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+# Create global instance
+log_partition_maintainer = LogPartitionMaintainer()
@@ -0,0 +1,167 @@
+"""
+Notification Log Writer - buffers NotificationLog rows and bulk-inserts them
+Flushes by batch size or time, off the event loop, with bounded memory
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.notifications.models import NotificationLog
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Retries of a failed batch insert before falling back to inserting row by row
+FLUSH_RETRIES = 2
+FLUSH_RETRY_BASE_SECONDS = 0.5
+
+
+def log_data(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Data payload as stored in the log
+
+    Push data values must be strings, so batch and digest notifications carry
+    booking_ids comma-separated; the log stores them as a JSON array so the
+    booking_id filter can match them by containment.
+    """
+    if not data or not isinstance(data.get("booking_ids"), str):
+        return data
+    return {**data, "booking_ids": [booking_id for booking_id in data["booking_ids"].split(",") if booking_id]}
+
+
+class NotificationLogWriter:
+    """
+    Async buffered writer for notification logs.
+    The buffer is a bounded queue, so producers wait (backpressure) when the
+    database falls behind instead of growing memory without limit.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.NOTIFICATION_LOG_BATCH_SIZE,
+        flush_interval: float = settings.NOTIFICATION_LOG_FLUSH_INTERVAL_SECONDS,
+        max_buffer: int = settings.NOTIFICATION_LOG_MAX_BUFFER
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, entry: Dict[str, Any]) -> None:
+        """
+        Queue one log row; waits if the buffer is full
+
+        Args:
+            entry: NotificationLog column values
+        """
+        if self._task is None:
+            self.start()
+        # Stamped now, so the log shows when the send happened rather than when it was flushed
+        entry = {**entry, "sent_at": entry.get("sent_at") or datetime.now(timezone.utc)}
+        if entry.get("data"):
+            entry["data"] = log_data(entry["data"])
+        await self._queue.put(entry)
+
+    async def stop(self) -> None:
+        """Flush everything buffered and stop the writer"""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # Anything queued after the stop marker
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                remaining.append(item)
+        if remaining:
+            await self._flush(remaining)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Insert a batch, retrying with backoff; if it keeps failing, insert row by
+        row so one bad row (or a missing partition for its month) only loses itself
+        """
+        for attempt in range(FLUSH_RETRIES + 1):
+            try:
+                await asyncio.to_thread(self._insert_rows, batch)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to write {len(batch)} notification logs (attempt {attempt + 1}): {str(e)}")
+                if attempt < FLUSH_RETRIES:
+                    await asyncio.sleep(FLUSH_RETRY_BASE_SECONDS * (2 ** attempt))
+
+        failed = await asyncio.to_thread(self._insert_each, batch)
+        if failed:
+            logger.error(f"Dropped {failed} of {len(batch)} notification logs that could not be written")
+
+    @staticmethod
+    def _insert_rows(batch: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(insert(NotificationLog), batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _insert_each(batch: List[Dict[str, Any]]) -> int:
+        """Insert rows one at a time; returns how many failed"""
+        failed = 0
+        db = SessionLocal()
+        try:
+            for row in batch:
+                try:
+                    db.execute(insert(NotificationLog), [row])
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    failed += 1
+                    logger.debug(f"Notification log for user {row.get('user_id')} not written: {str(e)}")
+            return failed
+        finally:
+            db.close()
+
+
+# Create global instance
+notification_log_writer = NotificationLogWriter()
@@ -0,0 +1,105 @@
+"""
+One-off migration of a plain notification_logs table to the monthly partitioned layout
+- the old table is renamed to notification_logs_legacy and the partitioned table
+  is created in its place, with partitions for every month still in retention
+- rows inside the retention window are copied over, keeping their ids; older
+  rows are dropped with the legacy table
+- booking_ids stored comma-separated in data become JSON arrays, so the
+  booking_id filter on the logs endpoint matches batch notifications
+
+Run migrate_native_keys first. Runs in a single transaction and skips steps that
+are already done, so it is safe to re-run.
+
+    python -m app.notifications.migrate_log_partitions
+"""
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.notifications.log_partitions import (
+    PARENT_TABLE, create_partition, ensure_partitions, is_partitioned, lock_partitions, retention_cutoff, _add_months
+)
+from app.notifications.migrate_native_keys import _column_type
+from app.notifications.models import NotificationLog
+
+logger = logging.getLogger(__name__)
+
+LEGACY_TABLE = f"{PARENT_TABLE}_legacy"
+COLUMNS = "id, user_id, user_type, title, body, data, fcm_token, success, error_message, sent_at"
+
+
+def partition_logs(db: Session) -> None:
+    if is_partitioned(db) is not False:
+        return
+    if _column_type(db, PARENT_TABLE, "id") != "bigint" or _column_type(db, PARENT_TABLE, "user_id") != "integer":
+        raise RuntimeError(f"{PARENT_TABLE} still has the old key types; run app.notifications.migrate_native_keys first")
+
+    lock_partitions(db)
+    # Move the old table and everything named after it out of the way
+    statements = [
+        f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}",
+        f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT {PARENT_TABLE}_pkey TO {LEGACY_TABLE}_pkey",
+        f"ALTER SEQUENCE IF EXISTS {PARENT_TABLE}_id_seq RENAME TO {LEGACY_TABLE}_id_seq",
+    ]
+    statements += [f"DROP INDEX IF EXISTS {index.name}" for index in NotificationLog.__table__.indexes]
+    for statement in statements:
+        db.execute(text(statement))
+
+    NotificationLog.__table__.create(db.connection())
+
+    today = datetime.now(timezone.utc).date()
+    cutoff_year, cutoff_month = retention_cutoff(today)
+    cutoff = f"{cutoff_year:04d}-{cutoff_month:02d}-01 00:00:00+00"
+    oldest = db.execute(text(
+        f"SELECT min(sent_at) FROM {LEGACY_TABLE} WHERE sent_at >= :cutoff"
+    ), {"cutoff": cutoff}).scalar()
+    if oldest is not None:
+        year, month = oldest.year, oldest.month
+        while (year, month) < (today.year, today.month):
+            create_partition(db, year, month)
+            year, month = _add_months(year, month, 1)
+    ensure_partitions(db, today)
+
+    copied = db.execute(text(
+        f"INSERT INTO {PARENT_TABLE} ({COLUMNS}) "
+        f"SELECT id, user_id, user_type, title, body, data::jsonb, fcm_token, coalesce(success, false), error_message, sent_at "
+        f"FROM {LEGACY_TABLE} WHERE sent_at >= :cutoff"
+    ), {"cutoff": cutoff}).rowcount
+    db.execute(text(
+        f"SELECT setval('{PARENT_TABLE}_id_seq', "
+        f"COALESCE((SELECT max(id) FROM {LEGACY_TABLE}), 0) + 1, false)"
+    ))
+    db.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+    logger.info(f"{PARENT_TABLE} converted to monthly partitions; {copied} rows inside retention copied")
+
+
+def migrate_booking_ids(db: Session) -> None:
+    updated = db.execute(text(f"""
+        UPDATE {PARENT_TABLE}
+        SET data = jsonb_set(data, '{{booking_ids}}', to_jsonb(string_to_array(data->>'booking_ids', ',')))
+        WHERE jsonb_typeof(data->'booking_ids') = 'string'
+    """)).rowcount
+    if updated:
+        logger.info(f"Converted booking_ids to arrays in {updated} notification logs")
+
+
+def migrate() -> None:
+    """Run every step in one transaction"""
+    db = SessionLocal()
+    try:
+        partition_logs(db)
+        migrate_booking_ids(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
@@ -0,0 +1,119 @@
+"""
+One-off data migration to native key types for the notification tables
+- user_fcm_tokens.id: varchar uuid4 -> uuid (new rows get time-ordered UUIDv7)
+- notification_logs.id: varchar uuid4 -> bigint from a sequence, numbered in sent_at order
+- user_id on every notification table: varchar -> integer, with a foreign key
+  to users on user_fcm_tokens
+
+Runs in a single transaction and skips steps that are already done, so it is
+safe to re-run. Rows whose user_id is not a user id cannot be converted and are
+deleted (tokens whose user no longer exists are deleted too); counts are logged.
+
+    python -m app.notifications.migrate_native_keys
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Tables whose user_id only changes type
+USER_ID_TABLES = ["notification_logs", "push_deliveries", "notification_inbox", "notification_unread_counts"]
+
+
+def _column_type(db: Session, table: str, column: str) -> Optional[str]:
+    return db.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+    ), {"table": table, "column": column}).scalar()
+
+
+def _delete(db: Session, table: str, condition: str) -> None:
+    deleted = db.execute(text(f"DELETE FROM {table} WHERE {condition}")).rowcount
+    if deleted:
+        logger.warning(f"Deleted {deleted} rows from {table} that cannot be converted")
+
+
+def migrate_fcm_tokens(db: Session) -> None:
+    user_id_type = _column_type(db, "user_fcm_tokens", "user_id")
+    if user_id_type is not None and user_id_type != "integer":
+        _delete(db, "user_fcm_tokens", "NOT EXISTS (SELECT 1 FROM users WHERE users.id::text = user_fcm_tokens.user_id)")
+        db.execute(text("ALTER TABLE user_fcm_tokens ALTER COLUMN user_id TYPE integer USING user_id::integer"))
+        db.execute(text(
+            "ALTER TABLE user_fcm_tokens ADD CONSTRAINT user_fcm_tokens_user_id_fkey "
+            "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+        ))
+        logger.info("user_fcm_tokens.user_id converted to integer")
+
+    id_type = _column_type(db, "user_fcm_tokens", "id")
+    if id_type is not None and id_type != "uuid":
+        db.execute(text("ALTER TABLE user_fcm_tokens ALTER COLUMN id TYPE uuid USING id::uuid"))
+        logger.info("user_fcm_tokens.id converted to uuid")
+
+
+def migrate_user_ids(db: Session) -> None:
+    for table in USER_ID_TABLES:
+        user_id_type = _column_type(db, table, "user_id")
+        if user_id_type is None or user_id_type == "integer":
+            continue
+        _delete(db, table, "user_id !~ '^-?[0-9]+$'")
+        db.execute(text(f"ALTER TABLE {table} ALTER COLUMN user_id TYPE integer USING user_id::integer"))
+        logger.info(f"{table}.user_id converted to integer")
+
+
+def migrate_notification_log_ids(db: Session) -> None:
+    id_type = _column_type(db, "notification_logs", "id")
+    if id_type is None or id_type == "bigint":
+        return
+
+    # Number existing rows in time order, then swap the new column in as the key
+    statements = [
+        "CREATE SEQUENCE IF NOT EXISTS notification_logs_id_seq",
+        "ALTER TABLE notification_logs ADD COLUMN new_id bigint",
+        """
+        UPDATE notification_logs AS logs SET new_id = ordered.rn
+        FROM (
+            SELECT id, sent_at, row_number() OVER (ORDER BY sent_at, id) AS rn
+            FROM notification_logs
+        ) AS ordered
+        WHERE logs.id = ordered.id AND logs.sent_at = ordered.sent_at
+        """,
+        "ALTER TABLE notification_logs DROP CONSTRAINT IF EXISTS notification_logs_pkey",
+        # Also drops the (sent_at, id) and (user_id, sent_at, id) indexes; recreated below
+        "ALTER TABLE notification_logs DROP COLUMN id",
+        "ALTER TABLE notification_logs RENAME COLUMN new_id TO id",
+        "ALTER TABLE notification_logs ALTER COLUMN id SET NOT NULL",
+        "ALTER TABLE notification_logs ALTER COLUMN id SET DEFAULT nextval('notification_logs_id_seq')",
+        "ALTER SEQUENCE notification_logs_id_seq OWNED BY notification_logs.id",
+        "SELECT setval('notification_logs_id_seq', COALESCE((SELECT max(id) FROM notification_logs), 0) + 1, false)",
+        "ALTER TABLE notification_logs ADD PRIMARY KEY (id, sent_at)",
+        "CREATE INDEX IF NOT EXISTS ix_notification_logs_sent_at_id ON notification_logs (sent_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_notification_logs_user_id_sent_at_id ON notification_logs (user_id, sent_at, id)",
+    ]
+    for statement in statements:
+        db.execute(text(statement))
+    logger.info("notification_logs.id converted to bigint")
+
+
+def migrate() -> None:
+    """Run every step in one transaction"""
+    db = SessionLocal()
+    try:
+        migrate_fcm_tokens(db)
+        migrate_user_ids(db)
+        migrate_notification_log_ids(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
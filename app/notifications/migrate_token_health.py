@@ -0,0 +1,47 @@
+"""
+One-off migration adding the token health columns to an existing user_fcm_tokens table
+- failure_count: consecutive failed sends, 0 for existing tokens
+- first_failed_at: start of the current failure streak
+
+Safe to re-run; create_all only adds these for new databases.
+
+    python -m app.notifications.migrate_token_health
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.notifications.migrate_native_keys import _column_type
+
+logger = logging.getLogger(__name__)
+
+
+def add_token_health_columns(db: Session) -> None:
+    if _column_type(db, "user_fcm_tokens", "id") is None:
+        return
+    if _column_type(db, "user_fcm_tokens", "failure_count") is None:
+        db.execute(text("ALTER TABLE user_fcm_tokens ADD COLUMN failure_count integer NOT NULL DEFAULT 0"))
+        logger.info("user_fcm_tokens.failure_count added")
+    if _column_type(db, "user_fcm_tokens", "first_failed_at") is None:
+        db.execute(text("ALTER TABLE user_fcm_tokens ADD COLUMN first_failed_at timestamp with time zone"))
+        logger.info("user_fcm_tokens.first_failed_at added")
+
+
+def migrate() -> None:
+    """Run every step in one transaction"""
+    db = SessionLocal()
+    try:
+        add_token_health_columns(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
@@ -2,18 +2,36 @@
 Database models for push notifications
 Stores FCM tokens and notification logs
 """
-from sqlalchemy import Column, String, DateTime, Boolean, Text, JSON
+from sqlalchemy import Column, String, DateTime, Boolean, Text, JSON, Integer, BigInteger, Index, ForeignKey, Sequence, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
+import os
+import time
 import uuid
 
 # Use your existing Base import from database.py
-from app.database import Base
+from app.database import Base, engine
 
-def generate_uuid():
-    """Generate UUID for primary keys"""
-    return str(uuid.uuid4())
+# notification_logs is range-partitioned on PostgreSQL; other databases (SQLite in
+# tests) get a plain table keyed by id alone, since they cannot autoincrement a composite key
+PARTITIONED_LOGS = engine.dialect.name == "postgresql"
+
+# JSONB on PostgreSQL, plain JSON elsewhere
+JSONData = JSON().with_variant(JSONB(), "postgresql")
+
+def generate_uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUID (version 7) for primary keys
+    48-bit millisecond timestamp followed by random bits, so new keys land at the
+    right edge of the btree instead of fragmenting it like uuid4
+    """
+    unix_ms = time.time_ns() // 1_000_000
+    value = (unix_ms & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
 
 
 class UserFCMToken(Base):
@@ -23,12 +41,14 @@ class UserFCMToken(Base):
     """
     __tablename__ = "user_fcm_tokens"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column(String, nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid7)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     user_type = Column(String, nullable=False)  # 'instructor' or 'student'
     fcm_token = Column(String, unique=True, nullable=False)
     device_info = Column(Text)  # Browser, device type info
     is_active = Column(Boolean, default=True)
+    failure_count = Column(Integer, nullable=False, default=0)  # Consecutive failed sends
+    first_failed_at = Column(DateTime(timezone=True))  # Start of the current failure streak
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -36,23 +56,152 @@ class UserFCMToken(Base):
         return f"<UserFCMToken(user_id={self.user_id}, user_type={self.user_type})>"
 
 
+# Bumped with nextval right after every committed change to the active token set, so
+# each worker's token registry can tell when to reload. A sequence, unlike a counter
+# row, never makes concurrent token writes wait on each other
+token_set_version_seq = Sequence("token_set_version_seq", metadata=Base.metadata)
+
+
 class NotificationLog(Base):
     """
     Logs all notification attempts for auditing and debugging
     Helps track delivery success/failure
+    
+    Range-partitioned by month on sent_at (see log_partitions.py), so retention
+    drops whole partitions; sent_at is part of the primary key as PostgreSQL requires
     """
     __tablename__ = "notification_logs"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column(String, nullable=False, index=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)  # No foreign key: logs outlive users and are written in bulk
     user_type = Column(String, nullable=False)
     title = Column(String, nullable=False)
     body = Column(String, nullable=False)
-    data = Column(JSON)  # Store additional data as JSON
+    data = Column(JSONData)  # Additional data, GIN-indexed for lookups like booking_id / booking_ids
     fcm_token = Column(String)
     success = Column(Boolean, default=False)
     error_message = Column(Text)
-    sent_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime(timezone=True), primary_key=PARTITIONED_LOGS, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_notification_logs_sent_at_id", "sent_at", "id"),
+        Index("ix_notification_logs_user_id_sent_at_id", "user_id", "sent_at", "id"),
+        Index("ix_notification_logs_data", "data", postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"}),
+        {"postgresql_partition_by": "RANGE (sent_at)"},
+    )
+
+    def __repr__(self):
+        return f"<NotificationLog(user_id={self.user_id}, success={self.success})>"
+
+class NotificationOutbox(Base):
+    """
+    Transactional outbox for notification events
+    Rows are written in the same transaction as the business change and
+    drained by the outbox dispatcher with at-least-once delivery
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, dispatched, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    dispatched_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_available_at", "status", "available_at"),
+    )
+
+    def __repr__(self):
+        return f"<NotificationOutbox(id={self.id}, event_type={self.event_type}, status={self.status})>"
+
+
+class FanoutJob(Base):
+    """
+    Status of a detached fan-out, so any worker can answer a status poll
+    """
+    __tablename__ = "fanout_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(20), nullable=False, default="running")  # running, completed, failed
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), index=True)
+
+    def __repr__(self):
+        return f"<FanoutJob(id={self.id}, status={self.status})>"
+
+
+class PushDelivery(Base):
+    """
+    Persistent retry queue for individual push sends
+    One row per device that did not receive a message; successful devices are never queued,
+    so retries do not re-send to them
+    """
+    __tablename__ = "push_deliveries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    user_type = Column(String, nullable=False)
+    fcm_token = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    data = Column(JSON)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sent, failed, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_push_deliveries_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<PushDelivery(id={self.id}, status={self.status}, attempts={self.attempts})>"
+
+
+class NotificationInbox(Base):
+    """
+    Per-user notification inbox with read state
+    One row per recipient user (not per device); paged newest first by id
+    """
+    __tablename__ = "notification_inbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    notification_type = Column(String(50))
+    title = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    data = Column(JSONData)
+    is_read = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    read_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_notification_inbox_user_id_id", "user_id", "id"),
+        Index("ix_notification_inbox_user_id_id_unread", "user_id", "id", postgresql_where=text("NOT is_read")),
+    )
+
+    def __repr__(self):
+        return f"<NotificationInbox(id={self.id}, user_id={self.user_id}, is_read={self.is_read})>"
+
+
+class NotificationUnreadCount(Base):
+    """
+    Unread inbox count per user, maintained in the same transaction as every
+    inbox insert and mark-read so the badge is a single-row read
+    """
+    __tablename__ = "notification_unread_counts"
+
+    user_id = Column(Integer, primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     def __repr__(self):
-        return f"<NotificationLog(user_id={self.user_id}, success={self.success})>"
\ No newline at end of file
+        return f"<NotificationUnreadCount(user_id={self.user_id}, unread_count={self.unread_count})>"
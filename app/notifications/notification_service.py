@@ -2,12 +2,26 @@
 Notification Service - Handles business logic for notifications
 Coordinates between database, web push service, and logging
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.sql import func
+from sqlalchemy import or_, select, tuple_, type_coerce
+from datetime import datetime
+import asyncio
+import base64
+import json
 import logging
-from app.notifications.models import UserFCMToken, NotificationLog
+from app.notifications.models import UserFCMToken, NotificationLog, generate_uuid7
 from app.notifications.web_push_service import web_push_service
-from app.notifications.schemas import NotificationResponse
+from app.notifications.schemas import NotificationResponse, BookingNotificationData
+from app.notifications.fanout import fanout_engine, PushTarget
+from app.notifications.log_writer import notification_log_writer
+from app.notifications.token_health import apply_send_results
+from app.notifications.token_registry import bump_token_set_version, token_registry
+from app.notifications.delivery_queue import enqueue_retries
+from app.notifications.inbox import add_to_user_type_inbox
+from app.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +36,7 @@ class NotificationService:
     
     async def register_fcm_token(
         self, 
-        user_id: str, 
+        user_id: int, 
         user_type: str, 
         fcm_token: str, 
         device_info: Optional[str] = None
@@ -40,37 +54,40 @@ class NotificationService:
             Dictionary with registration result
         """
         try:
-            # Check if token already exists
-            existing_token = self.db.query(UserFCMToken).filter(
-                UserFCMToken.fcm_token == fcm_token
-            ).first()
-            
-            if existing_token:
-                # Update existing token with new user info
-                existing_token.user_id = user_id
-                existing_token.user_type = user_type
-                existing_token.device_info = device_info
-                existing_token.is_active = True
-                token_id = existing_token.id
-            else:
-                # Create new token record
-                new_token = UserFCMToken(
-                    user_id=user_id,
-                    user_type=user_type,
-                    fcm_token=fcm_token,
-                    device_info=device_info
-                )
-                self.db.add(new_token)
-                self.db.flush()  # Get the ID without committing
-                token_id = new_token.id
+            # Single upsert: insert the token, or re-assign it if it already exists
+            stmt = pg_insert(UserFCMToken).values(
+                id=generate_uuid7(),
+                user_id=user_id,
+                user_type=user_type,
+                fcm_token=fcm_token,
+                device_info=device_info,
+                is_active=True,
+                failure_count=0
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserFCMToken.fcm_token],
+                set_={
+                    "user_id": stmt.excluded.user_id,
+                    "user_type": stmt.excluded.user_type,
+                    "device_info": stmt.excluded.device_info,
+                    "is_active": True,
+                    "failure_count": 0,
+                    "first_failed_at": None,
+                    "updated_at": func.now()
+                }
+            ).returning(UserFCMToken.id)
             
+            token_id = self.db.execute(stmt).scalar_one()
             self.db.commit()
+            version = bump_token_set_version(self.db)
+            
+            token_registry.register(PushTarget(user_id, user_type, fcm_token), version)
             
             logger.info(f"FCM token registered for user {user_id}")
             return {
                 "success": True,
                 "message": "FCM token registered successfully",
-                "token_id": token_id
+                "token_id": str(token_id)
             }
             
         except Exception as e:
@@ -81,9 +98,9 @@ class NotificationService:
                 "error": f"Failed to register token: {str(e)}"
             }
     
-    def _create_notification_log(
+    async def _create_notification_log(
         self,
-        user_id: str,
+        user_id: int,
         user_type: str,
         title: str,
         body: str,
@@ -93,7 +110,8 @@ class NotificationService:
         data: Optional[Dict[str, Any]] = None
     ) -> None:
         """
-        Create a log entry for notification attempt
+        Queue a log entry for notification attempt
+        Entries are bulk-inserted by the buffered log writer
         
         Args:
             user_id: ID of the target user
@@ -105,26 +123,20 @@ class NotificationService:
             error_message: Error message if failed
             data: Additional data sent with notification
         """
-        try:
-            log_entry = NotificationLog(
-                user_id=user_id,
-                user_type=user_type,
-                title=title,
-                body=body,
-                data=data,
-                fcm_token=fcm_token,
-                success=success,
-                error_message=error_message
-            )
-            self.db.add(log_entry)
-            self.db.commit()
-        except Exception as e:
-            logger.error(f"Failed to create notification log: {str(e)}")
-            self.db.rollback()
+        await notification_log_writer.write({
+            "user_id": user_id,
+            "user_type": user_type,
+            "title": title,
+            "body": body,
+            "data": data,
+            "fcm_token": fcm_token,
+            "success": success,
+            "error_message": error_message
+        })
     
-    def get_user_tokens(self, user_id: str) -> List[UserFCMToken]:
+    def get_user_tokens(self, user_id: int) -> List[PushTarget]:
         """
-        Get all active FCM tokens for a user
+        Get all active FCM tokens for a user from the token registry
         
         Args:
             user_id: ID of the user
@@ -132,14 +144,11 @@ class NotificationService:
         Returns:
             List of active FCM tokens
         """
-        return self.db.query(UserFCMToken).filter(
-            UserFCMToken.user_id == user_id,
-            UserFCMToken.is_active == True
-        ).all()
+        return token_registry.get_by_user(self.db, user_id)
     
-    def get_tokens_by_user_type(self, user_type: str) -> List[UserFCMToken]:
+    def get_tokens_by_user_type(self, user_type: str) -> List[PushTarget]:
         """
-        Get all active FCM tokens for a user type
+        Get all active FCM tokens for a user type from the token registry
         
         Args:
             user_type: 'instructor' or 'student'
@@ -147,10 +156,228 @@ class NotificationService:
         Returns:
             List of active FCM tokens
         """
-        return self.db.query(UserFCMToken).filter(
-            UserFCMToken.user_type == user_type,
-            UserFCMToken.is_active == True
+        return token_registry.get_by_user_type(self.db, user_type)
+
+    
+    def get_logs(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        success: Optional[bool] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        booking_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get notification logs newest first with keyset pagination
+        
+        Args:
+            limit: Page size
+            cursor: Opaque cursor from the previous page
+            user_id: Only logs for this user
+            success: Only successful or failed sends
+            since: Only logs sent at or after this time
+            until: Only logs sent before this time
+            booking_id: Only logs whose data references this booking
+            
+        Returns:
+            Dictionary with items and next_cursor
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = select(NotificationLog)
+        
+        if user_id is not None:
+            query = query.where(NotificationLog.user_id == user_id)
+        if success is not None:
+            query = query.where(NotificationLog.success == success)
+        if since is not None:
+            query = query.where(NotificationLog.sent_at >= since)
+        if until is not None:
+            query = query.where(NotificationLog.sent_at < until)
+        if booking_id is not None:
+            # JSONB containment, served by the GIN index on data; batch and digest
+            # notifications list their bookings in booking_ids
+            data = type_coerce(NotificationLog.data, JSONB)
+            query = query.where(or_(
+                data.contains({"booking_id": booking_id}),
+                data.contains({"booking_ids": [booking_id]})
+            ))
+        if cursor:
+            cursor_sent_at, cursor_id = _decode_log_cursor(cursor)
+            query = query.where(
+                tuple_(NotificationLog.sent_at, NotificationLog.id) < tuple_(cursor_sent_at, cursor_id)
+            )
+        
+        rows = self.db.scalars(
+            query.order_by(NotificationLog.sent_at.desc(), NotificationLog.id.desc()).limit(limit + 1)
         ).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_log_cursor(rows[-1].sent_at, rows[-1].id)
+        
+        return {"items": rows, "next_cursor": next_cursor}
+    
+    async def send_to_tokens(
+        self,
+        tokens: List[PushTarget],
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Send a notification to all tokens concurrently and log every attempt
+        Dead tokens are deactivated in bulk once the fan-out completes and
+        retryable failures are queued for the delivery worker. Inbox entries are
+        the caller's job, since recipients without a device get one too
+        
+        Returns:
+            Fan-out summary (total, success_count, failure_count, timed_out,
+            error_types, token_health, retries_queued, results)
+        """
+        async def log_result(target: PushTarget, result: Dict[str, Any]) -> None:
+            await self._create_notification_log(
+                user_id=target.user_id,
+                user_type=target.user_type,
+                title=title,
+                body=body,
+                fcm_token=target.fcm_token,
+                success=result["success"],
+                error_message=result.get("error"),
+                data=data
+            )
+        
+        targets = [PushTarget(token.user_id, token.user_type, token.fcm_token) for token in tokens]
+        summary = await fanout_engine.send(targets, title, body, data, on_result=log_result)
+        # Database writes run in a thread so only the fan-out itself is on the event loop
+        summary["token_health"] = await asyncio.to_thread(apply_send_results, self.db, summary["results"])
+        summary["retries_queued"] = await asyncio.to_thread(
+            enqueue_retries, self.db, summary["results"], title, body, data
+        )
+        return summary
+    
+    @staticmethod
+    def send_to_tokens_detached(
+        tokens: List[PushTarget],
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Start a fan-out that outlives the request, logging through its own session
+        
+        Returns:
+            Job id for polling the fan-out status
+        """
+        targets = [PushTarget(token.user_id, token.user_type, token.fcm_token) for token in tokens]
+        
+        async def job() -> Dict[str, Any]:
+            db = SessionLocal()
+            try:
+                service = NotificationService(db)
+                return await service.send_to_tokens(targets, title, body, data)
+            finally:
+                db.close()
+        
+        return fanout_engine.submit(job)
+    
+    async def notify_user_type(
+        self,
+        user_type: str,
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Add a notification to the inbox of every user of a type and send it to their active devices
+        
+        Returns:
+            Fan-out summary, with inbox_entries
+        """
+        # Inbox first, so the unread badge is current when the push arrives
+        inbox_entries = await asyncio.to_thread(add_to_user_type_inbox, self.db, user_type, title, body, data)
+        tokens = await asyncio.to_thread(self.get_tokens_by_user_type, user_type)
+        summary = await self.send_to_tokens(tokens, title, body, data)
+        summary["inbox_entries"] = inbox_entries
+        return summary
+    
+    async def notify_new_booking(self, booking_data: BookingNotificationData) -> NotificationResponse:
+        """
+        Notify all instructors about a new booking
+        """
+        title, body, data = new_booking_message(booking_data)
+        
+        # Every instructor gets the inbox entry, with or without a device
+        await asyncio.to_thread(add_to_user_type_inbox, self.db, "instructor", title, body, data)
+        tokens = await asyncio.to_thread(self.get_tokens_by_user_type, "instructor")
+        
+        if not tokens:
+            return NotificationResponse(
+                success=False,
+                message="No active instructor tokens found"
+            )
+        
+        summary = await self.send_to_tokens(tokens, title, body, data)
+        success_count = summary["success_count"]
+        
+        return NotificationResponse(
+            success=success_count > 0,
+            message=f"Booking notification sent to {success_count} instructors"
+        )
+
+
+def new_booking_message(booking_data: BookingNotificationData) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Title, body and data payload of the new booking notification
+    """
+    title = "New Booking Received"
+    body = f"New booking from {booking_data.student_name}"
+    
+    # Add booking time to body if provided
+    if booking_data.booking_time:
+        body += f" at {booking_data.booking_time}"
+    
+    data = {
+        "type": "new_booking",
+        "booking_id": booking_data.booking_id,
+        "student_name": booking_data.student_name
+    }
+    return title, body, data
+
+
+def progress_report_message(progress_id: str, instructor_name: Optional[str] = None) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Title, body and data payload of the progress report updated notification
+    """
+    title = "Progress Report Updated"
+    body = "Your progress report has been updated. Please have a look."
+    
+    data = {
+        "type": "progress_report_updated",
+        "progress_id": progress_id
+    }
+    
+    # Add instructor name if provided
+    if instructor_name:
+        data["instructor_name"] = instructor_name
+    return title, body, data
+
+
+def _encode_log_cursor(sent_at: datetime, log_id: int) -> str:
+    raw = json.dumps([sent_at.isoformat(), log_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_log_cursor(cursor: str):
+    try:
+        sent_at, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(sent_at), int(log_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
 
 
 # Utility function to create service instance
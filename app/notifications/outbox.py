@@ -0,0 +1,29 @@
+"""
+Transactional outbox - records notification events alongside business writes
+Events are only added to the session; the caller's commit makes them durable
+"""
+from typing import Any, Dict
+from sqlalchemy.orm import Session
+
+from app.notifications.models import NotificationOutbox
+
+# Event types understood by the outbox dispatcher
+NEW_BOOKING_EVENT = "new_booking"
+USER_TYPE_BROADCAST_EVENT = "user_type_broadcast"
+
+
+def enqueue_event(db: Session, event_type: str, payload: Dict[str, Any]) -> NotificationOutbox:
+    """
+    Add an outbox event to the current transaction
+    
+    Args:
+        db: Session holding the business write
+        event_type: One of the event types handled by the dispatcher
+        payload: JSON-serialisable event data
+        
+    Returns:
+        The pending outbox row (not yet committed)
+    """
+    event = NotificationOutbox(event_type=event_type, payload=payload)
+    db.add(event)
+    return event
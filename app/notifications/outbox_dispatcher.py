@@ -0,0 +1,180 @@
+"""
+Outbox Dispatcher - drains the notification outbox in batches
+Calls the notification service in-process with at-least-once delivery
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.notifications.coalescer import notification_coalescer, RECIPIENT_USER_TYPE
+from app.notifications.models import NotificationOutbox
+from app.notifications.notification_service import NotificationService, new_booking_message
+from app.notifications.outbox import NEW_BOOKING_EVENT, USER_TYPE_BROADCAST_EVENT
+from app.notifications.schemas import BookingNotificationData
+
+logger = logging.getLogger(__name__)
+
+
+async def _handle_new_booking(service: NotificationService, event: NotificationOutbox) -> Optional[float]:
+    # Coalesced per booking, or merged into a digest when new_booking is a digest type.
+    # The coalescer marks the row dispatched after sending; until then it stays pending
+    booking_data = BookingNotificationData(**event.payload)
+    title, body, data = new_booking_message(booking_data)
+    notification_coalescer.submit(
+        RECIPIENT_USER_TYPE, "instructor", NEW_BOOKING_EVENT, booking_data.booking_id, title, body, data,
+        outbox_id=event.id
+    )
+    return notification_coalescer.hold_seconds(NEW_BOOKING_EVENT)
+
+
+async def _handle_user_type_broadcast(service: NotificationService, event: NotificationOutbox) -> Optional[float]:
+    payload = event.payload
+    await service.notify_user_type(
+        user_type=payload["user_type"],
+        title=payload["title"],
+        body=payload["body"],
+        data=payload.get("data")
+    )
+    return None
+
+
+# Handlers return None when the event has been delivered, or the number of seconds
+# it is held elsewhere (e.g. by the coalescer) before it is delivered and marked
+EVENT_HANDLERS: Dict[str, Callable[[NotificationService, NotificationOutbox], Awaitable[Optional[float]]]] = {
+    NEW_BOOKING_EVENT: _handle_new_booking,
+    USER_TYPE_BROADCAST_EVENT: _handle_user_type_broadcast,
+}
+
+
+class OutboxDispatcher:
+    """
+    Claims pending outbox rows with a lease, dispatches them and records the outcome.
+    A row whose lease expires (e.g. the worker died mid-send) is claimed again,
+    so events are delivered at least once. Several workers can drain concurrently.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        lease_seconds: int = settings.OUTBOX_LEASE_SECONDS,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+    
+    def _claim_batch(self, db) -> List[NotificationOutbox]:
+        """Lease up to batch_size due events in one statement"""
+        due = (
+            select(NotificationOutbox.id)
+            .where(
+                NotificationOutbox.status == "pending",
+                NotificationOutbox.available_at <= func.now()
+            )
+            .order_by(NotificationOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = db.scalars(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(due.scalar_subquery()))
+            .values(
+                attempts=NotificationOutbox.attempts + 1,
+                available_at=func.now() + timedelta(seconds=self.lease_seconds)
+            )
+            .returning(NotificationOutbox)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return claimed
+    
+    @staticmethod
+    def _save(db, event: NotificationOutbox) -> None:
+        db.add(event)
+        db.commit()
+    
+    def _backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(2 ** attempts, 3600))
+    
+    async def drain_once(self) -> int:
+        """
+        Dispatch one batch of due events
+        
+        Returns:
+            Number of events claimed
+        """
+        # Claimed rows are used after the claim commits, without reloading them on the loop
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            # Blocking database calls run in a thread so the event loop keeps serving
+            events = await asyncio.to_thread(self._claim_batch, db)
+            if not events:
+                return 0
+            
+            service = NotificationService(db)
+            for event in events:
+                handler = EVENT_HANDLERS.get(event.event_type)
+                try:
+                    if handler is None:
+                        raise ValueError(f"Unknown outbox event type: {event.event_type}")
+                    hold = await handler(service, event)
+                    event.last_error = None
+                    if hold is None:
+                        event.status = "dispatched"
+                        event.dispatched_at = datetime.now(timezone.utc)
+                    else:
+                        # Still pending: if the holder loses it (restart, failed send),
+                        # the row is claimed again once the hold runs out
+                        event.available_at = datetime.now(timezone.utc) + timedelta(seconds=hold + self.lease_seconds)
+                except Exception as e:
+                    logger.error(f"Outbox event {event.id} failed (attempt {event.attempts}): {str(e)}")
+                    event.last_error = str(e)
+                    if event.attempts >= self.max_attempts:
+                        event.status = "failed"
+                    else:
+                        event.available_at = datetime.now(timezone.utc) + self._backoff(event.attempts)
+                await asyncio.to_thread(self._save, db, event)
+            
+            return len(events)
+        finally:
+            db.close()
+    
+    async def run(self) -> None:
+        """Poll the outbox until stop() is called"""
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Outbox dispatcher error: {str(e)}")
+                claimed = 0
+            
+            # Keep draining while there is a backlog, otherwise wait for the next poll
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+    
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+# Create global instance
+outbox_dispatcher = OutboxDispatcher()
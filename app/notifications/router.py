@@ -2,9 +2,11 @@
 Notification Router - API endpoints for push notifications
 Handles token registration and notification sending
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
+import asyncio
 import logging
 
 from app.database import get_db
@@ -15,10 +17,21 @@ from app.notifications.schemas import (
     BulkNotificationRequest,
     BookingNotificationData,
     ProgressNotificationData,
-    NotificationResponse
+    NotificationResponse,
+    FanoutJobResponse,
+    NotificationLogPage,
+    InboxPage,
+    UnreadCountResponse,
+    MarkReadRequest,
+    MarkReadResponse
 )
-from app.notifications.notification_service import get_notification_service
+from app.notifications.inbox import add_to_inbox, add_to_user_type_inbox, list_inbox, get_unread_count, mark_read
+from app.auth.users.dependencies import get_current_user
+from app.auth.users.schemas import TokenUser
+from app.notifications.notification_service import get_notification_service, progress_report_message
+from app.notifications.coalescer import notification_coalescer, RECIPIENT_USER
 from app.notifications.web_push_service import web_push_service
+from app.notifications.fanout import fanout_engine, load_job
 from app.bookings.models import Booking
 from app.progress_reports.models import ProgressReport
 
@@ -96,8 +109,11 @@ async def send_notification_to_user(
     try:
         service = get_notification_service(db)
         
+        # The inbox entry is kept even when no device can be reached
+        await asyncio.to_thread(add_to_inbox, db, [request.user_id], request.title, request.body, request.data)
+        
         # Get user's active tokens
-        tokens = service.get_user_tokens(request.user_id)
+        tokens = await asyncio.to_thread(service.get_user_tokens, request.user_id)
         
         if not tokens:
             return NotificationResponse(
@@ -115,7 +131,7 @@ async def send_notification_to_user(
             )
             
             # Log the notification attempt
-            service._create_notification_log(
+            await service._create_notification_log(
                 user_id=request.user_id,
                 user_type=token.user_type,
                 title=request.title,
@@ -149,6 +165,42 @@ async def send_notification_to_user(
         )
 
 
+async def _broadcast_to_user_type(
+    db: Session,
+    user_type: str,
+    request: BulkNotificationRequest,
+    detach: bool
+) -> NotificationResponse:
+    """
+    Shared body of the send-to-all endpoints
+    """
+    service = get_notification_service(db)
+    
+    # Every user of the type gets the inbox entry, with or without a device
+    await asyncio.to_thread(add_to_user_type_inbox, db, user_type, request.title, request.body, request.data)
+    tokens = await asyncio.to_thread(service.get_tokens_by_user_type, user_type)
+    
+    if not tokens:
+        return NotificationResponse(
+            success=False,
+            message=f"No active {user_type} tokens found"
+        )
+    
+    if detach:
+        job_id = service.send_to_tokens_detached(tokens, request.title, request.body, request.data)
+        return NotificationResponse(
+            success=True,
+            message=f"Notification to {len(tokens)} {user_type} devices started",
+            job_id=job_id
+        )
+    
+    summary = await service.send_to_tokens(tokens, request.title, request.body, request.data)
+    return NotificationResponse(
+        success=summary["success_count"] > 0,
+        message=f"Notification sent to {summary['success_count']} {user_type}s"
+    )
+
+
 @router.post(
     "/send-to-all-instructors",
     response_model=NotificationResponse,
@@ -157,6 +209,7 @@ async def send_notification_to_user(
 )
 async def send_notification_to_all_instructors(
     request: BulkNotificationRequest,
+    detach: bool = Query(False, description="Return immediately with a job id instead of waiting"),
     db: Session = Depends(get_db)
 ):
     """
@@ -167,45 +220,7 @@ async def send_notification_to_all_instructors(
     - **data**: Additional data (optional)
     """
     try:
-        service = get_notification_service(db)
-        
-        # Get all instructor tokens
-        tokens = service.get_tokens_by_user_type("instructor")
-        
-        if not tokens:
-            return NotificationResponse(
-                success=False,
-                message="No active instructor tokens found"
-            )
-        
-        success_count = 0
-        for token in tokens:
-            result = await web_push_service.send_push_notification(
-                fcm_token=token.fcm_token,
-                title=request.title,
-                body=request.body,
-                data=request.data
-            )
-            
-            # Log the notification attempt
-            service._create_notification_log(
-                user_id=token.user_id,
-                user_type=token.user_type,
-                title=request.title,
-                body=request.body,
-                fcm_token=token.fcm_token,
-                success=result["success"],
-                error_message=result.get("error"),
-                data=request.data
-            )
-            
-            if result["success"]:
-                success_count += 1
-        
-        return NotificationResponse(
-            success=success_count > 0,
-            message=f"Notification sent to {success_count} instructors"
-        )
+        return await _broadcast_to_user_type(db, "instructor", request, detach)
         
     except Exception as e:
         logger.error(f"Error in send_notification_to_all_instructors: {str(e)}")
@@ -223,6 +238,7 @@ async def send_notification_to_all_instructors(
 )
 async def send_notification_to_all_students(
     request: BulkNotificationRequest,
+    detach: bool = Query(False, description="Return immediately with a job id instead of waiting"),
     db: Session = Depends(get_db)
 ):
     """
@@ -233,45 +249,7 @@ async def send_notification_to_all_students(
     - **data**: Additional data (optional)
     """
     try:
-        service = get_notification_service(db)
-        
-        # Get all student tokens
-        tokens = service.get_tokens_by_user_type("student")
-        
-        if not tokens:
-            return NotificationResponse(
-                success=False,
-                message="No active student tokens found"
-            )
-        
-        success_count = 0
-        for token in tokens:
-            result = await web_push_service.send_push_notification(
-                fcm_token=token.fcm_token,
-                title=request.title,
-                body=request.body,
-                data=request.data
-            )
-            
-            # Log the notification attempt
-            service._create_notification_log(
-                user_id=token.user_id,
-                user_type=token.user_type,
-                title=request.title,
-                body=request.body,
-                fcm_token=token.fcm_token,
-                success=result["success"],
-                error_message=result.get("error"),
-                data=request.data
-            )
-            
-            if result["success"]:
-                success_count += 1
-        
-        return NotificationResponse(
-            success=success_count > 0,
-            message=f"Notification sent to {success_count} students"
-        )
+        return await _broadcast_to_user_type(db, "student", request, detach)
         
     except Exception as e:
         logger.error(f"Error in send_notification_to_all_students: {str(e)}")
@@ -300,59 +278,7 @@ async def notify_new_booking(
     """
     try:
         service = get_notification_service(db)
-        
-        # Prepare notification content
-        title = "New Booking Received"
-        body = f"New booking from {booking_data.student_name}"
-        
-        # Add booking time to body if provided
-        if booking_data.booking_time:
-            body += f" at {booking_data.booking_time}"
-        
-        # Prepare data payload
-        data = {
-            "type": "new_booking",
-            "booking_id": booking_data.booking_id,
-            "student_name": booking_data.student_name
-        }
-        
-        # Get all instructor tokens
-        tokens = service.get_tokens_by_user_type("instructor")
-        
-        if not tokens:
-            return NotificationResponse(
-                success=False,
-                message="No active instructor tokens found"
-            )
-        
-        success_count = 0
-        for token in tokens:
-            result = await web_push_service.send_push_notification(
-                fcm_token=token.fcm_token,
-                title=title,
-                body=body,
-                data=data
-            )
-            
-            # Log the notification attempt
-            service._create_notification_log(
-                user_id=token.user_id,
-                user_type=token.user_type,
-                title=title,
-                body=body,
-                fcm_token=token.fcm_token,
-                success=result["success"],
-                error_message=result.get("error"),
-                data=data
-            )
-            
-            if result["success"]:
-                success_count += 1
-        
-        return NotificationResponse(
-            success=success_count > 0,
-            message=f"Booking notification sent to {success_count} instructors"
-        )
+        return await service.notify_new_booking(booking_data)
         
     except Exception as e:
         logger.error(f"Error in notify_new_booking: {str(e)}")
@@ -379,58 +305,20 @@ async def notify_progress_report_updated(
     - **student_id**: ID of the student to notify
     """
     try:
-        service = get_notification_service(db)
-        
-        # Prepare notification content
-        title = "Progress Report Updated"
-        body = "Your progress report has been updated. Please have a look."
-        
-        # Prepare data payload
-        data = {
-            "type": "progress_report_updated",
-            "progress_id": progress_data.progress_id
-        }
-        
-        # Add instructor name if provided
-        if progress_data.instructor_name:
-            data["instructor_name"] = progress_data.instructor_name
-        
-        # Get student's active tokens
-        tokens = service.get_user_tokens(progress_data.student_id)
-        
-        if not tokens:
-            return NotificationResponse(
-                success=False,
-                message="No active FCM tokens found for student"
-            )
+        title, body, data = progress_report_message(
+            progress_data.progress_id, progress_data.instructor_name
+        )
         
-        success_count = 0
-        for token in tokens:
-            result = await web_push_service.send_push_notification(
-                fcm_token=token.fcm_token,
-                title=title,
-                body=body,
-                data=data
-            )
-            
-            # Log the notification attempt
-            service._create_notification_log(
-                user_id=progress_data.student_id,
-                user_type="student",
-                title=title,
-                body=body,
-                fcm_token=token.fcm_token,
-                success=result["success"],
-                error_message=result.get("error"),
-                data=data
-            )
-            
-            if result["success"]:
-                success_count += 1
+        # Repeated updates to the same report within the quiet window are sent once;
+        # the student's inbox gets it even without an active device
+        notification_coalescer.submit(
+            RECIPIENT_USER, progress_data.student_id, "progress_report_updated",
+            progress_data.progress_id, title, body, data
+        )
         
         return NotificationResponse(
-            success=success_count > 0,
-            message=f"Progress notification sent to student on {success_count} devices"
+            success=True,
+            message="Progress notification scheduled"
         )
         
     except Exception as e:
@@ -438,4 +326,152 @@ async def notify_progress_report_updated(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=FanoutJobResponse,
+    summary="Get Fan-out Job Status",
+    description="Poll the status of a detached notification fan-out"
+)
+def get_fanout_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Get the status and aggregated result of a detached fan-out job
+
+    Works from any worker. A job stays 'running' if the worker that ran it
+    stopped before it finished; finished jobs are kept for FANOUT_JOB_RETENTION_HOURS.
+    """
+    job = fanout_engine.get_job(job_id) or load_job(db, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.get(
+    "/logs",
+    response_model=NotificationLogPage,
+    summary="List Notification Logs",
+    description="Keyset-paginated notification delivery logs, newest first"
+)
+def get_notification_logs(
+    limit: int = Query(50, ge=1, le=200, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    user_id: Optional[int] = Query(None, description="Filter by user ID"),
+    success: Optional[bool] = Query(None, description="Filter by delivery success"),
+    since: Optional[datetime] = Query(None, description="Sent at or after this time"),
+    until: Optional[datetime] = Query(None, description="Sent before this time"),
+    booking_id: Optional[str] = Query(None, description="Filter by booking_id in the notification data"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get notification logs for auditing
+    
+    - **cursor**: Opaque cursor returned as next_cursor by the previous page
+    - **since/until**: Time range; narrow ranges only touch the matching monthly partitions
+    """
+    try:
+        service = get_notification_service(db)
+        return service.get_logs(
+            limit=limit,
+            cursor=cursor,
+            user_id=user_id,
+            success=success,
+            since=since,
+            until=until,
+            booking_id=booking_id
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in get_notification_logs: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+
+@router.get(
+    "/inbox",
+    response_model=InboxPage,
+    summary="List My Notifications",
+    description="The current user's notification inbox, newest first"
+)
+def get_my_inbox(
+    limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    unread_only: bool = Query(False, description="Only unread notifications"),
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the current user's notifications
+    
+    - **cursor**: Returned as next_cursor by the previous page
+    - **unread_only**: Skip notifications already read
+    """
+    try:
+        return list_inbox(db, current_user.id, limit=limit, cursor=cursor, unread_only=unread_only)
+    except Exception as e:
+        logger.error(f"Error in get_my_inbox: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+
+@router.get(
+    "/inbox/unread-count",
+    response_model=UnreadCountResponse,
+    summary="Get My Unread Count",
+    description="Unread notification count for the header badge"
+)
+def get_my_unread_count(
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the current user's unread count (a single-row read)
+    """
+    try:
+        return UnreadCountResponse(unread_count=get_unread_count(db, current_user.id))
+    except Exception as e:
+        logger.error(f"Error in get_my_unread_count: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+
+@router.post(
+    "/inbox/mark-read",
+    response_model=MarkReadResponse,
+    summary="Mark Notifications Read",
+    description="Mark some or all of the current user's notifications read"
+)
+def mark_my_notifications_read(
+    request: MarkReadRequest,
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Mark notifications read in bulk
+    
+    - **ids**: Notifications to mark; omit to mark all unread
+    - **up_to_id**: Only notifications up to this id (e.g. the newest one on screen)
+    """
+    try:
+        return mark_read(db, current_user.id, ids=request.ids, up_to_id=request.up_to_id)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error in mark_my_notifications_read: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
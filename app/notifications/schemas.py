@@ -3,7 +3,7 @@ Pydantic schemas for push notifications
 Used for request/response validation in API endpoints
 """
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
@@ -11,7 +11,7 @@ class FCMTokenRegister(BaseModel):
     """
     Schema for registering a new FCM token from frontend
     """
-    user_id: str
+    user_id: int
     user_type: str  # 'instructor' or 'student'
     fcm_token: str
     device_info: Optional[str] = None
@@ -19,7 +19,7 @@ class FCMTokenRegister(BaseModel):
     class Config:
         schema_extra = {
             "example": {
-                "user_id": "user_123",
+                "user_id": 123,
                 "user_type": "student", 
                 "fcm_token": "fcm_token_abc123",
                 "device_info": "Chrome on Windows"
@@ -50,6 +50,8 @@ class ProgressNotificationData(BaseModel):
     Contains minimal info needed for the notification
     """
     progress_id: str
+    student_id: int  # Student receiving the notification
+    instructor_name: Optional[str] = None
     # We don't need student_name since it's going TO the student
     # Just progress_id to link to the report
 
@@ -58,7 +60,7 @@ class NotificationRequest(BaseModel):
     """
     Schema for sending a notification to specific user
     """
-    user_id: str
+    user_id: int
     title: str
     body: str
     data: Optional[Dict[str, Any]] = None
@@ -82,19 +84,89 @@ class NotificationResponse(BaseModel):
     message: str
     message_id: Optional[str] = None
     error: Optional[str] = None
+    job_id: Optional[str] = None  # Set when the fan-out runs detached
+
+
+class FanoutJobResponse(BaseModel):
+    """
+    Status of a detached fan-out job
+    """
+    job_id: str
+    status: str  # 'running', 'completed' or 'failed'
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
 
 
 class NotificationLogResponse(BaseModel):
     """
     Response schema for notification log entries
     """
-    id: str
-    user_id: str
+    id: int
+    user_id: int
     user_type: str
     title: str
     body: str
+    data: Optional[Dict[str, Any]] = None
     success: bool
+    error_message: Optional[str] = None
     sent_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class NotificationLogPage(BaseModel):
+    """
+    One keyset-paginated page of notification logs
+    """
+    items: List[NotificationLogResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to fetch the next page
+
+
+class InboxItemResponse(BaseModel):
+    """
+    Response schema for a user's inbox entry
+    """
+    id: int
+    notification_type: Optional[str] = None
+    title: str
+    body: str
+    data: Optional[Dict[str, Any]] = None
+    is_read: bool
+    created_at: datetime
+    read_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class InboxPage(BaseModel):
+    """
+    One keyset-paginated page of a user's inbox
+    """
+    items: List[InboxItemResponse]
+    next_cursor: Optional[int] = None  # Pass back as ?cursor= to fetch the next page
+
+
+class UnreadCountResponse(BaseModel):
+    """
+    Unread inbox count for the header badge
+    """
+    unread_count: int
+
+
+class MarkReadRequest(BaseModel):
+    """
+    Request schema for marking inbox entries read
+    Omit ids to mark every unread entry (optionally only up to up_to_id)
+    """
+    ids: Optional[List[int]] = None
+    up_to_id: Optional[int] = None
+
+
+class MarkReadResponse(BaseModel):
+    """
+    Response schema for mark-read
+    """
+    marked: int
+    unread_count: int
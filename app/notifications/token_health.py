@@ -0,0 +1,165 @@
+"""
+Token Health - deactivates push tokens that can no longer receive notifications
+Applied in bulk after each fan-out, plus a periodic sweep of long-failing tokens
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.notifications.models import UserFCMToken
+from app.notifications.token_registry import bump_token_set_version, token_registry
+from app.notifications.web_push_service import ERROR_UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+# Non-permanent failures that point at the device token: error responses FCM gave
+# for this message that are not about our request, credentials, quota or FCM's own
+# availability. Network errors, timeouts and internal errors say nothing about the token
+TOKEN_FAILURE_ERRORS = {ERROR_UNKNOWN}
+
+
+def apply_send_results(db: Session, results: List[Tuple[Any, Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Update token state from one fan-out in at most three bulk statements
+
+    Args:
+        db: Database session
+        results: (target, send result) pairs; targets expose fcm_token
+
+    Returns:
+        Counts of deactivated, failing and recovered (previously failing, now sent) tokens
+    """
+    dead_tokens = []
+    failing_tokens = []
+    ok_tokens = []
+    recovered = 0
+    version = None
+    for target, result in results:
+        if result["success"]:
+            ok_tokens.append(target.fcm_token)
+        elif result.get("permanent"):
+            dead_tokens.append(target.fcm_token)
+        elif result.get("error_type") in TOKEN_FAILURE_ERRORS:
+            failing_tokens.append(target.fcm_token)
+
+    try:
+        if dead_tokens:
+            db.execute(
+                update(UserFCMToken)
+                .where(UserFCMToken.fcm_token.in_(dead_tokens))
+                .values(is_active=False)
+                .execution_options(synchronize_session=False)
+            )
+        if failing_tokens:
+            db.execute(
+                update(UserFCMToken)
+                .where(UserFCMToken.fcm_token.in_(failing_tokens))
+                .values(
+                    failure_count=UserFCMToken.failure_count + 1,
+                    first_failed_at=func.coalesce(UserFCMToken.first_failed_at, func.now())
+                )
+                .execution_options(synchronize_session=False)
+            )
+        if ok_tokens:
+            recovered = db.execute(
+                update(UserFCMToken)
+                .where(UserFCMToken.fcm_token.in_(ok_tokens), UserFCMToken.failure_count > 0)
+                .values(failure_count=0, first_failed_at=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        if dead_tokens or failing_tokens or ok_tokens:
+            db.commit()
+        if dead_tokens:
+            version = bump_token_set_version(db)
+        token_registry.deactivate(dead_tokens, version)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to update push token health: {str(e)}")
+
+    if dead_tokens:
+        logger.info(f"Deactivated {len(dead_tokens)} dead FCM tokens")
+    return {
+        "deactivated": len(dead_tokens),
+        "failing": len(failing_tokens),
+        "recovered": recovered
+    }
+
+
+def sweep_failing_tokens(db: Session) -> int:
+    """
+    Deactivate tokens that have kept failing past the grace period
+
+    Returns:
+        Number of tokens deactivated
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.TOKEN_FAILURE_GRACE_HOURS)
+    result = db.execute(
+        update(UserFCMToken)
+        .where(
+            UserFCMToken.is_active == True,
+            UserFCMToken.failure_count >= settings.TOKEN_FAILURE_THRESHOLD,
+            UserFCMToken.first_failed_at < cutoff
+        )
+        .values(is_active=False)
+        .returning(UserFCMToken.fcm_token)
+        .execution_options(synchronize_session=False)
+    )
+    swept_tokens = result.scalars().all()
+    db.commit()
+    version = bump_token_set_version(db) if swept_tokens else None
+    token_registry.deactivate(swept_tokens, version)
+    return len(swept_tokens)
+
+
+class TokenSweeper:
+    """
+    Periodically runs sweep_failing_tokens in the background
+    """
+
+    def __init__(self, interval: int = settings.TOKEN_SWEEP_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    @staticmethod
+    def _sweep() -> int:
+        db = SessionLocal()
+        try:
+            return sweep_failing_tokens(db)
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                swept = await asyncio.to_thread(self._sweep)
+                if swept:
+                    logger.info(f"Token sweep deactivated {swept} failing FCM tokens")
+            except Exception as e:
+                logger.error(f"Token sweep error: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+# Create global instance
+token_sweeper = TokenSweeper()
@@ -0,0 +1,151 @@
+"""
+Token Registry - in-memory index of active FCM tokens
+Lets broadcasts start without querying user_fcm_tokens on every send
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.notifications.fanout import PushTarget
+from app.notifications.models import UserFCMToken, token_set_version_seq
+
+
+def bump_token_set_version(db: Session) -> int:
+    """
+    Record a change to the active token set; call after the change is committed,
+    so no worker sees the new version before the change itself
+
+    Returns:
+        The new version, to pass to TokenRegistry.register/deactivate
+    """
+    version = db.scalar(select(token_set_version_seq.next_value()))
+    db.commit()
+    return version
+
+
+class TokenRegistry:
+    """
+    Active tokens indexed by fcm_token, user_type and user_id.
+    Kept coherent by register/deactivate events in this process. Changes made
+    by other workers bump the token set version, which reads check at most once
+    every TOKEN_REGISTRY_VERSION_CHECK_MS and which triggers a reload. A full reload also runs
+    every TOKEN_REGISTRY_REFRESH_SECONDS for changes made outside the app, e.g.
+    tokens removed by a user delete cascade.
+    """
+
+    def __init__(
+        self,
+        refresh_seconds: int = settings.TOKEN_REGISTRY_REFRESH_SECONDS,
+        version_check_ms: int = settings.TOKEN_REGISTRY_VERSION_CHECK_MS
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.version_check_ms = version_check_ms
+        self._lock = threading.Lock()
+        self._by_token: Dict[str, PushTarget] = {}
+        self._by_type: Dict[str, Dict[str, PushTarget]] = {}
+        self._by_user: Dict[int, Dict[str, PushTarget]] = {}
+        self._loaded_at = None
+        self._checked_at = None
+        self._version = None
+
+    def _index(self, target: PushTarget) -> None:
+        self._by_token[target.fcm_token] = target
+        self._by_type.setdefault(target.user_type, {})[target.fcm_token] = target
+        self._by_user.setdefault(target.user_id, {})[target.fcm_token] = target
+
+    def _unindex(self, fcm_token: str) -> None:
+        target = self._by_token.pop(fcm_token, None)
+        if target is None:
+            return
+        by_type = self._by_type.get(target.user_type, {})
+        by_type.pop(fcm_token, None)
+        by_user = self._by_user.get(target.user_id, {})
+        by_user.pop(fcm_token, None)
+        if not by_user:
+            self._by_user.pop(target.user_id, None)
+
+    @staticmethod
+    def _current_version(db: Session) -> int:
+        # last_value is shared across sessions; is_called is false until the first nextval
+        return db.scalar(text(
+            f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {token_set_version_seq.name}"
+        ))
+
+    def _ensure_loaded(self, db: Session) -> None:
+        now = time.monotonic()
+        loaded_at, checked_at = self._loaded_at, self._checked_at
+        if loaded_at is not None and now - loaded_at < self.refresh_seconds:
+            if checked_at is not None and (now - checked_at) * 1000 < self.version_check_ms:
+                return
+            version = self._current_version(db)
+            self._checked_at = now
+            if version == self._version:
+                return
+        else:
+            version = None
+        self.reload(db, version)
+
+    def reload(self, db: Session, version: Optional[int] = None) -> None:
+        """Replace the registry contents with the active tokens in the database"""
+        # Read the version first: a change committed during the load bumps it past this one
+        if version is None:
+            version = self._current_version(db)
+        rows = db.execute(
+            select(UserFCMToken.user_id, UserFCMToken.user_type, UserFCMToken.fcm_token)
+            .where(UserFCMToken.is_active == True)
+        ).all()
+        with self._lock:
+            self._by_token = {}
+            self._by_type = {}
+            self._by_user = {}
+            for row in rows:
+                self._index(PushTarget(row.user_id, row.user_type, row.fcm_token))
+            self._loaded_at = self._checked_at = time.monotonic()
+            self._version = version
+
+    def _advance(self, version: Optional[int]) -> None:
+        """
+        Adopt the version of a change made in this process, unless another worker
+        changed the token set in between; then the next read reloads
+        """
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+
+    def get_by_user_type(self, db: Session, user_type: str) -> List[PushTarget]:
+        self._ensure_loaded(db)
+        with self._lock:
+            return list(self._by_type.get(user_type, {}).values())
+
+    def get_by_user(self, db: Session, user_id: int) -> List[PushTarget]:
+        self._ensure_loaded(db)
+        with self._lock:
+            return list(self._by_user.get(user_id, {}).values())
+
+    def register(self, target: PushTarget, version: Optional[int] = None) -> None:
+        """Record a registered (or re-assigned) token; version is from bump_token_set_version"""
+        with self._lock:
+            self._unindex(target.fcm_token)
+            self._index(target)
+            self._advance(version)
+
+    def deactivate(self, fcm_tokens: Iterable[str], version: Optional[int] = None) -> None:
+        """Drop tokens that were deactivated in the database; version is from bump_token_set_version"""
+        with self._lock:
+            for fcm_token in fcm_tokens:
+                self._unindex(fcm_token)
+            self._advance(version)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "tokens": len(self._by_token),
+                "users": len(self._by_user)
+            }
+
+
+# Create global instance
+token_registry = TokenRegistry()
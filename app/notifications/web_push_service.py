@@ -4,15 +4,88 @@ Handles the actual sending of notifications to FCM
 """
 import json
 import jwt
+import threading
 import time
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Tuple
 import httpx
 from pywebpush import webpush, WebPushException
 import logging
 import os
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+# Send error types; tokens failing with a PERMANENT_TOKEN_ERRORS type will never succeed again
+ERROR_UNREGISTERED = "unregistered"
+ERROR_INVALID_TOKEN = "invalid_token"
+ERROR_INVALID_REQUEST = "invalid_request"
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_UNAVAILABLE = "unavailable"
+ERROR_AUTH = "auth"
+ERROR_NETWORK = "network"  # No connection was made, so the message was never sent
+ERROR_UNCONFIRMED = "unconfirmed"  # Sent, but no answer arrived: it may have been delivered
+ERROR_INTERNAL = "internal"  # Raised on our side before FCM answered
+ERROR_UNKNOWN = "unknown"  # Any other FCM error response
+
+PERMANENT_TOKEN_ERRORS = {ERROR_UNREGISTERED, ERROR_INVALID_TOKEN}
+
+# Request errors raised before any byte of the request left this process
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delay in seconds or HTTP date) into seconds from now
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_fcm_error(status_code: int, response_body: str) -> str:
+    """
+    Map an FCM v1 error response to one of the send error types
+    """
+    fcm_error_code = None
+    message = ""
+    try:
+        error = json.loads(response_body).get("error", {})
+        message = error.get("message", "") or ""
+        for detail in error.get("details", []) or []:
+            if detail.get("errorCode"):
+                fcm_error_code = detail["errorCode"]
+                break
+    except (ValueError, AttributeError):
+        pass
+    
+    # A 404 without UNREGISTERED means the endpoint or project was not found, not the token
+    if status_code == 410 or fcm_error_code == "UNREGISTERED":
+        return ERROR_UNREGISTERED
+    if status_code == 404:
+        return ERROR_INVALID_REQUEST
+    if status_code == 400:
+        if "registration token" in message.lower():
+            return ERROR_INVALID_TOKEN
+        return ERROR_INVALID_REQUEST
+    if status_code == 429:
+        return ERROR_RATE_LIMITED
+    if status_code in (401, 403):
+        return ERROR_AUTH
+    if status_code >= 500:
+        return ERROR_UNAVAILABLE
+    return ERROR_UNKNOWN
+
 
 class WebPushService:
     """
@@ -23,20 +96,88 @@ class WebPushService:
         self.vapid_private_key = os.getenv("VAPID_PRIVATE_KEY")
         self.vapid_public_key = os.getenv("VAPID_PUBLIC_KEY") 
         self.vapid_claim_email = os.getenv("VAPID_CLAIM_EMAIL")
-        self.fcm_url = "https://fcm.googleapis.com/fcm/send"
+        self.fcm_base_url = settings.FCM_BASE_URL.rstrip("/")
+        self.fcm_url = f"{self.fcm_base_url}/fcm/send"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+        
+        # Signed VAPID headers per audience with their expiry time
+        self._vapid_headers_cache: Dict[str, Tuple[Dict[str, str], int]] = {}
+        self._vapid_lock = threading.Lock()
         
         # Validate that required environment variables are set
         if not all([self.vapid_private_key, self.vapid_public_key, self.vapid_claim_email]):
             logger.error("Missing VAPID environment variables")
             raise ValueError("VAPID keys and email must be set in environment variables")
     
+    async def start(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """
+        Create the application-lifetime HTTP client
+        
+        Args:
+            transport: Optional custom transport, e.g. a local FCM stand-in for benchmarks;
+                an existing client on another transport is closed and recreated
+        """
+        if transport is not None and transport is not self._transport:
+            self._transport = transport
+            await self.close()
+        if self._client is not None:
+            return
+        
+        self._client = httpx.AsyncClient(
+            http2=settings.PUSH_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.PUSH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PUSH_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.PUSH_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                settings.PUSH_TIMEOUT_SECONDS,
+                connect=settings.PUSH_CONNECT_TIMEOUT_SECONDS
+            ),
+            transport=self._transport
+        )
+    
+    async def close(self) -> None:
+        """
+        Close the HTTP client and its pooled connections
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily when used outside the app lifespan (scripts, workers)
+        if self._client is None:
+            await self.start()
+        return self._client
+    
     def _get_vapid_headers(self, audience: str) -> Dict[str, str]:
+        """
+        Return VAPID headers for FCM authentication
+        Signed headers are cached per audience and re-signed shortly before they expire
+        """
+        cached = self._vapid_headers_cache.get(audience)
+        if cached and cached[1] - settings.VAPID_REFRESH_MARGIN_SECONDS > time.time():
+            return cached[0]
+        
+        # Only one caller re-signs; the others wait and reuse its result
+        with self._vapid_lock:
+            cached = self._vapid_headers_cache.get(audience)
+            if cached and cached[1] - settings.VAPID_REFRESH_MARGIN_SECONDS > time.time():
+                return cached[0]
+            
+            headers, exp_time = self._sign_vapid_headers(audience)
+            self._vapid_headers_cache[audience] = (headers, exp_time)
+            return headers
+    
+    def _sign_vapid_headers(self, audience: str) -> Tuple[Dict[str, str], int]:
         """
         Generate VAPID headers for FCM authentication
         """
         try:
-            # VAPID token expires in 12 hours
-            exp_time = int(time.time()) + (12 * 60 * 60)
+            # VAPID token expires after VAPID_TOKEN_TTL_SECONDS (12 hours by default)
+            exp_time = int(time.time()) + settings.VAPID_TOKEN_TTL_SECONDS
             
             jwt_payload = {
                 "aud": audience,
@@ -55,7 +196,7 @@ class WebPushService:
             return {
                 "Authorization": f"vapid t={vapid_token}, k={self.vapid_public_key}",
                 "Content-Type": "application/json"
-            }
+            }, exp_time
         except Exception as e:
             logger.error(f"Error generating VAPID headers: {str(e)}")
             raise
@@ -77,7 +218,8 @@ class WebPushService:
             data: Additional data payload (optional)
             
         Returns:
-            Dictionary with success status and response details
+            Dictionary with success status and response details;
+            failures include error_type and whether the token is permanently dead
         """
         try:
             # Prepare the notification payload
@@ -90,7 +232,7 @@ class WebPushService:
                 payload["data"] = data
             
             # FCM endpoint for this specific token
-            fcm_endpoint = f"https://fcm.googleapis.com/v1/projects/{os.getenv('FIREBASE_PROJECT_ID')}/messages:send"
+            fcm_endpoint = f"{self.fcm_base_url}/v1/projects/{os.getenv('FIREBASE_PROJECT_ID')}/messages:send"
             
             # FCM message structure
             message = {
@@ -113,46 +255,59 @@ class WebPushService:
                 message["message"]["data"] = data
             
             # Get VAPID headers
-            headers = self._get_vapid_headers("https://fcm.googleapis.com")
+            headers = self._get_vapid_headers(self.fcm_base_url)
+            
+            # Send the request to FCM over the shared pooled client
+            client = await self._get_client()
+            response = await client.post(
+                fcm_endpoint,
+                json=message,
+                headers=headers
+            )
             
-            # Send the request to FCM
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    fcm_endpoint,
-                    json=message,
-                    headers=headers,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
+            if response.status_code == 200:
+                # Delivered whatever the body says; a bad body must not turn into a retry
+                try:
                     response_data = response.json()
-                    logger.info(f"Notification sent successfully: {response_data}")
-                    return {
-                        "success": True,
-                        "message": "Notification sent successfully",
-                        "message_id": response_data.get("name")
-                    }
-                else:
-                    error_msg = f"FCM error: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    return {
-                        "success": False,
-                        "error": error_msg
-                    }
+                except ValueError:
+                    response_data = {}
+                logger.info(f"Notification sent successfully: {response_data}")
+                return {
+                    "success": True,
+                    "message": "Notification sent successfully",
+                    "message_id": response_data.get("name")
+                }
+            else:
+                error_msg = f"FCM error: {response.status_code} - {response.text}"
+                error_type = classify_fcm_error(response.status_code, response.text)
+                logger.error(error_msg)
+                return {
+                    "success": False,
+                    "error": error_msg,
+                    "error_type": error_type,
+                    "permanent": error_type in PERMANENT_TOKEN_ERRORS,
+                    "retry_after": parse_retry_after(response.headers.get("Retry-After"))
+                }
                         
         except httpx.RequestError as e:
+            # Only failures to connect are safe to retry; after the request went out
+            # (read timeouts, dropped connections) FCM may already have delivered it
             error_msg = f"HTTP request error: {str(e)}"
             logger.error(error_msg)
             return {
                 "success": False,
-                "error": error_msg
+                "error": error_msg,
+                "error_type": ERROR_NETWORK if isinstance(e, CONNECT_ERRORS) else ERROR_UNCONFIRMED,
+                "permanent": False
             }
         except Exception as e:
             error_msg = f"Unexpected error sending notification: {str(e)}"
             logger.error(error_msg)
             return {
                 "success": False,
-                "error": error_msg
+                "error": error_msg,
+                "error_type": ERROR_INTERNAL,
+                "permanent": False
             }
 
 
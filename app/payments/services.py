@@ -1,11 +1,11 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from typing import List, Optional
 
 from app.payments.models import Payment, PaymentStatus
 from app.payments.schemas import PaymentCreate, PaymentUpdate
-from app.auth.users.models import User
-from app.courses.models import Course  
+from app.core.db_utils import commit_keep_loaded, insert_returning, raise_for_integrity_error
 
 class PaymentService:
     
@@ -63,22 +63,6 @@ class PaymentService:
     @staticmethod
     def create_payment(db: Session, payment_data: PaymentCreate) -> Payment:
         """Create a new payment with validation"""
-        # Validate student exists
-        student = db.query(User).filter(User.id == payment_data.student_id).first()
-        if not student:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Student not found"
-            )
-        
-        # Validate course exists
-        course = db.query(Course).filter(Course.id == payment_data.course_id).first()
-        if not course:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Course not found"
-            )
-        
         # Validate amount is positive
         if payment_data.amount <= 0:
             raise HTTPException(
@@ -86,30 +70,25 @@ class PaymentService:
                 detail="Payment amount must be positive"
             )
         
-        # Check if transaction_id already exists (if provided)
-        if payment_data.transaction_id:
-            existing_payment = db.query(Payment).filter(
-                Payment.transaction_id == payment_data.transaction_id
-            ).first()
-            if existing_payment:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Transaction ID already exists"
-                )
+        # Student, course and transaction_id uniqueness are enforced by constraints
+        try:
+            db_payment = insert_returning(db, Payment, {
+                "student_id": payment_data.student_id,
+                "course_id": payment_data.course_id,
+                "amount": payment_data.amount,
+                "status": payment_data.status.value,
+                "payment_method": payment_data.payment_method,
+                "transaction_id": payment_data.transaction_id
+            })
+        except IntegrityError as e:
+            db.rollback()
+            raise_for_integrity_error(e, {
+                "student_id": "Student not found",
+                "course_id": "Course not found",
+                "transaction_id": "Transaction ID already exists"
+            })
         
-        # Create payment
-        db_payment = Payment(
-            student_id=payment_data.student_id,
-            course_id=payment_data.course_id,
-            amount=payment_data.amount,
-            status=payment_data.status,
-            payment_method=payment_data.payment_method,
-            transaction_id=payment_data.transaction_id
-        )
-        
-        db.add(db_payment)
-        db.commit()
-        db.refresh(db_payment)
+        commit_keep_loaded(db)
         return db_payment
 
     # UPDATE operations
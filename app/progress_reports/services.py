@@ -1,10 +1,14 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, exists
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from typing import List, Optional
 
 from app.progress_reports.models import ProgressReport
 from app.progress_reports.schemas import ProgressReportCreate, ProgressReportUpdate
+from app.core.db_utils import commit_keep_loaded, insert_returning, raise_for_integrity_error
+from app.notifications.coalescer import notification_coalescer, RECIPIENT_USER
+from app.notifications.notification_service import progress_report_message
 
 class ProgressReportService:
     # Get Operations
@@ -54,30 +58,37 @@ class ProgressReportService:
     @staticmethod
     def create_report(db: Session, report_data: ProgressReportCreate) -> ProgressReport:
         """Create a new progress report"""
-        existing_report = db.query(ProgressReport).filter(
+        report_exists = exists().where(
             and_(
                 ProgressReport.user_id == report_data.user_id,
                 ProgressReport.class_id == report_data.class_id
             )
-        ).first()
-        if existing_report:
+        )
+
+        try:
+            db_report = insert_returning(db, ProgressReport, {
+                "user_id": report_data.user_id,
+                "class_id": report_data.class_id,
+                "progress_percentage": report_data.progress_percentage,
+                "status": report_data.status,
+                "feedback": report_data.feedback,
+                "remarks": report_data.remarks
+            }, unless_exists=report_exists)
+        except IntegrityError as e:
+            db.rollback()
+            raise_for_integrity_error(e, {
+                "user_id": "User not found",
+                "class_id": "Class session not found"
+            })
+
+        if db_report is None:
+            db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Progress report for this user already exists"
             )
-        
-        db_report = ProgressReport(
-            user_id=report_data.user_id,
-            class_id=report_data.class_id,
-            progress_percentage=report_data.progress_percentage,
-            status=report_data.status,
-            feedback=report_data.feedback,
-            remarks=report_data.remarks
-        )
 
-        db.add(db_report)
-        db.commit()
-        db.refresh(db_report)
+        commit_keep_loaded(db)
         return db_report
 
     @staticmethod
@@ -92,6 +103,7 @@ class ProgressReportService:
         db.commit()
         db.refresh(report)
 
+        ProgressReportService._notify_student(report)
         return report
     
     @staticmethod
@@ -116,8 +128,18 @@ class ProgressReportService:
         
         db.commit()
         db.refresh(report)
+
+        ProgressReportService._notify_student(report)
         return report
 
+    @staticmethod
+    def _notify_student(report: ProgressReport) -> None:
+        """Queue the student's update notification; rapid edits to one report collapse into one push"""
+        title, body, data = progress_report_message(str(report.id))
+        notification_coalescer.submit(
+            RECIPIENT_USER, report.user_id, "progress_report_updated", str(report.id), title, body, data
+        )
+
     @staticmethod
     def delete_report(db: Session, report_id: int) -> None:
         """Delete a progress report"""
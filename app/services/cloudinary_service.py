@@ -1,10 +1,54 @@
-from cloudinary.uploader import upload, destroy
 from fastapi import HTTPException, status, UploadFile
-import io
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional
+import asyncio
 import logging
+import re
+import threading
+import uuid
+
+from app.core.config import settings
+from app.services.image_pipeline import InvalidImageError, build_variants
+from app.services.storage import COURSE_IMAGE_FOLDER, CloudinaryStorage, image_storage
+
+# Served as the plain image_url for clients that don't use the srcset
+DEFAULT_IMAGE_FORMAT = "webp"
+
+# Longest filename stem kept in a public ID; with the folder, course id, upload id
+# and variant suffix the ID stays within Course.image_public_id (String(100))
+MAX_NAME_STEM_LENGTH = 32
+
+
+def _name_stem(filename: str) -> str:
+    """Filename without extension, reduced to characters safe in a public ID"""
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "-", filename.rsplit(".", 1)[0]).strip("-")
+    return stem[:MAX_NAME_STEM_LENGTH] or "image"
 
 logger = logging.getLogger(__name__)
 
+# Uploads block on the network or disk, so they run on a bounded pool instead of the event loop
+_upload_pool: Optional[ThreadPoolExecutor] = None
+_upload_pool_lock = threading.Lock()
+
+def _get_upload_pool() -> ThreadPoolExecutor:
+    global _upload_pool
+    with _upload_pool_lock:
+        if _upload_pool is None:
+            _upload_pool = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_UPLOAD_WORKERS,
+                thread_name_prefix="image-upload"
+            )
+        return _upload_pool
+
+def shutdown_upload_pool() -> None:
+    """Stop the upload workers, called at application shutdown"""
+    global _upload_pool
+    with _upload_pool_lock:
+        if _upload_pool is not None:
+            _upload_pool.shutdown(wait=True)
+            _upload_pool = None
+
 class CloudinaryService:
     @staticmethod
     async def upload_course_image(image_file: UploadFile, course_id: int):
@@ -16,45 +60,101 @@ class CloudinaryService:
             course_id: The ID of the course
             
         Returns:
-            dict: Contains 'url' and 'public_id' of the uploaded image
+            dict: See upload_course_image_content
         """
         try:
-            # Read file content
-            content = await image_file.read()
-            
-            # Reset file pointer for potential reuse
             await image_file.seek(0)
-            
-            # Upload to Cloudinary
-            result = upload(
-                io.BytesIO(content),
-                folder=f"courses/{course_id}",
-                public_id=f"course_{course_id}_{image_file.filename.split('.')[0]}",
-                transformation=[
-                    {'width': 1200, 'height': 800, 'crop': 'limit'},
-                    {'quality': 'auto:good'},
-                    {'format': 'auto'}
-                ],
-                overwrite=True,  # Allow overwriting existing images
-                invalidate=True  # Invalidate cached versions
+            return await CloudinaryService.upload_course_image_content(
+                await image_file.read(), image_file.filename, course_id
+            )
+        except InvalidImageError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid image: {str(e)}"
             )
-            
-            return {
-                "url": result.get('secure_url'),
-                "public_id": result.get('public_id')
-            }
-            
         except Exception as e:
-            logger.error(f"Cloudinary upload error: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Image upload failed: {str(e)}"
             )
 
+    @staticmethod
+    async def upload_course_image_content(content: bytes, filename: str, course_id: int):
+        """
+        Resize and encode a course image locally, then store every variant in the configured backend
+        
+        Args:
+            content: Original image file content
+            filename: Original file name, used in the public IDs
+            course_id: The ID of the course
+            
+        Returns:
+            dict: Contains 'url' and 'public_id' of the largest variant, plus
+            'variants' (format, width, height, url, public_id) and 'placeholder'
+            
+        Raises:
+            InvalidImageError: The content is not a decodable image
+        """
+        processed = await build_variants(content)
+        
+        # Variants are already sized and encoded, so no remote transformations are requested.
+        # Every upload gets fresh public IDs, so a queued deletion of a previous image
+        # can never remove a re-upload of the same file
+        stem = _name_stem(filename)
+        upload_id = uuid.uuid4().hex[:8]
+        loop = asyncio.get_running_loop()
+        pool = _get_upload_pool()
+        uploaded = []
+        
+        async def upload_variant(variant):
+            result = await loop.run_in_executor(pool, partial(
+                image_storage.put,
+                variant["data"],
+                folder=f"{COURSE_IMAGE_FOLDER}/{course_id}",
+                name=f"course_{course_id}_{stem}_{upload_id}_{variant['width']}w_{variant['format']}",
+                image_format=variant["format"]
+            ))
+            entry = {
+                "format": variant["format"],
+                "width": variant["width"],
+                "height": variant["height"],
+                "url": result["url"],
+                "public_id": result["public_id"]
+            }
+            uploaded.append(entry)
+            return entry
+        
+        # Let every upload settle so a failure can clean up all the others
+        results = await asyncio.gather(
+            *[upload_variant(v) for v in processed["variants"]],
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.error(f"Image upload error ({image_storage.name}): {str(errors[0])}")
+            # Don't leave a partial set of variants behind
+            if uploaded:
+                await loop.run_in_executor(
+                    pool, CloudinaryService.delete_images, [entry["public_id"] for entry in uploaded]
+                )
+            raise errors[0]
+        
+        # The largest variant of the most compatible format is the default image
+        default = max(
+            results,
+            key=lambda v: (v["format"] == DEFAULT_IMAGE_FORMAT, v["width"])
+        )
+        return {
+            "url": default["url"],
+            "public_id": default["public_id"],
+            "variants": results,
+            "placeholder": processed["placeholder"]
+        }
+
     @staticmethod
     def delete_image(public_id: str):
         """
-        Delete image from Cloudinary
+        Delete image from storage
         
         Args:
             public_id: The public ID of the image to delete
@@ -63,12 +163,37 @@ class CloudinaryService:
             bool: True if deletion was successful, False otherwise
         """
         try:
-            result = destroy(public_id)
-            return result.get('result') == 'ok'
+            return image_storage.delete_many([public_id])[public_id]
         except Exception as e:
-            logger.error(f"Cloudinary delete error: {str(e)}")
+            logger.error(f"Image delete error ({image_storage.name}): {str(e)}")
             return False
 
+    @staticmethod
+    def delete_images(public_ids: List[str]) -> Dict[str, bool]:
+        """
+        Delete up to 100 images in one storage call
+        
+        Args:
+            public_ids: Public IDs to delete
+            
+        Returns:
+            dict: public_id -> True if the image is gone (deleted or already missing)
+            
+        Raises:
+            Exception: The call itself failed; nothing is known to be deleted
+        """
+        return image_storage.delete_many(public_ids)
+
+    @staticmethod
+    def list_images() -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over every stored course image
+        
+        Yields:
+            dict: Contains at least 'public_id' and 'created_at'
+        """
+        return image_storage.list_images()
+
     @staticmethod
     def get_image_url_with_transformations(public_id: str, width: int = None, height: int = None, quality: str = "auto"):
         """
@@ -81,8 +206,10 @@ class CloudinaryService:
             quality: Image quality
             
         Returns:
-            str: Transformed image URL
+            str: Transformed image URL, or None when images are not on Cloudinary
         """
+        if not isinstance(image_storage, CloudinaryStorage):
+            return None
         try:
             from cloudinary import CloudinaryImage
             
@@ -0,0 +1,160 @@
+"""
+Image Pipeline - local resizing and encoding of course images before upload
+Decodes once, strips metadata, and encodes WebP/AVIF variants at several widths
+plus a tiny blurred placeholder. Encoding is CPU bound, so it runs on a process pool.
+"""
+import asyncio
+import base64
+import io
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence
+
+from PIL import Image, ImageFilter, ImageOps, features
+
+from app.core.config import settings
+
+# Pillow save options per output format
+ENCODERS = {
+    "webp": lambda: {"format": "WEBP", "quality": settings.IMAGE_WEBP_QUALITY, "method": 4},
+    "avif": lambda: {"format": "AVIF", "quality": settings.IMAGE_AVIF_QUALITY, "speed": 6},
+}
+
+PLACEHOLDER_WIDTH = 16
+
+# Times a job is resubmitted after its worker process died and the pool was replaced
+BROKEN_POOL_RETRIES = 1
+
+_image_pool: Optional[ProcessPoolExecutor] = None
+_image_pool_lock = threading.Lock()
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def variant_widths() -> List[int]:
+    return sorted({int(width) for width in _csv(settings.IMAGE_VARIANT_WIDTHS)})
+
+
+def variant_formats() -> List[str]:
+    """Configured formats this Pillow build can encode (AVIF needs libavif)"""
+    return [
+        image_format for image_format in _csv(settings.IMAGE_VARIANT_FORMATS)
+        if image_format in ENCODERS and features.check(image_format)
+    ]
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    # No exif/icc arguments are passed, so the encoded files carry no metadata
+    image.save(buffer, **ENCODERS[image_format]())
+    return buffer.getvalue()
+
+
+def process_image(data: bytes, widths: Sequence[int], formats: Sequence[str], max_pixels: int) -> Dict[str, Any]:
+    """
+    Decode an image and build its variants; runs in a worker process
+
+    Args:
+        data: Original file content
+        widths: Target widths; widths larger than the original are capped to it
+        formats: Output formats, e.g. ["avif", "webp"]
+        max_pixels: Largest accepted width * height, checked from the header before decoding
+
+    Returns:
+        Dictionary with width, height, placeholder (data URI) and variants, each
+        a dict with format, width, height and data
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as original:
+            # Image.open only reads the header, so oversized images are rejected before
+            # a full-size bitmap is allocated
+            if original.width * original.height > max_pixels:
+                raise InvalidImageError(
+                    f"Image is {original.width}x{original.height}, more than {max_pixels} pixels"
+                )
+            # Apply the EXIF orientation before the metadata is dropped
+            image = ImageOps.exif_transpose(original)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    except InvalidImageError:
+        raise
+    except Exception as e:
+        raise InvalidImageError(f"Cannot decode image: {str(e)}")
+    image.info = {}
+
+    targets = sorted({min(width, image.width) for width in widths})
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format in formats:
+            variants.append({
+                "format": image_format,
+                "width": width,
+                "height": height,
+                "data": _encode(resized, image_format)
+            })
+
+    placeholder_height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    placeholder = image.resize((PLACEHOLDER_WIDTH, placeholder_height), Image.Resampling.BILINEAR)
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    placeholder_data = base64.b64encode(_encode(placeholder, "webp")).decode("ascii")
+
+    return {
+        "width": image.width,
+        "height": image.height,
+        "placeholder": f"data:image/webp;base64,{placeholder_data}",
+        "variants": variants
+    }
+
+
+def _get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is None:
+            _image_pool = ProcessPoolExecutor(max_workers=settings.IMAGE_PIPELINE_WORKERS or None)
+        return _image_pool
+
+
+def _discard_image_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next _get_image_pool() starts a fresh one"""
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is pool:
+            _image_pool = None
+    pool.shutdown(wait=False)
+
+
+async def build_variants(data: bytes) -> Dict[str, Any]:
+    """
+    Run process_image on the shared process pool
+
+    A worker killed mid-job (e.g. by the OOM killer) breaks the whole pool;
+    it is replaced and the job resubmitted, so later uploads keep working.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(BROKEN_POOL_RETRIES + 1):
+        pool = _get_image_pool()
+        try:
+            return await loop.run_in_executor(
+                pool, process_image, data, variant_widths(), variant_formats(), settings.IMAGE_MAX_PIXELS
+            )
+        except BrokenProcessPool:
+            _discard_image_pool(pool)
+            if attempt == BROKEN_POOL_RETRIES:
+                raise
+
+
+def shutdown_image_pool() -> None:
+    """Stop the image workers, called at application shutdown"""
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is not None:
+            _image_pool.shutdown(wait=True)
+            _image_pool = None
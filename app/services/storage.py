@@ -0,0 +1,294 @@
+"""
+Image Storage - backends behind CloudinaryService
+- CloudinaryStorage: images hosted on Cloudinary
+- LocalStorage: content-addressed files on local disk, served by the media router;
+  identical uploads share one file, and no network is needed (tests, benchmarks)
+
+All methods block and are called from worker threads.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from cloudinary.api import delete_resources, resource, resources
+from cloudinary.exceptions import NotFound
+from cloudinary.uploader import upload
+from cloudinary.utils import api_sign_request
+
+import jwt
+
+import app.config.cloudinary  # noqa: F401  Applies the Cloudinary credentials from settings
+from app.auth.utils.token import UPLOAD_RECEIPT_TYPE, decode_token
+from app.core.config import settings
+
+# Remote folder holding every course image on Cloudinary
+COURSE_IMAGE_FOLDER = "courses"
+
+# <2 hex>/<sha256>.<ext>
+LOCAL_PUBLIC_ID_PATTERN = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]{2,5}$")
+
+
+class UploadVerificationError(ValueError):
+    pass
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """Image format from the first bytes of a file, for the formats direct uploads accept"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class ImageStorage(ABC):
+    name: str
+
+    @abstractmethod
+    def put(self, data: bytes, folder: str, name: str, image_format: str) -> Dict[str, str]:
+        """
+        Store an encoded image
+
+        Returns:
+            dict: Contains 'url' and 'public_id'
+        """
+
+    @abstractmethod
+    def delete_many(self, public_ids: List[str]) -> Dict[str, bool]:
+        """
+        Delete a batch of images
+
+        Returns:
+            dict: public_id -> True if the image is gone (deleted or already missing)
+        """
+
+    @abstractmethod
+    def list_images(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over every stored course image
+
+        Yields:
+            dict: Contains 'public_id' and 'created_at' (ISO 8601)
+        """
+
+    @abstractmethod
+    def create_upload(self, folder: str, name: str, ticket: str) -> Dict[str, Any]:
+        """
+        Describe how a client uploads one image straight to storage
+
+        Returns:
+            dict: Contains 'upload_url', 'method' and 'fields' (form fields to send with the file)
+        """
+
+    @abstractmethod
+    def verify_upload(self, folder: str, name: str, receipt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Look up a finished direct upload
+
+        Args:
+            receipt: What the upload endpoint returned, for backends that need it
+
+        Returns:
+            dict: Contains 'url', 'public_id', 'format' and 'bytes'
+
+        Raises:
+            UploadVerificationError: Nothing was uploaded for this ticket
+        """
+
+
+class CloudinaryStorage(ImageStorage):
+    name = "cloudinary"
+
+    def put(self, data: bytes, folder: str, name: str, image_format: str) -> Dict[str, str]:
+        result = upload(
+            io.BytesIO(data),
+            folder=folder,
+            public_id=name,
+            overwrite=True,  # Allow overwriting existing images
+            invalidate=True  # Invalidate cached versions
+        )
+        return {"url": result.get("secure_url"), "public_id": result.get("public_id")}
+
+    def delete_many(self, public_ids: List[str]) -> Dict[str, bool]:
+        # At most 100 public IDs per call
+        result = delete_resources(public_ids, invalidate=True)
+        deleted = result.get("deleted", {})
+        return {
+            public_id: deleted.get(public_id) in ("deleted", "not_found")
+            for public_id in public_ids
+        }
+
+    def list_images(self) -> Iterator[Dict[str, Any]]:
+        options = {"type": "upload", "prefix": f"{COURSE_IMAGE_FOLDER}/", "max_results": 500}
+        while True:
+            page = resources(**options)
+            yield from page.get("resources", [])
+            if not page.get("next_cursor"):
+                break
+            options["next_cursor"] = page["next_cursor"]
+
+    def create_upload(self, folder: str, name: str, ticket: str) -> Dict[str, Any]:
+        # Signed upload parameters; Cloudinary rejects the upload if any of them is changed
+        params = {
+            "timestamp": int(time.time()),
+            "folder": folder,
+            "public_id": name,
+            "allowed_formats": settings.IMAGE_UPLOAD_FORMATS
+        }
+        params["signature"] = api_sign_request(params, settings.CLOUDINARY_API_SECRET)
+        params["api_key"] = settings.CLOUDINARY_API_KEY
+        return {
+            "upload_url": f"https://api.cloudinary.com/v1_1/{settings.CLOUDINARY_CLOUD_NAME}/image/upload",
+            "method": "POST",
+            "fields": params
+        }
+
+    def verify_upload(self, folder: str, name: str, receipt: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            result = resource(f"{folder}/{name}")
+        except NotFound:
+            raise UploadVerificationError("No image was uploaded for this ticket")
+        return {
+            "url": result.get("secure_url"),
+            "public_id": result.get("public_id"),
+            "format": result.get("format"),
+            "bytes": result.get("bytes")
+        }
+
+
+class LocalStorage(ImageStorage):
+    """
+    Files are named by the SHA-256 of their content, so storing identical bytes
+    again is a no-op. A file can therefore back several references; the image
+    sweeper only deletes public IDs no course references.
+    """
+    name = "local"
+
+    def __init__(self, root: str, base_url: str, recent_seconds: float):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        # Files stored again this recently may be about to be attached; never delete them
+        self.recent_seconds = recent_seconds
+
+    def path_for(self, public_id: str) -> Optional[Path]:
+        """File path for a public ID, or None if it is not a valid local ID"""
+        if not LOCAL_PUBLIC_ID_PATTERN.match(public_id):
+            return None
+        return self.root / public_id
+
+    def put(self, data: bytes, folder: str, name: str, image_format: str) -> Dict[str, str]:
+        tmp_path = self.temp_path()
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                tmp_file.write(data)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.put_file(tmp_path, hashlib.sha256(data).hexdigest(), image_format)
+
+    def temp_path(self) -> str:
+        """A new temp file on the media filesystem, so put_file can rename it into place"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        return tmp_path
+
+    def put_file(self, tmp_path: str, digest: str, image_format: str) -> Dict[str, str]:
+        """
+        Store a fully written temp file under its SHA-256; the temp file is consumed
+
+        Renaming means readers never see a partial file.
+        """
+        public_id = f"{digest[:2]}/{digest}.{image_format}"
+        path = self.root / public_id
+
+        if path.exists():
+            # Duplicate: keep the existing file, but mark it as freshly used
+            os.unlink(tmp_path)
+            os.utime(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+
+        return {"url": f"{self.base_url}/{public_id}", "public_id": public_id}
+
+    def delete_many(self, public_ids: List[str]) -> Dict[str, bool]:
+        outcome = {}
+        now = time.time()
+        for public_id in public_ids:
+            path = self.path_for(public_id)
+            if path is None:
+                # Not a local ID (e.g. left over from another backend)
+                outcome[public_id] = True
+                continue
+            try:
+                if now - path.stat().st_mtime < self.recent_seconds:
+                    outcome[public_id] = False
+                    continue
+                path.unlink()
+                outcome[public_id] = True
+            except FileNotFoundError:
+                outcome[public_id] = True
+        return outcome
+
+    def list_images(self) -> Iterator[Dict[str, Any]]:
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*/*"):
+            public_id = path.relative_to(self.root).as_posix()
+            if LOCAL_PUBLIC_ID_PATTERN.match(public_id):
+                yield {
+                    "public_id": public_id,
+                    "created_at": datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat()
+                }
+
+    def create_upload(self, folder: str, name: str, ticket: str) -> Dict[str, Any]:
+        # Stand-in for a storage provider's upload endpoint: the media router accepts
+        # the raw file body and answers with a receipt for finalize
+        return {"upload_url": f"{self.base_url}/uploads/{ticket}", "method": "PUT", "fields": {}}
+
+    def verify_upload(self, folder: str, name: str, receipt: Optional[str] = None) -> Dict[str, Any]:
+        if not receipt:
+            raise UploadVerificationError("Upload receipt is required")
+        try:
+            claims = decode_token(receipt, UPLOAD_RECEIPT_TYPE)
+        except jwt.InvalidTokenError:
+            raise UploadVerificationError("Invalid or expired upload receipt")
+        # Receipts are issued per ticket, and each ticket has its own name
+        if claims["sub"] != f"{folder}/{name}":
+            raise UploadVerificationError("Upload receipt does not belong to this ticket")
+
+        path = self.path_for(claims["public_id"])
+        if path is None or not path.is_file():
+            raise UploadVerificationError("No image was uploaded for this ticket")
+        return {
+            "url": f"{self.base_url}/{claims['public_id']}",
+            "public_id": claims["public_id"],
+            "format": path.suffix.lstrip("."),
+            "bytes": path.stat().st_size
+        }
+
+
+def create_storage() -> ImageStorage:
+    if settings.IMAGE_STORAGE_BACKEND == "local":
+        return LocalStorage(
+            root=settings.LOCAL_MEDIA_ROOT,
+            base_url=settings.LOCAL_MEDIA_URL,
+            recent_seconds=settings.IMAGE_JOB_LEASE_SECONDS
+        )
+    if settings.IMAGE_STORAGE_BACKEND == "cloudinary":
+        return CloudinaryStorage()
+    raise ValueError(f"Unknown IMAGE_STORAGE_BACKEND: {settings.IMAGE_STORAGE_BACKEND}")
+
+
+# Create global instance
+image_storage = create_storage()